@@ -0,0 +1,101 @@
+"""Иконки шаблонов в бинарном виде
+
+Revision ID: 7c1f2a9d4e10
+Revises: e5a6b8312d7b
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import base64
+import binascii
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1f2a9d4e10'
+down_revision: Union[str, None] = 'e5a6b8312d7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _sniff_content_type(data: bytes) -> str:
+    """ Тип по сигнатуре: раньше он нигде не сохранялся """
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data.startswith(b"\x00\x00\x01\x00"):
+        return "image/x-icon"
+    if b"<svg" in data[:1024]:
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('service_templates', sa.Column('icon_data', sa.LargeBinary(), nullable=True))
+    op.add_column('service_templates', sa.Column('icon_thumbnail', sa.LargeBinary(), nullable=True))
+    op.add_column('service_templates', sa.Column('icon_content_type', sa.String(), nullable=True))
+    op.add_column('service_templates', sa.Column('icon_hash', sa.String(length=64), nullable=True))
+
+    # Переносим Base64 из текстовой колонки в бинарную
+    connection = op.get_bind()
+    templates = sa.table(
+        'service_templates',
+        sa.column('id', sa.Integer),
+        sa.column('icon', sa.Text),
+        sa.column('icon_data', sa.LargeBinary),
+        sa.column('icon_content_type', sa.String),
+        sa.column('icon_hash', sa.String),
+    )
+    rows = connection.execute(sa.select(templates.c.id, templates.c.icon).where(templates.c.icon.isnot(None))).all()
+    for template_id, icon in rows:
+        try:
+            data = base64.b64decode(icon, validate=False)
+        except (binascii.Error, ValueError):
+            continue
+        if not data:
+            continue
+        connection.execute(
+            templates.update().where(templates.c.id == template_id).values(
+                icon_data=data,
+                icon_content_type=_sniff_content_type(data),
+                icon_hash=hashlib.sha256(data).hexdigest(),
+            )
+        )
+
+    with op.batch_alter_table('service_templates') as batch_op:
+        batch_op.drop_column('icon')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('service_templates', sa.Column('icon', sa.TEXT(), nullable=True))
+
+    connection = op.get_bind()
+    templates = sa.table(
+        'service_templates',
+        sa.column('id', sa.Integer),
+        sa.column('icon', sa.Text),
+        sa.column('icon_data', sa.LargeBinary),
+    )
+    rows = connection.execute(
+        sa.select(templates.c.id, templates.c.icon_data).where(templates.c.icon_data.isnot(None))
+    ).all()
+    for template_id, data in rows:
+        connection.execute(
+            templates.update().where(templates.c.id == template_id).values(icon=base64.b64encode(data).decode('utf-8'))
+        )
+
+    with op.batch_alter_table('service_templates') as batch_op:
+        batch_op.drop_column('icon_hash')
+        batch_op.drop_column('icon_content_type')
+        batch_op.drop_column('icon_thumbnail')
+        batch_op.drop_column('icon_data')
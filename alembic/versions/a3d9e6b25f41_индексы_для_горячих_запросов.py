@@ -0,0 +1,38 @@
+"""Индексы для горячих запросов
+
+Revision ID: a3d9e6b25f41
+Revises: 7c1f2a9d4e10
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9e6b25f41'
+down_revision: Union[str, None] = '7c1f2a9d4e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # if_not_exists: на базах, созданных init_db(), индексы уже могли появиться из моделей
+    op.create_index('ix_configurations_user_id_id', 'configurations', ['user_id', 'id'], if_not_exists=True)
+    op.create_index('ix_configurations_user_id_service', 'configurations', ['user_id', 'service'], if_not_exists=True)
+    op.create_index(
+        'ix_payment_orders_user_id_created_at', 'payment_orders', ['user_id', 'created_at', 'order_id'],
+        if_not_exists=True
+    )
+    op.create_index('ix_verification_codes_expires_at', 'verification_codes', ['expires_at'], if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_verification_codes_expires_at', table_name='verification_codes', if_exists=True)
+    op.drop_index('ix_payment_orders_user_id_created_at', table_name='payment_orders', if_exists=True)
+    op.drop_index('ix_configurations_user_id_service', table_name='configurations', if_exists=True)
+    op.drop_index('ix_configurations_user_id_id', table_name='configurations', if_exists=True)
@@ -0,0 +1,37 @@
+"""Счётчик конфигураций пользователя
+
+Revision ID: b81c4f0e7a52
+Revises: a3d9e6b25f41
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81c4f0e7a52'
+down_revision: Union[str, None] = 'a3d9e6b25f41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'users',
+        sa.Column('configurations_count', sa.Integer(), server_default='0', nullable=False)
+    )
+    # Заполняем по текущим данным (то же, что python -m app.database.maintenance recount-configurations)
+    op.execute(
+        "UPDATE users SET configurations_count = "
+        "(SELECT COUNT(*) FROM configurations WHERE configurations.user_id = users.id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('configurations_count')
@@ -0,0 +1,54 @@
+"""Дедупликация содержимого конфигураций
+
+Revision ID: c5e7a1d3b964
+Revises: b81c4f0e7a52
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e7a1d3b964'
+down_revision: Union[str, None] = 'b81c4f0e7a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'config_blobs',
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('hash'),
+    )
+    # Существующие строки остаются в configurations.config_data и читаются как раньше;
+    # перенос в config_blobs — python -m app.database.maintenance dedupe-configurations
+    with op.batch_alter_table('configurations') as batch_op:
+        batch_op.add_column(sa.Column('blob_hash', sa.String(length=64), nullable=True))
+        batch_op.alter_column('config_data', existing_type=sa.Text(), nullable=True)
+        batch_op.create_index('ix_configurations_blob_hash', ['blob_hash'])
+        batch_op.create_foreign_key('fk_configurations_blob_hash', 'config_blobs', ['blob_hash'], ['hash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Возвращаем содержимое в configurations.config_data (в том виде, как оно хранится в config_blobs)
+    op.execute(
+        "UPDATE configurations SET config_data = "
+        "(SELECT data FROM config_blobs WHERE config_blobs.hash = configurations.blob_hash) "
+        "WHERE blob_hash IS NOT NULL"
+    )
+    with op.batch_alter_table('configurations') as batch_op:
+        batch_op.drop_constraint('fk_configurations_blob_hash', type_='foreignkey')
+        batch_op.drop_index('ix_configurations_blob_hash')
+        batch_op.alter_column('config_data', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('blob_hash')
+    op.drop_table('config_blobs')
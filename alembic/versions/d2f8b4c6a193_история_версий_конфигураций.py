@@ -0,0 +1,44 @@
+"""История версий конфигураций
+
+Revision ID: d2f8b4c6a193
+Revises: c5e7a1d3b964
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f8b4c6a193'
+down_revision: Union[str, None] = 'c5e7a1d3b964'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Уже сохранённые конфигурации получат первую версию при первом изменении
+    op.create_table(
+        'configuration_revisions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('configuration_id', sa.Integer(), nullable=False),
+        sa.Column('revision', sa.Integer(), nullable=False),
+        sa.Column('blob_hash', sa.String(length=64), nullable=True),
+        sa.Column('delta', sa.Text(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['configuration_id'], ['configurations.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['blob_hash'], ['config_blobs.hash']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('configuration_id', 'revision', name='uq_configuration_revisions_revision'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Снимки версий держат ссылки в config_blobs.ref_count; после отката пересчитайте их:
+    # python -m app.database.maintenance recount-config-blobs
+    op.drop_table('configuration_revisions')
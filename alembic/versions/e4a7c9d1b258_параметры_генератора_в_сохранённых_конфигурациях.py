@@ -0,0 +1,42 @@
+"""Параметры генератора в сохранённых конфигурациях
+
+Revision ID: e4a7c9d1b258
+Revises: d2f8b4c6a193
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a7c9d1b258'
+down_revision: Union[str, None] = 'd2f8b4c6a193'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('configurations') as batch_op:
+        batch_op.add_column(sa.Column('config_input', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('template_version', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Конфигурации, сохранённые только параметрами, без них останутся пустыми — перед откатом
+    # их нужно отрендерить: python -m app.database.maintenance materialize-configurations
+    pending = op.get_bind().execute(
+        sa.text("SELECT COUNT(*) FROM configurations WHERE config_input IS NOT NULL")
+    ).scalar()
+    if pending:
+        raise RuntimeError(
+            f"Конфигураций, сохранённых только параметрами генератора: {pending}; "
+            "сначала выполните `python -m app.database.maintenance materialize-configurations`"
+        )
+    with op.batch_alter_table('configurations') as batch_op:
+        batch_op.drop_column('template_version')
+        batch_op.drop_column('config_input')
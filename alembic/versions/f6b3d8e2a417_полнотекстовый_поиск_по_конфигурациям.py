@@ -0,0 +1,57 @@
+"""Полнотекстовый поиск по конфигурациям
+
+Revision ID: f6b3d8e2a417
+Revises: e4a7c9d1b258
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b3d8e2a417'
+down_revision: Union[str, None] = 'e4a7c9d1b258'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Копия app.database.configuration_search.SEARCH_DDL на момент миграции: правки в коде приложения
+# не должны менять то, что делает уже применённая миграция
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS configuration_search USING fts5("
+        "owner, config_name, service, body, tokenize='unicode61', prefix='2 3 4 5 6')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS configuration_search ("
+        "configuration_id INTEGER PRIMARY KEY REFERENCES configurations (id) ON DELETE CASCADE, "
+        "user_id INTEGER NOT NULL, "
+        "config_name TEXT NOT NULL, "
+        "service TEXT NOT NULL, "
+        "body TEXT NOT NULL, "
+        "document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', config_name), 'A') || "
+        "setweight(to_tsvector('simple', service), 'B') || "
+        "setweight(to_tsvector('simple', left(body, 500000)), 'C')) STORED)",
+        "CREATE INDEX IF NOT EXISTS ix_configuration_search_document ON configuration_search USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_configuration_search_user_id ON configuration_search (user_id)",
+    ],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # FTS5 (SQLite) и tsvector + GIN (PostgreSQL); на других СУБД поиск отключается.
+    # Индекс пустой: уже сохранённые конфигурации пользователя индексируются при его первом поиске
+    # (search_configurations сверяет число записей), всю базу сразу — maintenance reindex-configurations
+    for statement in SEARCH_DDL.get(op.get_bind().dialect.name, []):
+        op.execute(sa.text(statement))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name in SEARCH_DDL:
+        op.execute(sa.text("DROP TABLE IF EXISTS configuration_search"))
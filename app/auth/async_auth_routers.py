@@ -0,0 +1,34 @@
+# app/auth/async_auth_routers.py
+# Асинхронные версии /auth/login, /auth/logout и /auth/verify (включаются при DB_ASYNC_MODE=true)
+from fastapi import APIRouter, Depends, Response, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.auth_routers import UserLogin
+from app.auth.async_auth_service import login_user, get_current_user
+from app.database.async_database import get_async_db
+
+router = APIRouter(prefix="/auth")
+
+@router.post("/login")
+async def login(user: UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)):
+    return await login_user(user.email, user.password, db, response)
+
+@router.post("/logout")
+async def logout(response: Response, user=Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Пользователь не авторизован")
+
+    response.delete_cookie("access_token")
+    response.delete_cookie("refresh_token")
+
+    return {"message": "Вы успешно вышли из системы"}
+
+@router.get("/verify")
+async def verify_auth(user=Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return {
+        "isAuthenticated": True,
+        "email": user.email,
+    }
@@ -0,0 +1,74 @@
+# app/auth/async_auth_service.py
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, Depends, Response, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import auth_service
+from app.auth.auth_service import set_auth_cookies
+from app.auth.password_hasher import verify_password_async
+from app.database.async_database import get_async_db
+from app.database.async_crud import get_user_by_email
+from app.database.models import User
+from app.auth.auth_cache import decode_token_cached, get_cached_user, cache_user
+from app.core.security import create_access_token, create_refresh_token
+
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> User | None:
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+
+    is_valid, new_hash = await verify_password_async(password, user.hashed_password)
+    if not is_valid:
+        return None
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    return user
+
+async def login_user(email: str, password: str, db: AsyncSession, response: Response):
+    user = await authenticate_user(db, email, password)
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+
+    access_token = create_access_token({"sub": user.email})
+    refresh_token = create_refresh_token({"sub": user.email})
+    set_auth_cookies(response, access_token, refresh_token)
+
+    return {"message": "Login successful"}
+
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)) -> User:
+    token = request.cookies.get("access_token")
+    if not token:
+        raise HTTPException(status_code=401, detail="Token is required")
+
+    payload = decode_token_cached(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = get_cached_user(payload["sub"])
+    if user:
+        return user
+
+    user = await get_user_by_email(db, payload["sub"])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    return cache_user(user)
+
+async def consume_user_requests(db: AsyncSession, user_id: int, amount: int = 1) -> int | None:
+    return await db.run_sync(auth_service.consume_user_requests, user_id, amount)
+
+async def refund_user_requests(db: AsyncSession, user_id: int, amount: int = 1):
+    await db.run_sync(auth_service.refund_user_requests, user_id, amount)
+
+@asynccontextmanager
+async def refund_on_error(db: AsyncSession, user_id: int, amount: int = 1):
+    """ Асинхронный вариант auth_service.refund_on_error """
+    try:
+        yield
+    except Exception:
+        await db.rollback()
+        await refund_user_requests(db, user_id, amount)
+        raise
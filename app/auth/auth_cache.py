@@ -0,0 +1,167 @@
+# app/auth/auth_cache.py
+"""
+Короткоживущие кэши для get_current_user: проверенный JWT -> payload и email -> снимок пользователя.
+
+Кэши живут в памяти процесса, поэтому явная инвалидация действует только в текущем воркере;
+в остальных воркерах изменения видны не позже, чем через AUTH_CACHE_TTL_SECONDS.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import settings
+from app.core.security import decode_token
+
+
+class TTLCache:
+    """ Небольшой LRU-кэш с индивидуальным временем жизни записей и счётчиками попаданий """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key):
+        """ Чтение без учёта в статистике и без продления LRU """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def replace(self, key, update):
+        """
+        Заменяет значение на update(старое), сохраняя срок жизни записи: частые правки не должны
+        продлевать её бесконечно. Отсутствующую или истёкшую запись не трогает.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return
+            self._entries[key] = (update(entry[0]), entry[1])
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[0] if entry else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+USER_SNAPSHOT_FIELDS = (
+    "id",
+    "email",
+    "subscription_level",
+    "subscription_expiry",
+    "request_limit",
+    "requests_this_month",
+    "limit_reset_date",
+)
+
+
+class UserSnapshot:
+    """ Отвязанный от сессии снимок полей User, который можно отдавать из кэша между запросами """
+
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(**{field: getattr(user, field) for field in USER_SNAPSHOT_FIELDS})
+
+    def replace(self, **changes) -> "UserSnapshot":
+        return UserSnapshot(**{**self.__dict__, **changes})
+
+
+token_cache = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+# user_id -> email, чтобы инвалидировать кэш по id; живёт столько же, сколько снимок, и так же ограничен
+_emails_by_id = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES)
+
+
+def decode_token_cached(token: str) -> dict | None:
+    """ decode_token с кэшем: запись живёт не дольше AUTH_CACHE_TTL_SECONDS и не дольше exp токена """
+    if not settings.AUTH_CACHE_ENABLED:
+        return decode_token(token)
+
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = decode_token(token)
+        if payload:
+            ttl = settings.AUTH_CACHE_TTL_SECONDS
+            if "exp" in payload:
+                ttl = min(ttl, payload["exp"] - time.time())
+            token_cache.set(token, payload, ttl)
+    return payload
+
+
+def get_cached_user(email: str) -> UserSnapshot | None:
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    return user_cache.get(email)
+
+
+def cache_user(user) -> UserSnapshot:
+    snapshot = UserSnapshot.from_user(user)
+    if settings.AUTH_CACHE_ENABLED:
+        user_cache.set(snapshot.email, snapshot, settings.AUTH_CACHE_TTL_SECONDS)
+        _emails_by_id.set(snapshot.id, snapshot.email, settings.AUTH_CACHE_TTL_SECONDS)
+    return snapshot
+
+
+def update_cached_user(user_id: int, **changes):
+    """
+    Обновляет поля снимка (например, счётчик запросов после списания квоты). Срок жизни снимка
+    не продлевается: изменения, сделанные в обход этого процесса, всё равно видны через TTL.
+    """
+    email = _emails_by_id.peek(user_id)
+    if email is not None:
+        user_cache.replace(email, lambda snapshot: snapshot.replace(**changes))
+
+
+def invalidate_user_cache(user_id: int = None, email: str = None):
+    """ Сбрасывает снимок пользователя: вызывается при смене подписки, пароля и т.п. """
+    if email is None and user_id is not None:
+        email = _emails_by_id.pop(user_id)
+    if email is not None:
+        user_cache.pop(email)
+
+
+def auth_cache_stats() -> dict:
+    return {
+        "enabled": settings.AUTH_CACHE_ENABLED,
+        "ttl_seconds": settings.AUTH_CACHE_TTL_SECONDS,
+        "tokens": token_cache.stats(),
+        "users": user_cache.stats(),
+    }
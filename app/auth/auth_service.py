@@ -1,16 +1,18 @@
+from contextlib import contextmanager
 from datetime import timedelta, datetime
 from fastapi import HTTPException, Depends, Response, Request
+from sqlalchemy import update, case
 from sqlalchemy.orm import Session
-from passlib.context import CryptContext
 
+from app.auth.auth_cache import decode_token_cached, get_cached_user, cache_user, update_cached_user
+from app.auth.password_hasher import verify_password
+from app.auth.usage_buffer import UsageBuffer
 from app.database.crud import get_user_by_email
 from app.database.database import SessionLocal
 from app.database.models import User
-from app.core.security import create_access_token, create_refresh_token, decode_token
+from app.core.security import create_access_token, create_refresh_token
 from app.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def get_db():
     db = SessionLocal()
     try:
@@ -20,8 +22,16 @@ def get_db():
 
 def authenticate_user(db: Session, email: str, password: str) -> User | None:
     user = get_user_by_email(db, email)
-    if not user or not pwd_context.verify(password, user.hashed_password):
+    if not user:
         return None
+
+    is_valid, new_hash = verify_password(password, user.hashed_password)
+    if not is_valid:
+        return None
+    if new_hash:
+        # Хэш создан с другим числом раундов bcrypt — прозрачно обновляем его
+        user.hashed_password = new_hash
+        db.commit()
     return user
 
 def login_user(email: str, password: str, db: Session, response: Response):
@@ -31,7 +41,11 @@ def login_user(email: str, password: str, db: Session, response: Response):
 
     access_token = create_access_token({"sub": user.email})
     refresh_token = create_refresh_token({"sub": user.email})
+    set_auth_cookies(response, access_token, refresh_token)
 
+    return {"message": "Login successful"}
+
+def set_auth_cookies(response: Response, access_token: str, refresh_token: str):
     # Устанавливаем куки безопасно
     response.set_cookie(
         key="access_token",
@@ -50,41 +64,114 @@ def login_user(email: str, password: str, db: Session, response: Response):
         max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
     )
 
-    return {"message": "Login successful"}
-
 def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Token is required")
 
-    payload = decode_token(token)
+    payload = decode_token_cached(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    # Снимок из кэша избавляет от SELECT на каждом запросе; в обработчиках он ведёт себя как User
+    user = get_cached_user(payload["sub"])
+    if user:
+        return user
+
     user = db.query(User).filter(User.email == payload["sub"]).first()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
     print(f"Аутентификация пользователя: {user.email}")
-    return user
-
-def reset_user_limit_if_needed(db: Session, user: User):
-    now = datetime.utcnow()
-    if now >= user.limit_reset_date:
-        user.requests_this_month = 0
-        user.limit_reset_date = now + timedelta(days=30)
+    return cache_user(user)
+
+# Квоты на генерацию
+
+LIMIT_RESET_PERIOD = timedelta(days=30)
+
+def consume_user_requests(db: Session, user_id: int, amount: int = 1) -> int | None:
+    """ Списывает запросы из квоты: через буфер в памяти, если он включен, иначе напрямую в БД """
+    if settings.USAGE_BUFFER_ENABLED:
+        new_value = usage_buffer.consume(db, user_id, amount)
+    else:
+        new_value = consume_user_requests_in_db(db, user_id, amount)
+
+    if new_value is not None:
+        update_cached_user(user_id, requests_this_month=new_value)
+    return new_value
+
+def refund_user_requests(db: Session, user_id: int, amount: int = 1):
+    """ Возвращает в квоту запросы, списанные за генерацию, которая не удалась """
+    if settings.USAGE_BUFFER_ENABLED:
+        new_value = usage_buffer.refund(user_id, amount)
+    else:
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.requests_this_month >= amount)
+            .values(requests_this_month=User.requests_this_month - amount)
+            .execution_options(synchronize_session=False)
+        )
+        if db.get_bind().dialect.update_returning:
+            new_value = db.execute(stmt.returning(User.requests_this_month)).scalar_one_or_none()
+        else:
+            new_value = None
+            if db.execute(stmt).rowcount == 1:
+                new_value = db.query(User.requests_this_month).filter(User.id == user_id).scalar()
         db.commit()
 
-def check_user_limit(db: Session, user_id: int) -> bool:
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return False
+    if new_value is not None:
+        update_cached_user(user_id, requests_this_month=new_value)
 
-    reset_user_limit_if_needed(db, user)
-    return user.requests_this_month < user.request_limit
+@contextmanager
+def refund_on_error(db: Session, user_id: int, amount: int = 1):
+    """
+    Квота списывается до рендеринга (проверка лимита и списание — одно атомарное обновление),
+    поэтому упавший внутри блока рендеринг возвращает списанное
+    """
+    try:
+        yield
+    except Exception:
+        db.rollback()
+        refund_user_requests(db, user_id, amount)
+        raise
+
+def consume_user_requests_in_db(db: Session, user_id: int, amount: int = 1, reserved: int = 0) -> int | None:
+    """
+    Сбрасывает месячный счётчик при необходимости, проверяет лимит и списывает `amount`
+    запросов одним условным UPDATE. Возвращает новое значение requests_this_month
+    или None, если лимит превышен (или пользователь не найден).
+    reserved — запросы, уже списанные в памяти (usage_buffer), но ещё не записанные в БД:
+    они учитываются в проверке лимита, но не пишутся.
+    """
+    now = datetime.utcnow()
+    needs_reset = User.limit_reset_date <= now
+    new_count = case((needs_reset, amount), else_=User.requests_this_month + amount)
+
+    stmt = (
+        update(User)
+        .where(User.id == user_id, new_count + reserved <= User.request_limit)
+        .values(
+            requests_this_month=new_count,
+            limit_reset_date=case((needs_reset, now + LIMIT_RESET_PERIOD), else_=User.limit_reset_date),
+        )
+        .execution_options(synchronize_session=False)
+    )
 
-def increment_user_requests(db: Session, user_id: int):
-    user = db.query(User).filter(User.id == user_id).first()
-    if user:
-        user.requests_this_month += 1
-        db.commit()
+    if db.get_bind().dialect.update_returning:
+        new_value = db.execute(stmt.returning(User.requests_this_month)).scalar_one_or_none()
+    else:
+        # Старый SQLite без RETURNING: проверяем rowcount и дочитываем значение в той же транзакции
+        new_value = None
+        if db.execute(stmt).rowcount == 1:
+            new_value = db.query(User.requests_this_month).filter(User.id == user_id).scalar()
+    db.commit()
+    return new_value
+
+
+usage_buffer = UsageBuffer(
+    SessionLocal,
+    consume_user_requests_in_db,
+    flush_interval_ms=settings.USAGE_BUFFER_FLUSH_INTERVAL_MS,
+    flush_events=settings.USAGE_BUFFER_FLUSH_EVENTS,
+    reseed_seconds=settings.USAGE_BUFFER_RESEED_SECONDS,
+)
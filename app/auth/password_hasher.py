@@ -0,0 +1,114 @@
+# app/auth/password_hasher.py
+"""
+Хэширование паролей (bcrypt) в отдельном пуле процессов.
+
+bcrypt нагружает CPU и держит GIL, поэтому всплеск логинов в потоках запросов отнимал время
+у генерации. Задачи уходят в ProcessPoolExecutor, а очередь ограничена: если в ней уже
+PASSWORD_HASH_MAX_PENDING задач, запрос сразу получает 503 с Retry-After.
+
+Процессы пула запускаются через spawn, а не fork: к моменту первого логина в процессе уже
+работают пул потоков Starlette и поток сброса usage_buffer, и fork такого процесса может
+унаследовать захваченные чужими потоками блокировки. Пул поднимается при старте приложения
+(start_password_pool) и останавливается при выходе (shutdown_password_pool).
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+from app.config import settings
+
+# min_rounds = max_rounds = BCRYPT_ROUNDS: хэши с другим числом раундов считаются устаревшими
+# и прозрачно перехэшируются при следующем успешном входе
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+_pool = None
+_pool_lock = threading.Lock()
+_admission = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify_and_update(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+def _ready() -> bool:
+    return True
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def start_password_pool():
+    """ Запускает процессы пула заранее, чтобы первые логины не ждали spawn и импорт модулей """
+    if settings.PASSWORD_HASH_WORKERS > 0:
+        pool = _get_pool()
+        wait([pool.submit(_ready) for _ in range(settings.PASSWORD_HASH_WORKERS)])
+
+
+def _submit(func, *args) -> Future:
+    """ Ставит задачу в пул с контролем допуска; без пула (PASSWORD_HASH_WORKERS=0) считает на месте """
+    if not _admission.acquire(blocking=False):
+        raise HTTPException(
+            status_code=503,
+            detail="Сервер перегружен, попробуйте позже",
+            headers={"Retry-After": "1"},
+        )
+
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            _admission.release()
+        return future
+
+    future = _get_pool().submit(func, *args)
+    future.add_done_callback(lambda _: _admission.release())
+    return future
+
+
+def hash_password(password: str) -> str:
+    return _submit(_hash, password).result()
+
+
+def verify_password(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """ Возвращает (пароль верен, новый хэш или None, если перехэширование не нужно) """
+    return _submit(_verify_and_update, password, hashed_password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit(_hash, password))
+
+
+async def verify_password_async(password: str, hashed_password: str) -> tuple[bool, str | None]:
+    return await asyncio.wrap_future(_submit(_verify_and_update, password, hashed_password))
+
+
+def shutdown_password_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
@@ -5,7 +5,9 @@ from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 import random
-from app.auth.auth_service import get_db, pwd_context
+from app.auth.auth_service import get_db
+from app.auth.password_hasher import hash_password
+from app.auth.auth_cache import invalidate_user_cache
 from app.database.crud import get_user_by_email
 from app.database.models import VerificationCode, User
 from app.mail.mail_service import send_email
@@ -64,9 +66,10 @@ def confirm_password_reset(data: PasswordResetConfirm, db: Session = Depends(get
         raise HTTPException(status_code=404, detail="User not found")
 
     # Обновляем пароль
-    hashed_password = pwd_context.hash(data.new_password)
+    hashed_password = hash_password(data.new_password)
     user.hashed_password = hashed_password
     db.commit()
+    invalidate_user_cache(user_id=user.id, email=user.email)
 
     # Удаляем использованный код
     db.delete(verification_entry)
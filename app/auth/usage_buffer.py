@@ -0,0 +1,239 @@
+# app/auth/usage_buffer.py
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import update, case
+
+from app.database.models import User
+
+logger = logging.getLogger(__name__)
+
+_NOT_SEEDED = object()
+
+
+class UsageBuffer:
+    """
+    Буфер учёта запросов с отложенной записью (write-behind).
+
+    Лимиты проверяются по счётчикам в памяти процесса, которые засеваются из БД при первом
+    обращении пользователя (и повторно раз в reseed_seconds). Накопленные приращения пишутся
+    в users.requests_this_month одним UPDATE ... CASE id раз в flush_interval_ms или после
+    flush_events списаний.
+
+    Гарантии:
+    - в БД пишутся только приращения, поэтому повторная или параллельная запись из нескольких
+      воркеров не затирает чужие значения;
+    - при штатной остановке stop() сбрасывает все накопленные приращения;
+    - при аварийном падении процесса теряются приращения с момента последнего сброса
+      (не больше flush_interval_ms / flush_events запросов на воркер) — пользователь получит
+      столько же «бесплатных» генераций, но двойного списания не бывает;
+    - каждый воркер видит чужие списания только после пересева, поэтому между воркерами
+      лимит соблюдается с точностью до их несброшенных буферов.
+
+    Засев идёт через сессию запроса (в асинхронном режиме — через AsyncSession.run_sync) и не ждёт
+    фонового сброса: несброшенные приращения пользователя пишутся в той же транзакции, что и
+    списание. Если сброс как раз пишет этого пользователя (или его засевает другой запрос), запрос
+    списывается прямо в БД с учётом ещё не записанных приращений, а засев откладывается до
+    следующего обращения.
+    """
+
+    def __init__(self, session_factory, consume_in_db, flush_interval_ms: int, flush_events: int,
+                 reseed_seconds: int):
+        self._session_factory = session_factory
+        self._consume_in_db = consume_in_db
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_events = flush_events
+        self.reseed_seconds = reseed_seconds
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Только между сбросами (фоновый поток и stop()), не для запросов
+        self._users = {}  # user_id -> {"count", "limit", "reset_date", "seeded_at"}
+        self._pending = {}  # user_id -> накопленное приращение
+        self._pending_events = 0
+        self._in_flight = {}  # Приращения, которые сброс пишет прямо сейчас
+        # user_id -> {"unflushed": приращения, которые засев пишет в БД, "observed": наибольший
+        # счётчик, полученный прямыми списаниями, пока идёт засев}
+        self._seeding = {}
+        self._direct = {}  # user_id -> число идущих прямых списаний в БД
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="usage-buffer-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """ Останавливает фоновый поток и сбрасывает все накопленные приращения """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def consume(self, db, user_id: int, amount: int = 1) -> int | None:
+        """ Списывает запросы из памяти; возвращает новое значение счётчика или None при превышении лимита """
+        result = self._consume_in_memory(user_id, amount)
+        if result is not _NOT_SEEDED:
+            return result
+        return self._seed(db, user_id, amount)
+
+    def refund(self, user_id: int, amount: int = 1) -> int | None:
+        """
+        Возвращает в квоту списанные запросы (генерация не удалась). Отрицательное приращение
+        уходит в БД со следующим сбросом или засевом; возвращает новый счётчик, если пользователь засеян
+        """
+        with self._lock:
+            self._pending[user_id] = self._pending.get(user_id, 0) - amount
+            state = self._users.get(user_id)
+            if state is None:
+                return None
+            state["count"] = max(state["count"] - amount, 0)
+            return state["count"]
+
+    def forget(self, user_id: int):
+        """ Сбрасывает состояние пользователя в памяти (например, после смены подписки) """
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def flush(self):
+        """ Пишет накопленные приращения одним UPDATE; при ошибке возвращает их в буфер """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._pending_events = 0
+                self._in_flight = pending
+            if not pending:
+                return
+
+            db = self._session_factory()
+            try:
+                db.execute(
+                    update(User)
+                    .where(User.id.in_(pending.keys()))
+                    .values(requests_this_month=User.requests_this_month + case(pending, value=User.id, else_=0))
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                logger.exception("Не удалось сбросить буфер учёта запросов, повторим позже")
+                with self._lock:
+                    self._restore_pending(pending)
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+                db.close()
+
+    def _restore_pending(self, pending: dict):
+        # Вызывается под _lock
+        for user_id, amount in pending.items():
+            self._pending[user_id] = self._pending.get(user_id, 0) + amount
+            self._pending_events += amount
+
+    def _consume_in_memory(self, user_id: int, amount: int):
+        with self._lock:
+            return self._consume_locked(user_id, amount)
+
+    def _consume_locked(self, user_id: int, amount: int):
+        state = self._users.get(user_id)
+        if (not state or state["reset_date"] <= datetime.utcnow()
+                or time.monotonic() - state["seeded_at"] >= self.reseed_seconds):
+            return _NOT_SEEDED
+        if state["count"] + amount > state["limit"]:
+            return None
+        state["count"] += amount
+        self._pending[user_id] = self._pending.get(user_id, 0) + amount
+        self._pending_events += amount
+        if self._pending_events >= self.flush_events:
+            self._wakeup.set()
+        return state["count"]
+
+    def _seed(self, db, user_id: int, amount: int) -> int | None:
+        with self._lock:
+            # Пока мы шли сюда, пользователя мог засеять другой запрос
+            result = self._consume_locked(user_id, amount)
+            if result is not _NOT_SEEDED:
+                return result
+            seeding = self._seeding.get(user_id)
+            busy = user_id in self._in_flight or seeding is not None or user_id in self._direct
+            if busy:
+                self._direct[user_id] = self._direct.get(user_id, 0) + 1
+                # Значение в БД вот-вот изменится — засевать по нему нельзя. Списываем напрямую,
+                # считая в лимите всё, что уже списано, но ещё не записано (с запасом, если запись
+                # закончится раньше нашего UPDATE)
+                reserved = (self._in_flight.get(user_id, 0) + self._pending.get(user_id, 0)
+                            + (seeding["unflushed"] if seeding else 0))
+            else:
+                # Пока пользователь не засеян, новых приращений у него не появляется,
+                # а эти уйдут в БД в одной транзакции со списанием
+                unflushed = self._pending.pop(user_id, 0)
+                self._pending_events -= unflushed
+                seeding = self._seeding[user_id] = {"unflushed": unflushed, "observed": 0}
+        if busy:
+            new_value = None
+            try:
+                new_value = self._consume_in_db(db, user_id, amount, reserved=reserved)
+                return new_value
+            finally:
+                with self._lock:
+                    if self._direct[user_id] == 1:
+                        del self._direct[user_id]
+                    else:
+                        self._direct[user_id] -= 1
+                    seeding = self._seeding.get(user_id)
+                    if seeding is not None:
+                        # Засев мог прочитать БД до этого списания: счётчик в БД только растёт
+                        seeding["observed"] = max(seeding["observed"], new_value or 0)
+
+        try:
+            if unflushed:
+                db.execute(
+                    update(User)
+                    .where(User.id == user_id)
+                    .values(requests_this_month=User.requests_this_month + unflushed)
+                    .execution_options(synchronize_session=False)
+                )
+            new_value = self._consume_in_db(db, user_id, amount)
+            with self._lock:
+                seeding["unflushed"] = 0  # Уже в БД
+            row = db.query(User.requests_this_month, User.request_limit, User.limit_reset_date).filter(
+                User.id == user_id
+            ).first()
+            db.commit()  # Не держим открытую читающую транзакцию: она блокировала бы сброс в SQLite
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._end_seeding(user_id, seeding)
+                if seeding["unflushed"]:
+                    self._restore_pending({user_id: seeding["unflushed"]})
+            raise
+
+        with self._lock:
+            # Состояние ставится и засев снимается атомарно. Если прямое списание ещё идёт,
+            # засев мог его не увидеть — состояние не ставим, пользователя засеет следующий запрос
+            self._end_seeding(user_id, seeding)
+            if row is not None and user_id not in self._direct:
+                self._users[user_id] = {
+                    "count": max(row.requests_this_month, seeding["observed"]),
+                    "limit": row.request_limit,
+                    "reset_date": row.limit_reset_date,
+                    "seeded_at": time.monotonic(),
+                }
+        return new_value
+
+    def _end_seeding(self, user_id: int, seeding: dict):
+        # Вызывается под _lock; запись мог уже заменить следующий засев
+        if self._seeding.get(user_id) is seeding:
+            del self._seeding[user_id]
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
@@ -1,5 +1,7 @@
 # app/config.py
 
+from typing import Optional
+
 from pydantic import EmailStr
 from pydantic_settings import BaseSettings
 from datetime import timedelta
@@ -11,6 +13,16 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
 
+    # Хэширование паролей
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2  # Размер пула процессов для bcrypt; 0 — считать в потоке запроса
+    PASSWORD_HASH_MAX_PENDING: int = 32  # Сверх этого числа задач в очереди отвечаем 503
+
+    # Кэш проверенных токенов и пользователей для get_current_user
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+
     # SMTP конфигурация
     SMTP_SERVER: str
     SMTP_PORT: int
@@ -24,6 +36,62 @@ class Settings(BaseSettings):
 
     # База данных
     SQLALCHEMY_DATABASE_URL: str
+    DB_ASYNC_MODE: bool = False  # Асинхронный движок и async-версии горячих роутеров
+    SQLALCHEMY_ASYNC_DATABASE_URL: Optional[str] = None  # По умолчанию выводится из SQLALCHEMY_DATABASE_URL
+
+    # Шаблоны генераторов
+    TEMPLATES_DIR: str = "app/templates"
+    TEMPLATES_PRODUCTION_MODE: bool = False  # Прекомпиляция при старте, без проверки mtime на каждом вызове
+    TEMPLATES_BYTECODE_CACHE_DIR: Optional[str] = None  # Каталог для кэша байткода Jinja (опционально)
+
+    # Кэш результатов рендеринга /generate/*
+    RENDER_CACHE_ENABLED: bool = True
+    RENDER_CACHE_MAX_ENTRIES: int = 1024
+    RENDER_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    RENDER_CACHE_TTL_SECONDS: int = 3600
+
+    # Потоковая отдача больших docker-compose / Dockerfile
+    RENDER_STREAMING_ENABLED: bool = False
+    RENDER_STREAM_THRESHOLD_BYTES: int = 256 * 1024  # Вывод меньше порога отдаётся обычным Response
+
+    # Буфер учёта запросов с отложенной записью в users.requests_this_month
+    USAGE_BUFFER_ENABLED: bool = False
+    USAGE_BUFFER_FLUSH_INTERVAL_MS: int = 500
+    USAGE_BUFFER_FLUSH_EVENTS: int = 200
+    USAGE_BUFFER_RESEED_SECONDS: int = 60  # Как часто перечитывать счётчик пользователя из БД
+
+    # Кэш каталога сервисов (/services, /api/templates)
+    CATALOGUE_CACHE_ENABLED: bool = True
+    CATALOGUE_CACHE_SIGNAL_FILE: Optional[str] = None  # Общий файл-сигнал инвалидации для нескольких воркеров
+
+    # Сжатие configurations.config_data (zlib со словарём, см. app/database/compression.py)
+    CONFIG_COMPRESSION_ENABLED: bool = True  # Чтение сжатых строк работает всегда
+    CONFIG_COMPRESSION_MIN_BYTES: int = 256  # Короткие конфиги хранятся как есть
+
+    # История версий конфигураций
+    CONFIG_REVISION_SNAPSHOT_EVERY: int = 10  # Полный снимок раз в N версий, между ними — дельты
+
+    # Пакетная выгрузка/загрузка конфигураций (NDJSON)
+    CONFIG_EXPORT_CHUNK_ROWS: int = 500  # Строк на одно чтение курсора и один блок ответа
+    CONFIG_IMPORT_BATCH_SIZE: int = 500  # Строк на одну транзакцию импорта
+    CONFIG_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+    CONFIG_IMPORT_MAX_ERRORS: int = 1000  # Сколько ошибок по строкам вернуть в ответе
+
+    # Полнотекстовый поиск по конфигурациям (FTS5 в SQLite, tsvector + GIN в PostgreSQL)
+    CONFIG_SEARCH_ENABLED: bool = True  # Индекс хранит несжатую копию текста
+    CONFIG_SEARCH_MAX_CANDIDATES: int = 1000  # Ранжируются только столько самых новых совпадений
+
+    # Сравнение конфигураций (app/utils/text_diff.py)
+    DIFF_MAX_EDITS: int = 200  # Потолок правок для точного diff и дельт истории; дальше — по уникальным строкам
+    DIFF_MAX_LINES: int = 5000  # Длиннее — вывод обрезается с truncated=true
+
+    # Иконки шаблонов
+    ICON_MAX_BYTES: int = 512 * 1024  # Загрузка прерывается с 413, как только поток превысит лимит
+    ICON_THUMBNAIL_SIZE: int = 64  # Сторона миниатюры в пикселях (нужен Pillow); 0 — не строить
+
+    # Пакетная генерация
+    BATCH_MAX_ITEMS: int = 20
+    BATCH_MAX_WORKERS: int = 4
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,29 @@
+# app/configuration_diff.py
+"""
+Сравнение конфигураций: текстовый unified diff с ограниченной стоимостью
+(app/utils/text_diff.py) и полевой diff по параметрам генератора, если они есть у обеих сторон.
+"""
+from fastapi import HTTPException
+
+from app.config import settings
+from app.generators import parse_generator_input
+from app.utils.text_diff import unified_diff, diff_fields
+
+
+def parse_right_config(service: str, data: dict):
+    """ Проверяет новые параметры для сервиса левой стороны; 400 при ошибке валидации """
+    generator, config, error = parse_generator_input(service, data)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
+    return generator, config
+
+
+def build_diff(left: dict, right: dict, context: int) -> dict:
+    """ left/right — {"name", "text", "data"} (см. configuration_crud.get_configuration_text) """
+    result = unified_diff(
+        left["text"], right["text"], left["name"], right["name"],
+        context=context, max_edits=settings.DIFF_MAX_EDITS, max_lines=settings.DIFF_MAX_LINES,
+    )
+    if left["data"] is not None and right["data"] is not None:
+        result["fields"] = diff_fields(left["data"], right["data"])
+    return result
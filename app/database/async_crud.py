@@ -0,0 +1,53 @@
+# app/database/async_crud.py
+"""
+Асинхронные версии CRUD-функций.
+
+Логика запросов не дублируется: каждая функция выполняет синхронную версию через
+AsyncSession.run_sync, поэтому ввод-вывод идёт через асинхронный драйвер, а поток
+из пула Starlette не занимается.
+"""
+from functools import wraps
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import crud, configuration_crud, configuration_search, service_template_crud
+
+
+def _async_variant(func):
+    @wraps(func)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(func, *args, **kwargs)
+    return wrapper
+
+
+# app/database/crud.py
+get_user_by_email = _async_variant(crud.get_user_by_email)
+create_user = _async_variant(crud.create_user)
+increment_user_requests = _async_variant(crud.increment_user_requests)
+store_verification_code = _async_variant(crud.store_verification_code)
+get_verification_code = _async_variant(crud.get_verification_code)
+delete_verification_code = _async_variant(crud.delete_verification_code)
+
+# app/database/configuration_crud.py
+create_configuration = _async_variant(configuration_crud.create_configuration)
+get_configurations_by_user = _async_variant(configuration_crud.get_configurations_by_user)
+get_configuration = _async_variant(configuration_crud.get_configuration)
+get_configuration_etag = _async_variant(configuration_crud.get_configuration_etag)
+get_configurations_etag = _async_variant(configuration_crud.get_configurations_etag)
+update_configuration = _async_variant(configuration_crud.update_configuration)
+delete_configuration = _async_variant(configuration_crud.delete_configuration)
+get_configuration_revisions = _async_variant(configuration_crud.get_configuration_revisions)
+get_configuration_revision = _async_variant(configuration_crud.get_configuration_revision)
+restore_configuration_revision = _async_variant(configuration_crud.restore_configuration_revision)
+get_configuration_text = _async_variant(configuration_crud.get_configuration_text)
+patch_configuration_input = _async_variant(configuration_crud.patch_configuration_input)
+
+# app/database/configuration_search.py
+search_configurations = _async_variant(configuration_search.search_configurations)
+
+# app/database/service_template_crud.py
+create_service_template = _async_variant(service_template_crud.create_service_template)
+get_all_service_templates = _async_variant(service_template_crud.get_all_service_templates)
+get_service_template_by_id = _async_variant(service_template_crud.get_service_template_by_id)
+update_service_template = _async_variant(service_template_crud.update_service_template)
+delete_service_template = _async_variant(service_template_crud.delete_service_template)
@@ -0,0 +1,29 @@
+# app/database/async_database.py
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.config import settings
+
+# Драйверы для асинхронного режима: SQLite -> aiosqlite, PostgreSQL -> asyncpg
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url() -> str:
+    if settings.SQLALCHEMY_ASYNC_DATABASE_URL:
+        return settings.SQLALCHEMY_ASYNC_DATABASE_URL
+
+    scheme, sep, rest = settings.SQLALCHEMY_DATABASE_URL.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+async_engine = create_async_engine(get_async_database_url(), pool_pre_ping=True)
+# expire_on_commit=False: после commit объекты остаются читаемыми без повторного (синхронного) запроса
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+
+async def get_async_db() -> AsyncSession:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,149 @@
+# app/database/catalogue_cache.py
+import bisect
+import logging
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+
+from app.database.models import ServiceTemplate
+from app.schemas.service_template import ServiceTemplateResponse
+from app.utils.cached_response import CachedJSON, serialize_json, cached_json_response
+from app.utils.pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Поля шаблона в режиме summary
+TEMPLATE_SUMMARY_FIELDS = ("id", "name", "file_extension", "icon_url")
+
+# Каталог меняется только из админки: клиент может кэшировать, но обязан перепроверять ETag
+CACHE_CONTROL = "no-cache"
+
+
+class CatalogueSnapshot:
+    """ Готовые ответы /services и /api/templates, собранные из одного чтения service_templates """
+
+    def __init__(self, templates):
+        fields = list(ServiceTemplateResponse.__fields__)
+        templates = sorted(templates, key=lambda tpl: tpl.id)  # Порядок по id — ключ для курсора
+        self.templates = [{field: getattr(tpl, field) for field in fields} for tpl in templates]
+        self.ids = [tpl["id"] for tpl in self.templates]
+        self.services = CachedJSON(serialize_json([
+            {
+                "id": tpl["id"],
+                "name": tpl["name"],
+                "description": tpl["description"],
+                "file_extension": tpl["file_extension"],
+                "icon_url": tpl["icon_url"],
+            }
+            for tpl in self.templates
+        ]))
+        self.template_list = CachedJSON(serialize_json(self.templates))
+        self.by_id = {tpl["id"]: CachedJSON(serialize_json(tpl)) for tpl in self.templates}
+        self.icon_hashes = {tpl.id: tpl.icon_hash for tpl in templates}  # Для 304 на иконки без БД
+
+
+class ServiceCatalogue:
+    """
+    Кэш каталога сервисов в памяти процесса.
+
+    Снимок строится при первом запросе после старта или инвалидации; дальше /services и
+    /api/templates отдаются без обращения к БД. Инвалидирует его service_template_crud после
+    create/update/delete (загрузка иконки идёт через update).
+
+    Другие воркеры узнают об изменении по сигнальному файлу signal_file: invalidate()
+    атомарно перезаписывает его, а каждый запрос сравнивает (inode, mtime, size) с тем, что
+    было при сборке снимка — это один stat() без обращения к БД. Без signal_file
+    инвалидация действует только внутри процесса.
+    """
+
+    def __init__(self, session_factory, load_templates, signal_file: str | None = None, enabled: bool = True):
+        self._session_factory = session_factory
+        self._load_templates = load_templates
+        self.signal_file = signal_file
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_signal = None
+        self._generation = 0
+        self.builds = 0
+
+    def invalidate(self):
+        """ Сбрасывает снимок в этом процессе и сигнализирует остальным воркерам """
+        with self._lock:
+            self._generation += 1
+            self._snapshot = None
+        if self.signal_file:
+            try:
+                tmp_path = f"{self.signal_file}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as signal:
+                    signal.write(f"{time.time_ns()} {os.getpid()}\n")
+                os.replace(tmp_path, self.signal_file)  # Новый inode — изменение видно даже при грубом mtime
+            except OSError:
+                logger.exception("Не удалось записать сигнал инвалидации каталога %s", self.signal_file)
+
+    def _read_signal(self):
+        if not self.signal_file:
+            return None
+        try:
+            stat = os.stat(self.signal_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def get(self) -> CatalogueSnapshot:
+        signal = self._read_signal()
+        with self._lock:
+            snapshot, generation = self._snapshot, self._generation
+            if snapshot is not None and self._snapshot_signal == signal:
+                return snapshot
+
+        db = self._session_factory()
+        try:
+            snapshot = CatalogueSnapshot(self._load_templates(db))
+        finally:
+            db.close()
+
+        with self._lock:
+            self.builds += 1
+            # Снимок, собранный во время инвалидации, может быть устаревшим — не сохраняем его
+            if self.enabled and generation == self._generation:
+                self._snapshot, self._snapshot_signal = snapshot, signal
+        return snapshot
+
+    def services_response(self, request: Request) -> Response:
+        return cached_json_response(request, self.get().services, CACHE_CONTROL)
+
+    def templates_response(self, request: Request) -> Response:
+        return cached_json_response(request, self.get().template_list, CACHE_CONTROL)
+
+    def templates_page(self, limit: int | None, cursor: str | None, summary: bool) -> tuple[list, str | None]:
+        """ Keyset-страница списка шаблонов прямо из снимка, без обращения к БД """
+        snapshot = self.get()
+        start = 0
+        if cursor:
+            after_id, = decode_cursor(cursor, (ServiceTemplate.id,))
+            start = bisect.bisect_right(snapshot.ids, after_id)
+        end = len(snapshot.templates) if limit is None else start + limit
+
+        page = snapshot.templates[start:end]
+        next_cursor = encode_cursor([page[-1]["id"]]) if page and end < len(snapshot.templates) else None
+        if summary:
+            page = [{field: tpl[field] for field in TEMPLATE_SUMMARY_FIELDS} for tpl in page]
+        return page, next_cursor
+
+    def template_response(self, request: Request, template_id: int) -> Response | None:
+        entry = self.get().by_id.get(template_id)
+        return cached_json_response(request, entry, CACHE_CONTROL) if entry else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "cached": self._snapshot is not None,
+                "templates": len(self._snapshot.templates) if self._snapshot else None,
+                "builds": self.builds,
+                "signal_file": self.signal_file,
+            }
@@ -0,0 +1,81 @@
+# app/database/compression.py
+"""
+Прозрачное сжатие текстовых колонок (config_data).
+
+Значение сжимается zlib с общим словарём (compression_dict_v1.txt — типичные фрагменты
+конфигов, которые выдают наши шаблоны), кодируется в base64 и хранится в той же Text-колонке
+с маркером формата "@zd1:". Строки без маркера читаются как есть, поэтому старые данные
+продолжают работать, а перевести их в сжатый вид можно командой
+python -m app.database.maintenance compress-configurations.
+
+Словарь должен оставаться неизменным, пока в БД есть строки с его маркером: новый словарь —
+новый файл и новый маркер (@zd2: и т.д.), старый оставляем для чтения.
+"""
+import base64
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from sqlalchemy import Text
+from sqlalchemy.types import TypeDecorator
+
+from app.config import settings
+
+MARKER = "@zd1:"
+MARKER_PREFIX = "@zd"  # Несжатые значения с таким началом тоже сжимаем, чтобы не спутать их со сжатыми
+DICTIONARY_PATHS = {
+    MARKER: Path(__file__).with_name("compression_dict_v1.txt"),
+}
+
+
+@lru_cache(maxsize=None)
+def _dictionary(marker: str) -> bytes:
+    return DICTIONARY_PATHS[marker].read_bytes()
+
+
+def is_compressed(value: str | None) -> bool:
+    return value is not None and value.startswith(MARKER_PREFIX) and value[:value.find(":") + 1] in DICTIONARY_PATHS
+
+
+def compress_text(value: str | None, min_bytes: int | None = None) -> str | None:
+    """
+    Сжимает исходный текст, если он не меньше min_bytes и сжатие действительно выигрывает место.
+    Текст, начинающийся с "@zd", сжимается всегда — иначе при чтении его приняли бы за сжатый.
+    """
+    if value is None:
+        return value
+    min_bytes = settings.CONFIG_COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes
+    must_compress = value.startswith(MARKER_PREFIX)
+    raw = value.encode("utf-8")
+    if len(raw) < min_bytes and not must_compress:
+        return value
+
+    compressor = zlib.compressobj(level=9, zdict=_dictionary(MARKER))
+    packed = MARKER + base64.b64encode(compressor.compress(raw) + compressor.flush()).decode("ascii")
+    if len(packed) >= len(raw) and not must_compress:
+        return value
+    return packed
+
+
+def decompress_text(value: str | None) -> str | None:
+    if not is_compressed(value):
+        return value
+    marker, payload = value[:value.find(":") + 1], value[value.find(":") + 1:]
+    decompressor = zlib.decompressobj(zdict=_dictionary(marker))
+    raw = decompressor.decompress(base64.b64decode(payload)) + decompressor.flush()
+    return raw.decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """ Text, который пишется сжатым (если включено CONFIG_COMPRESSION_ENABLED) и всегда читается прозрачно """
+
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if not settings.CONFIG_COMPRESSION_ENABLED and not (value or "").startswith(MARKER_PREFIX):
+            return value
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
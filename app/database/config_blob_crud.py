@@ -0,0 +1,90 @@
+# app/database/config_blob_crud.py
+# Содержимое конфигураций, адресуемое по sha256: одинаковые тексты хранятся один раз,
+# ссылки (configurations.blob_hash, снимки в истории версий) учитываются в ref_count.
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import update, delete, insert, select, bindparam
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database.models import ConfigBlob
+
+
+def config_hash(config_data: str) -> str:
+    return hashlib.sha256(config_data.encode("utf-8")).hexdigest()
+
+def acquire_config_blob(db: Session, config_data: str, refs: int = 1) -> str:
+    """
+    Берёт refs ссылок на содержимое в config_blobs: если такие байты уже сохранены, только
+    увеличивает ref_count, иначе вставляет новую запись. Возвращает хэш. Коммит — за вызывающим.
+    """
+    blob_hash = config_hash(config_data)
+    for _ in range(2):
+        bumped = db.execute(
+            update(ConfigBlob)
+            .where(ConfigBlob.hash == blob_hash)
+            .values(ref_count=ConfigBlob.ref_count + refs)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if bumped:
+            return blob_hash
+        try:
+            with db.begin_nested():
+                db.add(ConfigBlob(
+                    hash=blob_hash, data=config_data, size=len(config_data.encode("utf-8")), ref_count=refs
+                ))
+            return blob_hash
+        except IntegrityError:
+            continue  # Те же байты только что вставил параллельный запрос — повторяем UPDATE
+    raise RuntimeError(f"Не удалось сохранить содержимое конфигурации {blob_hash}")
+
+def acquire_config_blobs(db: Session, refs: dict[str, int]) -> dict[str, str]:
+    """
+    Пакетный acquire_config_blob для {текст: число ссылок}: один SELECT, один UPDATE (executemany)
+    и один INSERT (executemany) на всю пачку. Возвращает {текст: хэш}. Коммит — за вызывающим.
+    """
+    hashes = {config_data: config_hash(config_data) for config_data in refs}
+    existing = set(db.scalars(select(ConfigBlob.hash).where(ConfigBlob.hash.in_(list(hashes.values())))))
+    connection = db.connection()
+
+    bumps = [{"b_hash": blob_hash, "b_refs": refs[data]} for data, blob_hash in hashes.items() if blob_hash in existing]
+    if bumps:
+        connection.execute(
+            update(ConfigBlob.__table__)
+            .where(ConfigBlob.hash == bindparam("b_hash"))
+            .values(ref_count=ConfigBlob.ref_count + bindparam("b_refs")),
+            bumps,
+        )
+
+    new = [(data, blob_hash) for data, blob_hash in hashes.items() if blob_hash not in existing]
+    if new:
+        try:
+            with db.begin_nested():
+                connection.execute(insert(ConfigBlob.__table__), [
+                    {"hash": blob_hash, "data": data, "size": len(data.encode("utf-8")), "ref_count": refs[data],
+                     "created_at": datetime.utcnow()}
+                    for data, blob_hash in new
+                ])
+        except IntegrityError:
+            # Часть содержимого параллельно вставил другой запрос — добираем по одному
+            for data, _ in new:
+                acquire_config_blob(db, data, refs[data])
+    return hashes
+
+def release_config_blob(db: Session, blob_hash: str | None):
+    """ Отпускает ссылку; содержимое удаляется, когда на него больше никто не ссылается """
+    if blob_hash is None:
+        return
+    db.execute(
+        update(ConfigBlob)
+        .where(ConfigBlob.hash == blob_hash)
+        .values(ref_count=ConfigBlob.ref_count - 1)
+        .execution_options(synchronize_session=False)
+    )
+    # Условие на ref_count: параллельный acquire мог успеть взять новую ссылку
+    db.execute(
+        delete(ConfigBlob)
+        .where(ConfigBlob.hash == blob_hash, ConfigBlob.ref_count <= 0)
+        .execution_options(synchronize_session=False)
+    )
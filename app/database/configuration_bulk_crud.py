@@ -0,0 +1,193 @@
+# app/database/configuration_bulk_crud.py
+"""
+Пакетная выгрузка и загрузка конфигураций пользователя в формате NDJSON.
+
+Выгрузка читает строки курсором на стороне сервера (yield_per) пачками и отдаёт их по мере
+чтения, поэтому память не зависит от числа конфигураций. Загрузка идёт пачками: строки пачки
+валидируются, записи, которые у пользователя уже есть (то же имя, сервис и текст или параметры),
+пропускаются — повторный импорт той же выгрузки ничего не дублирует; места в лимите подписки резервируются одним обновлением на всю пачку,
+конфигурации вставляются одним INSERT ... VALUES, и пачка коммитится отдельно.
+"""
+import json
+
+from pydantic import ValidationError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.database.config_blob_crud import acquire_config_blobs, config_hash
+from app.database.configuration_crud import (
+    SUBSCRIPTION_LIMITS, DEFAULT_SUBSCRIPTION_LIMIT, subscription_limit_expr, _saved_input, _template_version
+)
+from app.database.configuration_search import index_configurations
+from app.database.models import Configuration, ConfigurationRevision, ConfigBlob, User
+from app.generators import render_saved_input
+from app.schemas.configuration import ConfigurationCreate
+from app.utils.ndjson import dumps_line
+
+EXPORT_COLUMNS = (
+    Configuration.id, Configuration.service, Configuration.config_name, ConfigBlob.data.label("blob_data"),
+    Configuration.inline_data, Configuration.config_input, Configuration.template_version,
+    Configuration.created_at, Configuration.updated_at,
+)
+
+
+def _export_record(row) -> dict:
+    record = {"id": row.id, "service": row.service, "config_name": row.config_name}
+    if row.config_input is not None:
+        # Конфигурация, сохранённая параметрами, выгружается параметрами — без рендеринга
+        record["config_input"] = row.config_input
+        record["template_version"] = row.template_version
+    else:
+        record["config_data"] = row.blob_data if row.blob_data is not None else row.inline_data
+    record["created_at"] = row.created_at
+    record["updated_at"] = row.updated_at
+    return record
+
+def export_configurations(db: Session, user_id: int, chunk_rows: int):
+    """ Все конфигурации пользователя блоками NDJSON (по блоку на chunk_rows строк) """
+    result = db.execute(
+        select(*EXPORT_COLUMNS)
+        .outerjoin(ConfigBlob, ConfigBlob.hash == Configuration.blob_hash)
+        .where(Configuration.user_id == user_id)
+        .order_by(Configuration.id)
+        .execution_options(yield_per=chunk_rows)
+    )
+    for rows in result.partitions():
+        yield "".join(dumps_line(_export_record(row)) for row in rows)
+
+
+def reserve_configuration_slots(db: Session, user_id: int, wanted: int) -> int:
+    """
+    Резервирует до wanted мест в лимите конфигураций; возвращает, сколько удалось. Счётчик
+    меняется сравнением-и-записью: параллельное сохранение заставит перечитать его и повторить.
+    """
+    while True:
+        row = db.query(User.configurations_count, subscription_limit_expr().label("limit")).filter(
+            User.id == user_id
+        ).first()
+        if row is None:
+            return 0
+        granted = max(0, min(wanted, row.limit - row.configurations_count))
+        if granted == 0:
+            return 0
+        reserved = db.execute(
+            update(User)
+            .where(User.id == user_id, User.configurations_count == row.configurations_count)
+            .values(configurations_count=User.configurations_count + granted)
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+        if reserved:
+            return granted
+
+def _content_key(blob_hash: str | None, config_input: dict | None) -> tuple:
+    if config_input is not None:
+        return "input", json.dumps(config_input, sort_keys=True, ensure_ascii=False)
+    return "data", blob_hash
+
+def _skip_existing(db: Session, user_id: int, valid: list) -> tuple[list, int]:
+    """
+    Отбрасывает записи, которые create_configuration счёл бы повтором: у пользователя уже есть
+    конфигурация с тем же сервисом, именем и текстом (по хэшу) или параметрами — в базе или выше
+    в этой же пачке. Возвращает (оставшиеся записи, сколько пропущено).
+    """
+    rows = db.query(
+        Configuration.service, Configuration.config_name, Configuration.blob_hash, Configuration.config_input
+    ).filter(
+        Configuration.user_id == user_id,
+        Configuration.config_name.in_({config.config_name for _, config, _ in valid}),
+    )
+    seen = {
+        (row.service, row.config_name, _content_key(row.blob_hash, row.config_input))
+        for row in rows if row.blob_hash is not None or row.config_input is not None
+    }
+    kept = []
+    for item in valid:
+        _, config, config_input = item
+        blob_hash = config_hash(config.config_data) if config_input is None else None
+        key = (config.service, config.config_name, _content_key(blob_hash, config_input))
+        if key not in seen:
+            seen.add(key)
+            kept.append(item)
+    return kept, len(valid) - len(kept)
+
+def import_configurations_batch(
+    db: Session, user_id: int, items: list[tuple[int, dict]]
+) -> tuple[int, int, list[dict]]:
+    """
+    Импортирует пачку записей [(номер строки, dict)] одной транзакцией.
+    Возвращает (сколько импортировано, сколько пропущено как уже существующие, ошибки [{"line", "error"}]).
+    """
+    valid, errors = [], []
+    for line_no, record in items:
+        try:
+            config = ConfigurationCreate.parse_obj(record)
+            if (config.config_data is None) == (config.config_input is None):
+                raise ValueError("Нужно передать либо config_data, либо config_input")
+            config_input = None
+            if config.config_input is not None:
+                config_input = _saved_input(config.service, config.config_input)
+        except ValidationError as e:
+            errors.append({"line": line_no, "error": e.errors(include_url=False, include_context=False)})
+            continue
+        except ValueError as e:
+            errors.append({"line": line_no, "error": str(e)})
+            continue
+        valid.append((line_no, config, config_input))
+    if not valid:
+        return 0, 0, errors
+
+    valid, skipped = _skip_existing(db, user_id, valid)
+    if not valid:
+        db.rollback()
+        return 0, skipped, errors
+
+    granted = reserve_configuration_slots(db, user_id, len(valid))
+    if granted < len(valid):
+        level = db.query(User.subscription_level).filter(User.id == user_id).scalar()
+        max_configs = SUBSCRIPTION_LIMITS.get(level, DEFAULT_SUBSCRIPTION_LIMIT)
+        message = f"Превышен лимит конфигураций ({max_configs}) для уровня подписки {level}"
+        errors.extend({"line": line_no, "error": message} for line_no, _, _ in valid[granted:])
+        valid = valid[:granted]
+    if not valid:
+        db.rollback()
+        return 0, skipped, errors
+
+    # Текст каждой новой конфигурации: он же первая версия в истории
+    texts = [
+        config.config_data if config_input is None else render_saved_input(config.service, config_input)
+        for _, config, config_input in valid
+    ]
+    # Ссылки на config_blobs: конфигурация с текстом (кроме сохранённой параметрами) и её версия 1
+    refs = {}
+    for (_, _, config_input), config_data in zip(valid, texts):
+        refs[config_data] = refs.get(config_data, 0) + (1 if config_input is not None else 2)
+    hashes = acquire_config_blobs(db, refs)
+
+    configs = []
+    for (_, config, config_input), config_data in zip(valid, texts):
+        # Одинаковый набор колонок у всех строк — тогда ORM вставляет пачку одним INSERT
+        configs.append(Configuration(
+            user_id=user_id,
+            service=config.service,
+            config_name=config.config_name,
+            blob_hash=hashes[config_data] if config_input is None else None,
+            config_input=config_input,
+            template_version=_template_version(config.service) if config_input is not None else None,
+        ))
+    db.add_all(configs)
+    db.flush()
+
+    db.add_all([
+        ConfigurationRevision(
+            configuration_id=db_config.id, revision=1, blob_hash=hashes[config_data], delta=None,
+            size=len(config_data.encode("utf-8")),
+        )
+        for db_config, config_data in zip(configs, texts)
+    ])
+    index_configurations(db, [
+        {"id": db_config.id, "user_id": user_id, "config_name": db_config.config_name,
+         "service": db_config.service, "body": config_data}
+        for db_config, config_data in zip(configs, texts)
+    ])
+    db.commit()
+    return len(configs), skipped, errors
@@ -1,6 +1,21 @@
 # app/crud/configuration_crud.py
+import hashlib
+import json
+import logging
+from datetime import datetime
+
+from sqlalchemy import update, case
 from sqlalchemy.orm import Session
+from app.database.config_blob_crud import config_hash, acquire_config_blob, release_config_blob
+from app.database.configuration_revision_crud import (
+    record_revision, delete_revisions, get_latest_revision, get_revision_content, list_revisions
+)
+from app.database.configuration_search import index_configuration, unindex_configuration
 from app.database.models import Configuration, User
+from app.generators import GENERATORS, parse_saved_input, render_saved_input
+from app.services import get_template_version
+from app.utils.cached_response import etag_matches
+from app.utils.pagination import keyset_page
 from app.schemas.configuration import ConfigurationCreate, ConfigurationUpdate
 
 ## Лимиты по подпискам
@@ -8,48 +23,354 @@ SUBSCRIPTION_LIMITS = {
     "free": 5,   # Базовый (раньше "basic")
     "paid": 25   # Платный (раньше "paid")
 }
+DEFAULT_SUBSCRIPTION_LIMIT = 5  # Неизвестный уровень считаем "free"
+
+logger = logging.getLogger(__name__)
+
+def subscription_limit_expr():
+    """ SQL-выражение лимита конфигураций по users.subscription_level (см. SUBSCRIPTION_LIMITS) """
+    return case(SUBSCRIPTION_LIMITS, value=User.subscription_level, else_=DEFAULT_SUBSCRIPTION_LIMIT)
+
+class PreconditionFailed(Exception):
+    """ If-Match не совпал: конфигурацию успели изменить. etag — текущий, если он известен """
+
+    def __init__(self, etag: str | None = None):
+        super().__init__("Configuration was modified")
+        self.etag = etag
+
+class ConfigurationConflict(Exception):
+    """ Правку не удалось записать: конфигурацию всё это время параллельно меняли другие запросы """
+
+    def __init__(self):
+        super().__init__("Configuration is being modified concurrently, retry the request")
+
+UPDATE_ATTEMPTS = 3
+_RACED = object()  # Параллельная правка успела раньше — попытку нужно повторить
+
+def _saved_input(service: str, data: dict) -> dict:
+    """ Валидирует параметры генератора; хранятся только поля, заданные пользователем """
+    config = parse_saved_input(service, data)
+    return json.loads(config.json(exclude_unset=True))
+
+def _template_version(service: str) -> str:
+    return get_template_version(GENERATORS[service].template_name)
 
 def create_configuration(db: Session, config: ConfigurationCreate, user_id: int):
-    # Получаем пользователя
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return None  # Можно кинуть HTTPException
+    if (config.config_data is None) == (config.config_input is None):
+        raise ValueError("Нужно передать либо config_data, либо config_input")
+
+    # Повторное сохранение того же самого (двойной клик, повтор запроса) ничего не пишет
+    existing = db.query(Configuration).filter(
+        Configuration.user_id == user_id,
+        Configuration.service == config.service,
+        Configuration.config_name == config.config_name,
+    )
+    if config.config_input is not None:
+        config_input = _saved_input(config.service, config.config_input)
+        existing = next(
+            (c for c in existing.filter(Configuration.config_input.isnot(None)) if c.config_input == config_input), None
+        )
+    else:
+        existing = existing.filter(Configuration.blob_hash == config_hash(config.config_data)).first()
+    if existing:
+        return existing
 
-    # Определяем лимит для пользователя
-    user_configs_count = db.query(Configuration).filter(Configuration.user_id == user_id).count()
-    max_configs = SUBSCRIPTION_LIMITS.get(user.subscription_level, 5)  # По умолчанию считаем, что "free"
+    # Проверка лимита и резервирование места — одним условным UPDATE: строка пользователя
+    # блокируется до коммита, поэтому параллельные сохранения не проскочат лимит вдвоём
+    reserved = db.execute(
+        update(User)
+        .where(User.id == user_id, User.configurations_count < subscription_limit_expr())
+        .values(configurations_count=User.configurations_count + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
 
-    if user_configs_count >= max_configs:
+    if not reserved:
+        db.rollback()
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            return None  # Можно кинуть HTTPException
+        max_configs = SUBSCRIPTION_LIMITS.get(user.subscription_level, DEFAULT_SUBSCRIPTION_LIMIT)
         raise ValueError(f"Превышен лимит конфигураций ({max_configs}) для уровня подписки {user.subscription_level}")
 
-    # Если лимит не превышен, создаем конфигурацию
-    db_config = Configuration(**config.dict(), user_id=user_id)
+    # Лимит не превышен — создаем конфигурацию в той же транзакции; одинаковое содержимое хранится один раз
+    db_config = Configuration(user_id=user_id, service=config.service, config_name=config.config_name)
+    if config.config_input is not None:
+        db_config.config_input = config_input
+        db_config.template_version = _template_version(config.service)
+    else:
+        db_config.blob_hash = acquire_config_blob(db, config.config_data)
     db.add(db_config)
+    db.flush()
+    config_data = db_config.config_data
+    record_revision(db, db_config, config_data)
+    index_configuration(db, db_config, config_data)
     db.commit()
     db.refresh(db_config)
     return db_config
 
 
-def get_configurations_by_user(db: Session, user_id: int):
-    return db.query(Configuration).filter(Configuration.user_id == user_id).all()
+# Колонки для режима summary: всё, кроме config_data
+CONFIGURATION_SUMMARY_COLUMNS = (
+    Configuration.id, Configuration.user_id, Configuration.service, Configuration.config_name,
+    Configuration.created_at, Configuration.updated_at,
+)
+
+def get_configurations_by_user(db: Session, user_id: int, limit: int | None = None, cursor: str | None = None,
+                               summary: bool = False):
+    """
+    Конфигурации пользователя по возрастанию id с keyset-пагинацией; возвращает (список, next_cursor).
+    В режиме summary выбираются только лёгкие колонки (без config_data), строки отдаются словарями.
+    """
+    if summary:
+        query = db.query(*CONFIGURATION_SUMMARY_COLUMNS)
+    else:
+        query = db.query(Configuration)
+    query = query.filter(Configuration.user_id == user_id)
+
+    configs, next_cursor = keyset_page(query, (Configuration.id,), cursor, limit)
+    if summary:
+        configs = [row._asdict() for row in configs]
+    else:
+        attach_fallback_data(db, configs)
+    return configs, next_cursor
+
+def attach_fallback_data(db: Session, configs) -> None:
+    """
+    Сохранённые параметры могли перестать проходить проверку после обновления генератора или шаблона.
+    Такие конфигурации отдаются текстом последней версии из истории: он подгружается здесь, пока
+    сессия открыта (в асинхронном режиме ответ сериализуется уже вне run_sync).
+    """
+    for config in configs:
+        if config.config_input is None:
+            continue
+        try:
+            render_saved_input(config.service, config.config_input)
+        except ValueError as e:
+            found = get_revision_content(db, config.id, get_latest_revision(db, config.id))
+            config.fallback_data = found[1] if found else None
+            logger.warning("Конфигурация %s не рендерится (%s), отдаётся последняя версия из истории", config.id, e)
 
 def get_configuration(db: Session, config_id: int, user_id: int):
-    return db.query(Configuration).filter(Configuration.id == config_id, Configuration.user_id == user_id).first()
+    config = db.query(Configuration).filter(Configuration.id == config_id, Configuration.user_id == user_id).first()
+    if config:
+        attach_fallback_data(db, [config])
+    return config
+
+
+# ETag считается без чтения содержимого: любая правка меняет updated_at, а текст из параметров
+# генератора зависит ещё и от текущей версии шаблона (шаблон меняется без правки конфигурации)
+CONFIGURATION_VERSION_COLUMNS = (
+    Configuration.id, Configuration.service, Configuration.updated_at, Configuration.blob_hash,
+    Configuration.config_input,
+)
+
+def _version_key(config) -> str:
+    key = f"{config.id}:{config.updated_at.isoformat()}"
+    if config.blob_hash is not None:
+        return f"{key}:{config.blob_hash}"
+    if config.config_input is not None:
+        return f"{key}:{json.dumps(config.config_input, sort_keys=True)}:{_template_version(config.service)}"
+    return key
+
+def _etag(*parts: str) -> str:
+    return '"' + hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:32] + '"'
 
-def update_configuration(db: Session, config_id: int, user_id: int, config_update: ConfigurationUpdate):
+def configuration_etag(config) -> str:
+    """ Сильный ETag конфигурации (ORM-объект или строка с CONFIGURATION_VERSION_COLUMNS) """
+    return _etag(_version_key(config))
+
+def configurations_etag(configs: list, next_cursor: str | None, summary: bool = False) -> str:
+    """ ETag страницы списка: состав, версии строк и курсор следующей страницы """
+    if summary:
+        keys = [f"{config['id']}:{config['updated_at'].isoformat()}" for config in configs]
+    else:
+        keys = [_version_key(config) for config in configs]
+    return _etag("summary" if summary else "full", next_cursor or "", *keys)
+
+def get_configuration_etag(db: Session, config_id: int, user_id: int) -> str | None:
+    """ ETag конфигурации одним лёгким запросом (для If-None-Match); None — если её нет """
+    row = db.query(*CONFIGURATION_VERSION_COLUMNS).filter(
+        Configuration.id == config_id, Configuration.user_id == user_id
+    ).first()
+    return configuration_etag(row) if row else None
+
+def get_configurations_etag(db: Session, user_id: int, limit: int | None = None, cursor: str | None = None,
+                            summary: bool = False) -> str:
+    """ ETag той же страницы, что вернёт get_configurations_by_user, без чтения содержимого """
+    columns = (Configuration.id, Configuration.updated_at) if summary else CONFIGURATION_VERSION_COLUMNS
+    rows, next_cursor = keyset_page(
+        db.query(*columns).filter(Configuration.user_id == user_id), (Configuration.id,), cursor, limit
+    )
+    if summary:
+        rows = [row._asdict() for row in rows]
+    return configurations_etag(rows, next_cursor, summary)
+
+def update_configuration(db: Session, config_id: int, user_id: int, config_update: ConfigurationUpdate,
+                         if_match: str | None = None):
+    """
+    if_match — значение заголовка If-Match: правка применяется, только если конфигурация
+    не менялась с тех пор, как клиент получил этот ETag, иначе PreconditionFailed.
+    Без If-Match побеждает последняя правка: проигравшая гонку перечитывает конфигурацию и
+    повторяется (до UPDATE_ATTEMPTS раз, затем ConfigurationConflict).
+    """
+    for _ in range(UPDATE_ATTEMPTS):
+        result = _update_configuration(db, config_id, user_id, config_update, if_match)
+        if result is not _RACED:
+            return result
+    raise ConfigurationConflict()
+
+def _update_configuration(db: Session, config_id: int, user_id: int, config_update: ConfigurationUpdate,
+                          if_match: str | None):
     db_config = get_configuration(db, config_id, user_id)
     if not db_config:
         return None
-    for field, value in config_update.dict(exclude_unset=True).items():
+    if if_match is not None and not etag_matches(if_match, configuration_etag(db_config)):
+        raise PreconditionFailed(configuration_etag(db_config))
+    changes = config_update.dict(exclude_unset=True)
+    config_data = changes.pop("config_data", None)
+    config_input = changes.pop("config_input", None)
+    if config_data is not None and config_input is not None:
+        raise ValueError("Нужно передать либо config_data, либо config_input")
+    changes = {field: value for field, value in changes.items() if getattr(db_config, field) != value}
+
+    if config_input is not None:
+        config_input = _saved_input(db_config.service, config_input)
+        content_changed = config_input != db_config.config_input
+    elif config_data is not None:
+        content_changed = db_config.blob_hash is None or config_hash(config_data) != db_config.blob_hash
+    else:
+        content_changed = False
+    if not changes and not content_changed:
+        return db_config  # Сохранение того же самого — ничего не пишем и не трогаем updated_at
+
+    # Условный UPDATE по прочитанному updated_at: из параллельных правок одной версии проходит одна.
+    # Иначе обе посчитали бы дельту от одного и того же текста и записали одну и ту же следующую
+    # версию истории (IntegrityError), а с If-Match — проскочила бы правка по устаревшему ETag
+    claimed = db.execute(
+        update(Configuration)
+        .where(Configuration.id == db_config.id, Configuration.updated_at == db_config.updated_at)
+        .values(updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    ).rowcount == 1
+    if not claimed:
+        db.rollback()
+        if if_match is not None:
+            raise PreconditionFailed()
+        return _RACED
+
+    new_data = None
+    if content_changed:
+        # Старое содержимое не теряется: каждая правка — новая версия в истории
+        previous_data = db_config.config_data
+        old_hash = db_config.blob_hash
+        if config_input is not None:
+            db_config.config_input = config_input
+            db_config.template_version = _template_version(db_config.service)
+            db_config.blob_hash = None
+        else:
+            db_config.config_input = None
+            db_config.template_version = None
+            db_config.blob_hash = acquire_config_blob(db, config_data)
+        db_config.inline_data = None
+        new_data = config_data if config_data is not None else db_config.config_data
+        record_revision(db, db_config, new_data, previous_data=previous_data)
+        db.flush()  # Строка должна перестать ссылаться на старое содержимое до его удаления (FK)
+        release_config_blob(db, old_hash)
+    for field, value in changes.items():
         setattr(db_config, field, value)
+    if content_changed or "config_name" in changes:
+        index_configuration(db, db_config, new_data if new_data is not None else db_config.config_data)
     db.commit()
     db.refresh(db_config)
     return db_config
 
+def _merge_patch(target, patch):
+    """ JSON Merge Patch (RFC 7386): словари сливаются рекурсивно, null удаляет поле """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = _merge_patch(result.get(key), value)
+    return result
+
+def patch_configuration_input(db: Session, config_id: int, user_id: int, patch: dict):
+    """ Частичная правка сохранённых параметров генератора; текст перерендерится при чтении """
+    db_config = get_configuration(db, config_id, user_id)
+    if not db_config:
+        return None
+    if db_config.config_input is None:
+        raise ValueError("Конфигурация сохранена текстом, параметров генератора у неё нет")
+    merged = _merge_patch(db_config.config_input, patch)
+    return update_configuration(db, config_id, user_id, ConfigurationUpdate(config_input=merged))
+
 def delete_configuration(db: Session, config_id: int, user_id: int):
     db_config = get_configuration(db, config_id, user_id)
     if not db_config:
         return None
+    blob = db_config.blob
+    delete_revisions(db, db_config.id)
+    unindex_configuration(db, db_config.id)
     db.delete(db_config)
+    db.flush()  # Без autoflush DELETE конфигурации иначе уйдёт позже удаления её содержимого (FK)
+    release_config_blob(db, db_config.blob_hash)
+    if blob is not None:
+        db.expunge(blob)  # Удалённая конфигурация возвращается в ответе вместе с содержимым
+    db.execute(
+        update(User)
+        .where(User.id == user_id, User.configurations_count > 0)
+        .values(configurations_count=User.configurations_count - 1)
+        .execution_options(synchronize_session=False)
+    )
     db.commit()
     return db_config
+
+def get_configuration_revisions(db: Session, config_id: int, user_id: int):
+    """ История версий конфигурации пользователя (новые первыми); None — если конфигурации нет """
+    if not get_configuration(db, config_id, user_id):
+        return None
+    return [row._asdict() for row in list_revisions(db, config_id)]
+
+def get_configuration_revision(db: Session, config_id: int, user_id: int, revision: int):
+    if not get_configuration(db, config_id, user_id):
+        return None
+    found = get_revision_content(db, config_id, revision)
+    if not found:
+        return None
+    entry, config_data = found
+    return {"revision": entry.revision, "created_at": entry.created_at, "config_data": config_data}
+
+def get_configuration_text(db: Session, config_id: int, user_id: int, revision: int | None = None):
+    """
+    Содержимое конфигурации (или её версии) для сравнения: {"service", "name", "text", "data"}.
+    data — параметры генератора, если они сохранены; None — если нет конфигурации или версии.
+    """
+    db_config = get_configuration(db, config_id, user_id)
+    if not db_config:
+        return None
+    if revision is None:
+        data = None
+        if db_config.config_input is not None:
+            try:
+                data = parse_saved_input(db_config.service, db_config.config_input).dict()
+            except ValueError:
+                pass  # Параметры устарели — сравнивается только текст
+        return {"service": db_config.service, "name": db_config.config_name, "text": db_config.config_data, "data": data}
+
+    found = get_revision_content(db, config_id, revision)
+    if not found:
+        return None
+    return {"service": db_config.service, "name": f"{db_config.config_name}@{revision}", "text": found[1], "data": None}
+
+def restore_configuration_revision(db: Session, config_id: int, user_id: int, revision: int):
+    """ Делает содержимое версии revision текущим (как новую версию); None — если нет конфигурации или версии """
+    db_config = get_configuration(db, config_id, user_id)
+    if not db_config:
+        return None
+    found = get_revision_content(db, config_id, revision)
+    if not found:
+        return None
+    _, config_data = found
+    return update_configuration(db, config_id, user_id, ConfigurationUpdate(config_data=config_data))
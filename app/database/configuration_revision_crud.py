@@ -0,0 +1,87 @@
+# app/database/configuration_revision_crud.py
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.config_blob_crud import acquire_config_blob, release_config_blob
+from app.database.models import Configuration, ConfigurationRevision, ConfigBlob
+from app.utils.text_delta import make_delta, apply_delta
+
+
+def is_snapshot_revision(revision: int) -> bool:
+    return (revision - 1) % max(settings.CONFIG_REVISION_SNAPSHOT_EVERY, 1) == 0
+
+def get_latest_revision(db: Session, configuration_id: int) -> int:
+    return db.query(func.coalesce(func.max(ConfigurationRevision.revision), 0)).filter(
+        ConfigurationRevision.configuration_id == configuration_id
+    ).scalar()
+
+def record_revision(db: Session, db_config: Configuration, config_data: str, previous_data: str | None = None):
+    """
+    Записывает config_data как новую версию конфигурации. previous_data — содержимое до
+    изменения: если у конфигурации ещё нет истории (сохранена до появления версий), оно
+    становится версией 1. Коммит — за вызывающим.
+    """
+    latest = get_latest_revision(db, db_config.id)
+    if latest == 0 and previous_data is not None:
+        _add_revision(db, db_config.id, 1, previous_data, None)
+        latest = 1
+    _add_revision(db, db_config.id, latest + 1, config_data, previous_data if latest else None)
+
+def _add_revision(db: Session, configuration_id: int, revision: int, config_data: str, previous_data: str | None):
+    entry = ConfigurationRevision(
+        configuration_id=configuration_id, revision=revision, size=len(config_data.encode("utf-8"))
+    )
+    if not is_snapshot_revision(revision) and previous_data is not None:
+        entry.delta = make_delta(previous_data, config_data, settings.DIFF_MAX_EDITS)
+    if entry.delta is None:  # Снимок по расписанию, первая версия или правка, для которой дельта не выгодна
+        entry.blob_hash = acquire_config_blob(db, config_data)
+    db.add(entry)
+    db.flush()
+
+def list_revisions(db: Session, configuration_id: int):
+    return db.query(
+        ConfigurationRevision.revision, ConfigurationRevision.size, ConfigurationRevision.created_at,
+        ConfigurationRevision.blob_hash.isnot(None).label("is_snapshot"),
+    ).filter(
+        ConfigurationRevision.configuration_id == configuration_id
+    ).order_by(ConfigurationRevision.revision.desc()).all()
+
+def get_revision_content(db: Session, configuration_id: int, revision: int) -> tuple[ConfigurationRevision, str] | None:
+    """
+    Восстанавливает текст версии: ближайший снимок не позже неё плюс дельты после него.
+    Одним запросом читается не больше CONFIG_REVISION_SNAPSHOT_EVERY строк истории.
+    """
+    snapshot_revision = db.query(func.max(ConfigurationRevision.revision)).filter(
+        ConfigurationRevision.configuration_id == configuration_id,
+        ConfigurationRevision.revision <= revision,
+        ConfigurationRevision.blob_hash.isnot(None),
+    ).scalar()
+    if snapshot_revision is None:
+        return None
+
+    chain = db.query(ConfigurationRevision, ConfigBlob.data).outerjoin(
+        ConfigBlob, ConfigBlob.hash == ConfigurationRevision.blob_hash
+    ).filter(
+        ConfigurationRevision.configuration_id == configuration_id,
+        ConfigurationRevision.revision.between(snapshot_revision, revision),
+    ).order_by(ConfigurationRevision.revision).all()
+    if not chain or chain[-1][0].revision != revision:
+        return None
+
+    text = chain[0][1]
+    for entry, _ in chain[1:]:
+        text = apply_delta(text, entry.delta)
+    return chain[-1][0], text
+
+def delete_revisions(db: Session, configuration_id: int):
+    """ Удаляет историю конфигурации и отпускает ссылки снимков на config_blobs """
+    snapshots = db.query(ConfigurationRevision.blob_hash).filter(
+        ConfigurationRevision.configuration_id == configuration_id,
+        ConfigurationRevision.blob_hash.isnot(None),
+    ).all()
+    db.query(ConfigurationRevision).filter(
+        ConfigurationRevision.configuration_id == configuration_id
+    ).delete(synchronize_session=False)
+    for (blob_hash,) in snapshots:
+        release_config_blob(db, blob_hash)
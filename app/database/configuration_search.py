@@ -0,0 +1,253 @@
+# app/database/configuration_search.py
+"""
+Полнотекстовый поиск по сохранённым конфигурациям (config_name, service, текст).
+
+Текст конфигураций хранится сжатым и дедуплицированным (config_blobs), поэтому для поиска ведётся
+отдельный индекс configuration_search. Он обновляется в тех же транзакциях, что и сами
+конфигурации (configuration_crud, configuration_bulk_crud), и устроен по-разному для разных СУБД:
+- SQLite: виртуальная таблица FTS5 (rowid = id конфигурации), ранжирование bm25, snippet();
+  владелец — индексируемая колонка owner ("u<id>"), поэтому фильтр по пользователю идёт по индексу;
+- PostgreSQL: таблица с генерируемой колонкой tsvector под GIN-индексом, ts_rank_cd и ts_headline.
+
+Запрос пользователя разбирается на слова (синтаксис FTS наружу не пробрасывается), последнее слово
+ищется как префикс. Страницы — keyset по (оценка, id), курсор отдаётся в X-Next-Cursor.
+Оценка считается не для всех совпадений, а только для CONFIG_SEARCH_MAX_CANDIDATES самых новых:
+иначе широкий запрос (одно частое слово) ранжирует всю выдачу пользователя до LIMIT.
+
+Конфигурации, сохранённые до появления индекса, индексируются при первом поиске пользователя
+(число записей в индексе сверяется с числом его конфигураций); всю базу сразу —
+python -m app.database.maintenance reindex-configurations.
+"""
+import html
+import re
+
+from sqlalchemy import text, column, Float, Integer
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database.models import Configuration
+from app.utils.pagination import encode_cursor, decode_cursor
+
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS configuration_search USING fts5("
+        "owner, config_name, service, body, tokenize='unicode61', prefix='2 3 4 5 6')",
+    ],
+    "postgresql": [
+        "CREATE TABLE IF NOT EXISTS configuration_search ("
+        "configuration_id INTEGER PRIMARY KEY REFERENCES configurations (id) ON DELETE CASCADE, "
+        "user_id INTEGER NOT NULL, "
+        "config_name TEXT NOT NULL, "
+        "service TEXT NOT NULL, "
+        "body TEXT NOT NULL, "
+        "document tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', config_name), 'A') || "
+        "setweight(to_tsvector('simple', service), 'B') || "
+        "setweight(to_tsvector('simple', left(body, 500000)), 'C')) STORED)",
+        "CREATE INDEX IF NOT EXISTS ix_configuration_search_document ON configuration_search USING GIN (document)",
+        "CREATE INDEX IF NOT EXISTS ix_configuration_search_user_id ON configuration_search (user_id)",
+    ],
+}
+
+MAX_QUERY_TERMS = 8
+# Границы совпадений в сниппете: управляющие символы в SQL, <mark> — после экранирования HTML
+_MATCH_START, _MATCH_END = "\x02", "\x03"
+CURSOR_COLUMNS = (column("score", Float), column("id", Integer))
+
+_INDEX_SQL = {
+    "sqlite": [
+        "DELETE FROM configuration_search WHERE rowid = :id",
+        "INSERT INTO configuration_search (rowid, owner, config_name, service, body) "
+        "VALUES (:id, 'u' || :user_id, :config_name, :service, :body)",
+    ],
+    "postgresql": [
+        "INSERT INTO configuration_search (configuration_id, user_id, config_name, service, body) "
+        "VALUES (:id, :user_id, :config_name, :service, :body) "
+        "ON CONFLICT (configuration_id) DO UPDATE SET user_id = excluded.user_id, "
+        "config_name = excluded.config_name, service = excluded.service, body = excluded.body",
+    ],
+}
+
+_UNINDEX_SQL = {
+    "sqlite": "DELETE FROM configuration_search WHERE rowid = :id",
+    "postgresql": "DELETE FROM configuration_search WHERE configuration_id = :id",
+}
+
+_USER_ROWS_SQL = {
+    "sqlite": "configuration_search MATCH :owner",
+    "postgresql": "user_id = :user_id",
+}
+_KEY_COLUMN = {"sqlite": "rowid", "postgresql": "configuration_id"}
+
+# Кандидаты — самые новые совпадения (по id), оценка и сниппет считаются только для них
+_SEARCH_SQL = {
+    "sqlite": """
+        SELECT s.rowid AS id, c.config_name, c.service, c.updated_at,
+               bm25(configuration_search, 0.0, 10.0, 5.0, 1.0) AS score,
+               snippet(configuration_search, 3, char(2), char(3), '…', 16) AS snippet
+        FROM configuration_search AS s
+        JOIN configurations AS c ON c.id = s.rowid
+        WHERE configuration_search MATCH :match AND c.user_id = :user_id
+          AND s.rowid >= (
+              SELECT min(rowid) FROM (
+                  SELECT rowid FROM configuration_search WHERE configuration_search MATCH :match
+                  ORDER BY rowid DESC LIMIT :candidates
+              )
+          ) {after}
+        ORDER BY score, id
+        LIMIT :limit
+    """,
+    "postgresql": """
+        SELECT page.*, ts_headline('simple', page.body, page.query, :headline) AS snippet
+        FROM (
+            SELECT s.configuration_id AS id, c.config_name, c.service, c.updated_at, s.body, s.query,
+                   -ts_rank_cd(s.document, s.query) AS score
+            FROM (
+                SELECT candidate.*, q.query
+                FROM configuration_search AS candidate
+                CROSS JOIN (SELECT to_tsquery('simple', :match) AS query) AS q
+                WHERE candidate.user_id = :user_id AND candidate.document @@ q.query
+                ORDER BY candidate.configuration_id DESC
+                LIMIT :candidates
+            ) AS s
+            JOIN configurations AS c ON c.id = s.configuration_id
+            WHERE c.user_id = :user_id {after}
+            ORDER BY score, id
+            LIMIT :limit
+        ) AS page
+        ORDER BY page.score, page.id
+    """,
+}
+
+_AFTER_SQL = {
+    "sqlite": "AND (bm25(configuration_search, 0.0, 10.0, 5.0, 1.0), s.rowid) > (:after_score, :after_id)",
+    "postgresql": "AND (-ts_rank_cd(s.document, s.query), s.configuration_id) > (:after_score, :after_id)",
+}
+
+
+def _dialect(db: Session) -> str | None:
+    name = db.get_bind().dialect.name
+    return name if settings.CONFIG_SEARCH_ENABLED and name in SEARCH_DDL else None
+
+def create_search_index(connection):
+    """ Создаёт индекс поиска, если его ещё нет (вызывается из init_db; в проде — миграция) """
+    if settings.CONFIG_SEARCH_ENABLED and connection.dialect.name in SEARCH_DDL:
+        for statement in SEARCH_DDL[connection.dialect.name]:
+            connection.execute(text(statement))
+
+def index_configurations(db: Session, rows: list[dict]):
+    """ Добавляет или обновляет записи индекса: [{"id", "user_id", "config_name", "service", "body"}] """
+    dialect = _dialect(db)
+    if dialect is None or not rows:
+        return
+    for statement in _INDEX_SQL[dialect]:
+        db.execute(text(statement), rows)
+
+def index_configuration(db: Session, db_config, config_data: str):
+    index_configurations(db, [{
+        "id": db_config.id, "user_id": db_config.user_id, "config_name": db_config.config_name,
+        "service": db_config.service, "body": config_data,
+    }])
+
+def unindex_configuration(db: Session, config_id: int):
+    dialect = _dialect(db)
+    if dialect is not None:
+        db.execute(text(_UNINDEX_SQL[dialect]), {"id": config_id})
+
+def search_available(db: Session) -> bool:
+    return _dialect(db) is not None
+
+
+def _terms(query: str) -> list[str]:
+    return re.findall(r"\w+", query.lower())[:MAX_QUERY_TERMS]
+
+def _match_expression(dialect: str, user_id: int, terms: list[str]) -> str:
+    if dialect == "sqlite":
+        # Пользовательские слова ищутся только в содержательных колонках, не в owner
+        words = [f'"{term}"' for term in terms[:-1]] + [f'"{terms[-1]}"*']
+        return f'owner:"u{user_id}" AND {{config_name service body}} : ({" AND ".join(words)})'
+    return " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+
+def _render_snippet(snippet: str | None) -> str:
+    """ Экранирует текст конфигурации и размечает совпадения тегами <mark> """
+    return html.escape(snippet or "").replace(_MATCH_START, "<mark>").replace(_MATCH_END, "</mark>")
+
+def _user_rows(dialect: str, user_id: int) -> tuple[str, dict]:
+    return _USER_ROWS_SQL[dialect], {"owner": f'owner:"u{user_id}"', "user_id": user_id}
+
+def _index_missing_configurations(db: Session, dialect: str, user_id: int):
+    """
+    Если крайние id конфигураций пользователя в индексе и в configurations не совпадают (индекс
+    создан миграцией на заполненной базе, его выключали, пока сохранялись конфигурации), перестраивает
+    его записи. Сверка по min/max идёт по индексам и не зависит от числа строк; пропуски в середине
+    так не видны — для них maintenance reindex-configurations. Конфигураций у одного пользователя
+    немного (лимит подписки), поэтому перестройка делается прямо в запросе поиска.
+    """
+    from app.database.configuration_crud import attach_fallback_data
+
+    condition, params = _user_rows(dialect, user_id)
+    key = _KEY_COLUMN[dialect]
+    # Крайние id — отдельными ORDER BY ... LIMIT 1: min() и max() в одном запросе SQLite считает перебором
+    indexed = [
+        db.execute(text(
+            f"SELECT {key} FROM configuration_search WHERE {condition} ORDER BY {key} {order} LIMIT 1"
+        ), params).scalar()
+        for order in ("ASC", "DESC")
+    ]
+    stored = [
+        db.query(Configuration.id).filter(Configuration.user_id == user_id).order_by(order).limit(1).scalar()
+        for order in (Configuration.id.asc(), Configuration.id.desc())
+    ]
+    if indexed == stored:
+        return
+
+    configs = db.query(Configuration).filter(Configuration.user_id == user_id).all()
+    attach_fallback_data(db, configs)
+    db.execute(text(f"DELETE FROM configuration_search WHERE {condition}"), params)
+    index_configurations(db, [
+        {"id": config.id, "user_id": config.user_id, "config_name": config.config_name,
+         "service": config.service, "body": config.config_data or ""}
+        for config in configs
+    ])
+    db.commit()
+
+def search_configurations(db: Session, user_id: int, query: str, limit: int, cursor: str | None = None):
+    """
+    Ищет по конфигурациям пользователя; возвращает (hits, next_cursor) или None, если поиск
+    недоступен. Лучшие совпадения первыми: название весит больше сервиса, сервис — больше текста.
+    """
+    dialect = _dialect(db)
+    if dialect is None:
+        return None
+    terms = _terms(query)
+    if not terms:
+        return [], None
+
+    _index_missing_configurations(db, dialect, user_id)
+    params = {
+        "match": _match_expression(dialect, user_id, terms), "user_id": user_id, "limit": limit + 1,
+        "candidates": settings.CONFIG_SEARCH_MAX_CANDIDATES,
+    }
+    after = ""
+    if cursor:
+        params["after_score"], params["after_id"] = decode_cursor(cursor, CURSOR_COLUMNS)
+        after = _AFTER_SQL[dialect]
+    if dialect == "postgresql":
+        params["headline"] = (
+            f"StartSel={_MATCH_START}, StopSel={_MATCH_END}, MaxFragments=1, MaxWords=24, MinWords=8"
+        )
+
+    rows = db.execute(text(_SEARCH_SQL[dialect].format(after=after)), params).all()
+    next_cursor = encode_cursor([rows[limit - 1].score, rows[limit - 1].id]) if len(rows) > limit else None
+    hits = [
+        {
+            "id": row.id,
+            "service": row.service,
+            "config_name": row.config_name,
+            "updated_at": row.updated_at,
+            "score": -row.score,
+            "snippet": _render_snippet(row.snippet),
+        }
+        for row in rows[:limit]
+    ]
+    return hits, next_cursor
@@ -5,15 +5,13 @@ from sqlalchemy.orm import Session
 
 from app.core.security import decode_token
 from app.database.models import User, VerificationCode
-from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, email: str, password: str):
-    hashed_password = pwd_context.hash(password)
+def create_user(db: Session, email: str, hashed_password: str):
+    """ Пароль хэшируется в слое auth (app.auth.password_hasher), сюда приходит готовый хэш """
     new_user = User(email=email, hashed_password=hashed_password)
     db.add(new_user)
     db.commit()
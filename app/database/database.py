@@ -10,7 +10,11 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def init_db():
+    from app.database.configuration_search import create_search_index
+
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_search_index(connection)  # Виртуальные таблицы и tsvector не описываются моделями
 
 def get_db() -> Session:
     db = SessionLocal()
@@ -0,0 +1,326 @@
+# app/database/maintenance.py
+"""
+Служебные операции над БД.
+
+Запуск: python -m app.database.maintenance <команда>
+
+    recount-configurations       пересчитать users.configurations_count по таблице configurations
+    compress-configurations      сжать старые несжатые configurations.config_data пачками
+    dedupe-configurations        перенести старые configurations.config_data в config_blobs пачками
+    materialize-configurations   сохранить текстом конфигурации, хранящиеся параметрами генератора
+    reindex-configurations       перестроить индекс полнотекстового поиска по конфигурациям
+    recount-config-blobs         пересчитать config_blobs.ref_count и удалить содержимое без ссылок
+    build-compression-dictionary <путь>
+                                 собрать словарь сжатия по шаблонам в новый файл (для новой версии словаря;
+                                 файлы из compression.DICTIONARY_PATHS не перезаписываются)
+"""
+import sys
+import time
+from pathlib import Path
+from typing import get_args
+
+from sqlalchemy import select, func, update, delete, table, column, text, Integer, Text
+from sqlalchemy.orm import Session
+
+from app.database.compression import compress_text, is_compressed
+from app.database.database import SessionLocal
+from app.database.models import User, Configuration, ConfigBlob, ConfigurationRevision
+
+# Таблица без TypeDecorator: команды сжатия работают с тем, что реально лежит в колонке
+raw_configurations = table("configurations", column("id", Integer), column("config_data", Text))
+
+
+def recount_configurations(db: Session) -> int:
+    """
+    Пересчитывает счётчики конфигураций всех пользователей одним UPDATE с коррелированным
+    подзапросом (по индексу configurations(user_id, ...)). Возвращает число исправленных строк.
+    """
+    actual = (
+        select(func.count(Configuration.id))
+        .where(Configuration.user_id == User.id)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(User)
+        .where(User.configurations_count != actual)
+        .values(configurations_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def configuration_storage_bytes(db: Session) -> int:
+    """ Сколько символов занимает config_data во всех строках (как хранится, со сжатием) """
+    return db.execute(select(func.coalesce(func.sum(func.length(raw_configurations.c.config_data)), 0))).scalar()
+
+
+def compress_configurations(db: Session, batch_size: int = 500, pause_seconds: float = 0.05) -> dict:
+    """
+    Сжимает уже сохранённые config_data пачками по batch_size строк (keyset по id), коммитя
+    каждую пачку отдельно, чтобы не держать длинную транзакцию и блокировки. Между пачками —
+    пауза, чтобы не забивать БД. Можно прерывать и запускать повторно: сжатые строки пропускаются.
+    """
+    before = configuration_storage_bytes(db)
+    last_id, compressed = 0, 0
+    while True:
+        rows = db.execute(
+            select(raw_configurations.c.id, raw_configurations.c.config_data)
+            .where(raw_configurations.c.id > last_id)
+            .order_by(raw_configurations.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for row in rows:
+            if row.config_data is None or is_compressed(row.config_data):
+                continue
+            packed = compress_text(row.config_data)
+            if packed != row.config_data:
+                # Условие на старое значение: строку могли изменить, пока мы её сжимали
+                result = db.execute(
+                    raw_configurations.update()
+                    .where(raw_configurations.c.id == row.id, raw_configurations.c.config_data == row.config_data)
+                    .values(config_data=packed)
+                )
+                compressed += result.rowcount
+        db.commit()
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    return {"compressed_rows": compressed, "bytes_before": before, "bytes_after": configuration_storage_bytes(db)}
+
+
+def dedupe_configurations(db: Session, batch_size: int = 500, pause_seconds: float = 0.05) -> dict:
+    """
+    Переносит содержимое строк, сохранённых до дедупликации (config_data прямо в configurations),
+    в config_blobs: одинаковые тексты превращаются в одну запись со счётчиком ссылок.
+    Пачки по batch_size с отдельным коммитом; повторный запуск продолжает с оставшихся строк.
+    """
+    from app.database.config_blob_crud import acquire_config_blob
+
+    moved, last_id = 0, 0
+    while True:
+        configs = db.query(Configuration).filter(
+            Configuration.blob_hash.is_(None), Configuration.inline_data.isnot(None), Configuration.id > last_id
+        ).order_by(Configuration.id).limit(batch_size).all()
+        if not configs:
+            break
+        last_id = configs[-1].id
+        for config in configs:
+            config.blob_hash = acquire_config_blob(db, config.inline_data)
+            config.inline_data = None
+            moved += 1
+        db.commit()
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    return {"moved_rows": moved, "blobs": db.query(func.count(ConfigBlob.hash)).scalar()}
+
+
+def materialize_configurations(db: Session, batch_size: int = 100, pause_seconds: float = 0.05) -> dict:
+    """
+    Рендерит конфигурации, сохранённые параметрами генератора, и сохраняет их как обычный текст
+    (параметры при этом удаляются). Нужно перед откатом миграции e4a7c9d1b258. Индекс поиска
+    обновляется в той же транзакции: после обновления шаблона текст мог измениться.
+    Параметры, которые генератор больше не принимает, заменяются текстом последней версии из истории.
+    """
+    from app.database.config_blob_crud import acquire_config_blob
+    from app.database.configuration_crud import attach_fallback_data
+    from app.database.configuration_search import index_configurations
+
+    materialized, failed, last_id = 0, 0, 0
+    while True:
+        configs = db.query(Configuration).filter(
+            Configuration.config_input.isnot(None), Configuration.id > last_id
+        ).order_by(Configuration.id).limit(batch_size).all()
+        if not configs:
+            break
+        last_id = configs[-1].id
+        attach_fallback_data(db, configs)
+        rows = []
+        for config in configs:
+            config_data = config.config_data
+            if config_data is None:
+                print(f"Конфигурация {config.id} не рендерится, а в истории нет версий")
+                failed += 1
+                continue
+            config.blob_hash = acquire_config_blob(db, config_data)
+            config.config_input = None
+            config.template_version = None
+            rows.append({"id": config.id, "user_id": config.user_id, "config_name": config.config_name,
+                         "service": config.service, "body": config_data})
+        index_configurations(db, rows)
+        materialized += len(rows)
+        db.commit()
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    return {"materialized_rows": materialized, "failed_rows": failed}
+
+
+def reindex_configurations(db: Session, batch_size: int = 500, pause_seconds: float = 0.05) -> dict:
+    """
+    Перестраивает индекс полнотекстового поиска по всем конфигурациям пачками (keyset по id)
+    и удаляет из него записи удалённых конфигураций. Можно запускать на работающем сервисе.
+    """
+    from app.database.configuration_crud import attach_fallback_data
+    from app.database.configuration_search import create_search_index, index_configurations, search_available
+
+    if not search_available(db):
+        return {"indexed_rows": 0, "search": "disabled"}
+    create_search_index(db.connection())  # Поиск включили на базе, где индекса ещё нет
+    db.commit()
+
+    indexed, last_id = 0, 0
+    while True:
+        configs = db.query(Configuration).filter(Configuration.id > last_id).order_by(Configuration.id).limit(
+            batch_size
+        ).all()
+        if not configs:
+            break
+        last_id = configs[-1].id
+        attach_fallback_data(db, configs)
+        index_configurations(db, [
+            {"id": config.id, "user_id": config.user_id, "config_name": config.config_name,
+             "service": config.service, "body": config.config_data or ""}
+            for config in configs
+        ])
+        indexed += len(configs)
+        db.commit()
+        if pause_seconds:
+            time.sleep(pause_seconds)
+
+    key = "rowid" if db.get_bind().dialect.name == "sqlite" else "configuration_id"
+    removed = db.execute(text(
+        f"DELETE FROM configuration_search WHERE {key} NOT IN (SELECT id FROM configurations)"
+    )).rowcount
+    db.commit()
+    return {"indexed_rows": indexed, "removed_rows": removed}
+
+
+def recount_config_blobs(db: Session) -> dict:
+    """ Выставляет ref_count по фактическим ссылкам (конфигурации и снимки истории), удаляет осиротевшее """
+    # Ссылаются текущие версии конфигураций и полные снимки в истории
+    actual = (
+        select(func.count(Configuration.id))
+        .where(Configuration.blob_hash == ConfigBlob.hash)
+        .scalar_subquery()
+    ) + (
+        select(func.count(ConfigurationRevision.id))
+        .where(ConfigurationRevision.blob_hash == ConfigBlob.hash)
+        .scalar_subquery()
+    )
+    fixed = db.execute(
+        update(ConfigBlob)
+        .where(ConfigBlob.ref_count != actual)
+        .values(ref_count=actual)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    removed = db.execute(
+        delete(ConfigBlob).where(ConfigBlob.ref_count <= 0).execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return {"fixed": fixed, "removed": removed}
+
+
+def build_compression_dictionary(db: Session, path: str, max_bytes: int = 32 * 1024) -> int:
+    """
+    Собирает словарь для zlib из конфигов, отрендеренных нашими шаблонами на примерах из моделей
+    (во всех вариантах: с включёнными и выключенными флагами). zlib учитывает последние 32 КБ
+    словаря, а самые частые фрагменты должны стоять в конце — поэтому общие куски идут последними.
+
+    Словарь пишется только в новый файл: действующие словари (DICTIONARY_PATHS) перезаписывать нельзя,
+    иначе строки с их маркером в configurations, config_blobs и configuration_revisions перестанут
+    распаковываться. Новый файл подключается новым маркером в compression.DICTIONARY_PATHS.
+    """
+    from app.database.compression import DICTIONARY_PATHS
+    from app.generators import GENERATORS
+
+    target = Path(path).resolve()
+    if target in {known.resolve() for known in DICTIONARY_PATHS.values()}:
+        raise ValueError(f"{path} — действующий словарь сжатия, его перезапись испортит сжатые данные")
+    if target.exists():
+        raise ValueError(f"{path} уже существует")
+
+    samples = []
+    for generator in GENERATORS.values():
+        for flags in (True, False):
+            try:
+                config = generator.parse(_example_data(generator.model, flags))
+                samples.append(generator.render(config))
+            except Exception as e:
+                print(f"{generator.template_name}: пример не отрендерился ({e.__class__.__name__})")
+
+    # Строки, встречающиеся чаще, — ближе к концу словаря
+    counts = {}
+    for sample in samples:
+        for line in sample.splitlines(keepends=True):
+            if line.strip():
+                counts[line] = counts.get(line, 0) + 1
+    lines = sorted(counts, key=lambda line: (counts[line], len(line)))
+    dictionary = "".join(lines).encode("utf-8")[-max_bytes:]
+
+    with open(target, "xb") as f:
+        f.write(dictionary)
+    return len(dictionary)
+
+
+def _example_data(model, flags: bool) -> dict:
+    from app.form_metadata import _nested_model
+
+    data = {}
+    schema = model.schema()
+    required = set(schema.get("required", []))
+    for field_name, field in model.__fields__.items():
+        info = schema["properties"].get(field_name, {})
+        nested = _nested_model(field.annotation)
+        if nested is not None and "example" not in info:
+            example = _example_data(nested, flags)
+            data[field_name] = {"app": example} if "additionalProperties" in info else example
+        elif "example" in info:
+            data[field_name] = info["example"]
+        elif bool in (field.annotation, *get_args(field.annotation)):
+            data[field_name] = flags
+        elif field_name in required:
+            data[field_name] = "example"
+    return data
+
+
+COMMANDS = {
+    "recount-configurations": recount_configurations,
+    "compress-configurations": compress_configurations,
+    "dedupe-configurations": dedupe_configurations,
+    "materialize-configurations": materialize_configurations,
+    "reindex-configurations": reindex_configurations,
+    "recount-config-blobs": recount_config_blobs,
+    "build-compression-dictionary": build_compression_dictionary,
+}
+# Число обязательных аргументов команды после её имени
+COMMAND_ARGS = {
+    "build-compression-dictionary": 1,
+}
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS or len(argv) != 1 + COMMAND_ARGS.get(argv[0], 0):
+        print(__doc__)
+        return 2
+
+    db = SessionLocal()
+    try:
+        result = COMMANDS[argv[0]](db, *argv[1:])
+    except ValueError as e:
+        print(f"{argv[0]}: {e}")
+        return 1
+    finally:
+        db.close()
+    print(f"{argv[0]}: {result}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
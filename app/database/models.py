@@ -1,7 +1,10 @@
 from datetime import datetime, timedelta
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import (
+    Column, Integer, String, Boolean, DateTime, ForeignKey, Text, LargeBinary, Index, UniqueConstraint, JSON
+)
 from sqlalchemy.orm import relationship
 
+from app.database.compression import CompressedText
 from app.database.database import Base
 
 
@@ -17,6 +20,8 @@ class User(Base):
     request_limit = Column(Integer, default=15, nullable=False)
     requests_this_month = Column(Integer, default=0, nullable=False)
     limit_reset_date = Column(DateTime, default=lambda: datetime.utcnow() + timedelta(days=30), nullable=False)
+    # Число сохранённых конфигураций; меняется в одной транзакции с вставкой/удалением
+    configurations_count = Column(Integer, default=0, server_default="0", nullable=False)
 
     # Связи
     configurations = relationship("Configuration", back_populates="user", cascade="all, delete-orphan")
@@ -30,11 +35,74 @@ class Configuration(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     service = Column(String, nullable=False)
     config_name = Column(String, nullable=False)
-    config_data = Column(Text, nullable=False)
+    # Содержимое хранится один раз в config_blobs (по sha256); inline_data — строки,
+    # сохранённые до дедупликации (python -m app.database.maintenance dedupe-configurations)
+    blob_hash = Column(String(64), ForeignKey("config_blobs.hash"), nullable=True, index=True)
+    inline_data = Column("config_data", CompressedText, nullable=True)  # Сжимается прозрачно, см. compression.py
+    # Вместо текста можно хранить параметры генератора (только заданные пользователем поля):
+    # текст тогда рендерится при чтении текущей версией шаблона через кэш рендеринга
+    config_input = Column(JSON(none_as_null=True), nullable=True)
+    template_version = Column(String(32), nullable=True)  # Версия шаблона на момент сохранения параметров
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     user = relationship("User", back_populates="configurations")
+    blob = relationship("ConfigBlob", lazy="joined")
+
+    # Не колонка: текст последней версии из истории для параметров, которые новая версия генератора
+    # уже не принимает; подгружается в configuration_crud, пока открыта сессия (см. attach_fallback_data)
+    fallback_data = None
+
+    @property
+    def config_data(self) -> str | None:
+        if self.blob_hash is not None:
+            return self.blob.data
+        if self.config_input is not None:
+            from app.generators import render_saved_input
+            try:
+                return render_saved_input(self.service, self.config_input)
+            except ValueError:
+                return self.fallback_data  # None — отрендерить нечем и в истории ничего нет
+        return self.inline_data
+
+    __table_args__ = (
+        # Список конфигураций пользователя по id (keyset) и подсчёт для лимита
+        Index("ix_configurations_user_id_id", "user_id", "id"),
+        # Выборки конфигураций пользователя по сервису
+        Index("ix_configurations_user_id_service", "user_id", "service"),
+    )
+
+
+class ConfigurationRevision(Base):
+    """
+    Версия содержимого конфигурации. Каждая CONFIG_REVISION_SNAPSHOT_EVERY-я версия (1, K+1, 2K+1, ...)
+    хранится целиком ссылкой на config_blobs, остальные — дельтой к предыдущей версии,
+    поэтому для восстановления любой версии нужно не больше K-1 дельт.
+    """
+    __tablename__ = "configuration_revisions"
+
+    id = Column(Integer, primary_key=True)
+    configuration_id = Column(Integer, ForeignKey("configurations.id", ondelete="CASCADE"), nullable=False)
+    revision = Column(Integer, nullable=False)  # 1, 2, 3 ... в пределах конфигурации
+    blob_hash = Column(String(64), ForeignKey("config_blobs.hash"), nullable=True)  # Полный снимок
+    delta = Column(CompressedText, nullable=True)  # Дельта к revision - 1 (см. app/utils/text_delta.py)
+    size = Column(Integer, nullable=False)  # Длина текста этой версии в байтах
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("configuration_id", "revision", name="uq_configuration_revisions_revision"),
+    )
+
+
+class ConfigBlob(Base):
+    """ Содержимое конфигурации, общее для всех сохранений с одинаковыми байтами """
+    __tablename__ = "config_blobs"
+
+    hash = Column(String(64), primary_key=True)  # sha256 от текста в UTF-8
+    data = Column(CompressedText, nullable=False)
+    size = Column(Integer, nullable=False)  # Длина исходного текста в байтах
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
 
 class VerificationCode(Base):
@@ -45,6 +113,10 @@ class VerificationCode(Base):
     password = Column(String, nullable=False)
     expires_at = Column(DateTime, nullable=False, default=lambda: datetime.utcnow() + timedelta(minutes=10))
 
+    __table_args__ = (
+        Index("ix_verification_codes_expires_at", "expires_at"),  # Очистка просроченных кодов
+    )
+
 
 class ServiceTemplate(Base):
     __tablename__ = "service_templates"
@@ -54,7 +126,17 @@ class ServiceTemplate(Base):
     description = Column(Text, nullable=True)
     file_extension = Column(String, nullable=True)
     template_filename = Column(String, nullable=False)
-    icon = Column(Text, nullable=True)
+    # Иконка хранится в бинарном виде и отдаётся отдельным запросом; в списки попадает только URL
+    icon_data = Column(LargeBinary, nullable=True)
+    icon_thumbnail = Column(LargeBinary, nullable=True)
+    icon_content_type = Column(String, nullable=True)
+    icon_hash = Column(String(64), nullable=True)  # sha256 содержимого: ETag и версия в URL
+
+    @property
+    def icon_url(self):
+        if not self.icon_hash:
+            return None
+        return f"/api/templates/{self.id}/icon?v={self.icon_hash[:16]}"
 
 
 class PaymentOrder(Base):
@@ -68,3 +150,8 @@ class PaymentOrder(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     user = relationship("User", back_populates="payment_orders")
+
+    __table_args__ = (
+        # История платежей пользователя, новые первыми (order_id — второй ключ курсора)
+        Index("ix_payment_orders_user_id_created_at", "user_id", "created_at", "order_id"),
+    )
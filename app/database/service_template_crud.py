@@ -1,4 +1,9 @@
-from sqlalchemy.orm import Session
+import hashlib
+
+from sqlalchemy.orm import Session, defer
+from app.config import settings
+from app.database.catalogue_cache import ServiceCatalogue
+from app.database.database import SessionLocal
 from app.database.models import ServiceTemplate
 from app.schemas.service_template import ServiceTemplateCreate, ServiceTemplateUpdate
 
@@ -7,10 +12,14 @@ def create_service_template(db: Session, template: ServiceTemplateCreate):
     db.add(db_template)
     db.commit()
     db.refresh(db_template)
+    service_catalogue.invalidate()
     return db_template
 
 def get_all_service_templates(db: Session):
-    return db.query(ServiceTemplate).all()
+    # Байты иконок спискам не нужны — только icon_hash для URL
+    return db.query(ServiceTemplate).options(
+        defer(ServiceTemplate.icon_data), defer(ServiceTemplate.icon_thumbnail)
+    ).all()
 
 def get_service_template_by_id(db: Session, template_id: int):
     return db.query(ServiceTemplate).filter(ServiceTemplate.id == template_id).first()
@@ -22,6 +31,7 @@ def update_service_template(db: Session, template_id: int, template_update: Serv
             setattr(db_template, key, value)
         db.commit()
         db.refresh(db_template)
+        service_catalogue.invalidate()
     return db_template
 
 def delete_service_template(db: Session, template_id: int):
@@ -29,4 +39,35 @@ def delete_service_template(db: Session, template_id: int):
     if db_template:
         db.delete(db_template)
         db.commit()
+        service_catalogue.invalidate()
     return db_template
+
+
+def set_service_template_icon(db: Session, template_id: int, data: bytes, content_type: str,
+                              thumbnail: bytes | None = None):
+    db_template = db.query(ServiceTemplate).filter(ServiceTemplate.id == template_id).first()
+    if db_template:
+        db_template.icon_data = data
+        db_template.icon_thumbnail = thumbnail
+        db_template.icon_content_type = content_type
+        db_template.icon_hash = hashlib.sha256(data).hexdigest()
+        db.commit()
+        db.refresh(db_template)
+        service_catalogue.invalidate()
+    return db_template
+
+def get_service_template_icon(db: Session, template_id: int, thumbnail: bool = False):
+    """ Читает только байты иконки (или миниатюры), тип и хэш — без остальных колонок """
+    data_column = ServiceTemplate.icon_thumbnail if thumbnail else ServiceTemplate.icon_data
+    return db.query(
+        data_column.label("data"), ServiceTemplate.icon_content_type, ServiceTemplate.icon_hash
+    ).filter(ServiceTemplate.id == template_id).first()
+
+
+# Каталог для /services и /api/templates; изменения выше сбрасывают его во всех воркерах
+service_catalogue = ServiceCatalogue(
+    SessionLocal,
+    get_all_service_templates,
+    signal_file=settings.CATALOGUE_CACHE_SIGNAL_FILE,
+    enabled=settings.CATALOGUE_CACHE_ENABLED,
+)
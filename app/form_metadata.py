@@ -0,0 +1,211 @@
+# app/form_metadata.py
+"""
+Метаданные форм для всех генераторов.
+
+Описание полей зависит только от моделей и меняется лишь при деплое, поэтому payload для
+каждого генератора строится один раз при старте, сериализуется в JSON, сжимается gzip и
+отдаётся с сильным ETag. Повторный запрос с If-None-Match получает 304 без тела.
+Для каталога целиком (GET /api/form-metadata) используется тот же снимок.
+"""
+import hashlib
+import json
+import threading
+from inspect import isclass
+from typing import get_args, get_origin, get_type_hints, Union
+
+from fastapi import Request, Response, HTTPException
+from pydantic import BaseModel
+
+from app.generators import GENERATORS, Generator
+from app.utils.cached_response import CachedJSON, serialize_json, cached_json_response
+
+CACHE_CONTROL = "public, max-age=3600"
+
+# Кастомное отображение типов для фронтенда
+TYPE_MAPPING = {
+    bool: "bool",
+    int: "int",
+    str: "str",
+    list: "list",
+    dict: "dict",
+}
+
+FORM_TYPES = {
+    "bool": "checkbox",
+    "int": "number",
+    "list": "array",
+    "dict": "json",
+}
+
+
+def _get_real_type(annotation, unwrap_optional: bool):
+    """ Определяем тип данных для фронтенда; `Optional[X]` раскрывается только по флагу генератора """
+    if unwrap_optional and get_origin(annotation) is Union:
+        annotation = get_args(annotation)[0]  # Достаем реальный тип данных из Optional[]
+    return annotation
+
+
+def _nested_model(annotation) -> type[BaseModel] | None:
+    """
+    Возвращает вложенную модель, поля которой нужно развернуть в форму:
+    Model, Optional[Model] и Dict[str, Model] (например, services в docker-compose).
+    Списки моделей остаются одним полем-массивом.
+    """
+    if isclass(annotation) and issubclass(annotation, BaseModel):
+        return annotation
+
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Union:
+        not_none = [arg for arg in args if arg is not type(None)]
+        return _nested_model(not_none[0]) if len(not_none) == 1 else None
+    if origin is dict and len(args) == 2 and isclass(args[1]) and issubclass(args[1], BaseModel):
+        return args[1]
+    return None
+
+
+def build_form_metadata(generator: Generator) -> dict:
+    """ Строит описание полей формы и зависимостей для одного генератора """
+    fields = []
+    dependencies = {}
+
+    def is_advanced(full_name: str, required: bool) -> bool:
+        if required:
+            return False
+        if generator.primary_fields is not None:
+            return full_name not in generator.primary_fields
+        return not full_name.startswith("enable_")
+
+    def process_model(model: type[BaseModel], parent: str, required_fields):
+        schema = model.schema()
+        type_hints = get_type_hints(model)
+        if required_fields is None:
+            required_fields = set(schema.get("required", []))
+
+        for field_name, field_info in schema["properties"].items():
+            full_name = f"{parent}.{field_name}" if parent else field_name
+            annotation = type_hints.get(field_name, str)  # По умолчанию считаем строкой
+            nested = _nested_model(annotation)
+
+            # Вложенная модель разворачивается в поля `parent.child`; сам родитель остаётся
+            # в форме, только если он управляет видимостью этих полей (есть в зависимостях)
+            if nested is None or full_name in generator.form_dependencies:
+                fields.append(make_field(full_name, field_name, field_info, annotation, required_fields))
+            if nested is not None:
+                process_model(nested, full_name, None)
+
+    def make_field(full_name, field_name, field_info, annotation, required_fields) -> dict:
+        mapped_type = TYPE_MAPPING.get(_get_real_type(annotation, generator.unwrap_optional), "str")
+        field = {
+            "name": full_name,
+            "label": field_name.replace("_", " ").capitalize(),
+            "required": field_name in required_fields,
+            "defaultValue": field_info.get("default", None),
+            "description": field_info.get("description", ""),
+            "variableType": mapped_type,
+            "type": FORM_TYPES.get(mapped_type, "text"),
+        }
+
+        # Добавляем placeholder, если есть
+        if "example" in field_info:
+            field["placeholder"] = str(field_info["example"])
+
+        field["isAdvanced"] = is_advanced(full_name, field["required"])
+
+        # Если поле является чекбоксом, добавляем зависимости
+        if full_name in generator.form_dependencies:
+            dependencies[full_name] = generator.form_dependencies[full_name]
+        return field
+
+    process_model(generator.model, "", generator.required_fields)
+    return {"fields": fields, "dependencies": dependencies}
+
+
+class MetadataSnapshot:
+    """
+    Неизменяемый снимок метаданных всех генераторов.
+
+    version меняется вместе с любым payload, поэтому клиент может держать её в кэше как ключ.
+    Ответ для всего каталога собран заранее; ответы для подмножества склеиваются из уже
+    сериализованных тел сервисов и запоминаются (вариантов не больше 2^N).
+    """
+
+    MAX_SUBSETS = 256
+
+    def __init__(self, entries: dict[str, CachedJSON]):
+        self.entries = entries
+        self.version = hashlib.sha256(
+            "".join(entry.etag for entry in entries.values()).encode("utf-8")
+        ).hexdigest()[:16]
+        self.catalogue = self._build(tuple(entries))
+        self._subsets = {}
+        self._subsets_lock = threading.Lock()
+
+    def _build(self, names: tuple[str, ...]) -> CachedJSON:
+        parts = b",".join(
+            json.dumps(name).encode("utf-8") + b":" + self.entries[name].body for name in names
+        )
+        return CachedJSON(
+            b'{"version":' + json.dumps(self.version).encode("utf-8") + b',"services":{' + parts + b"}}"
+        )
+
+    def select(self, names: list[str]) -> CachedJSON:
+        unknown = [name for name in names if name not in self.entries]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Unknown services: {', '.join(unknown)}")
+
+        # Порядок сервисов — как в реестре, чтобы одинаковые наборы давали одинаковые байты и ETag
+        selected = tuple(name for name in self.entries if name in names)
+        if len(selected) == len(self.entries):
+            return self.catalogue
+
+        with self._subsets_lock:
+            entry = self._subsets.get(selected)
+        if entry is None:
+            entry = self._build(selected)
+            with self._subsets_lock:
+                if len(self._subsets) < self.MAX_SUBSETS:
+                    self._subsets[selected] = entry
+        return entry
+
+
+_snapshot: MetadataSnapshot | None = None
+_snapshot_lock = threading.Lock()
+
+
+def warm_up_form_metadata() -> MetadataSnapshot:
+    """ Строит метаданные всех генераторов; вызывается при старте приложения """
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = MetadataSnapshot({
+                service_name: CachedJSON(serialize_json(build_form_metadata(generator)))
+                for service_name, generator in GENERATORS.items()
+            })
+    return _snapshot
+
+
+def get_snapshot() -> MetadataSnapshot:
+    return _snapshot or warm_up_form_metadata()
+
+
+def get_metadata_entry(service_name: str) -> CachedJSON:
+    entry = get_snapshot().entries.get(service_name)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Unknown service")
+    return entry
+
+
+def metadata_response(request: Request, entry: CachedJSON, headers: dict | None = None) -> Response:
+    return cached_json_response(request, entry, CACHE_CONTROL, headers)
+
+
+def form_metadata_response(request: Request, service_name: str) -> Response:
+    return metadata_response(request, get_metadata_entry(service_name))
+
+
+def catalogue_metadata_response(request: Request, services: str | None = None) -> Response:
+    """ Метаданные всех (или перечисленных через запятую) генераторов одним ответом """
+    snapshot = get_snapshot()
+    names = [name.strip() for name in (services or "").split(",") if name.strip()]
+    entry = snapshot.select(names) if names else snapshot.catalogue
+    return metadata_response(request, entry, headers={"X-Metadata-Version": snapshot.version})
@@ -0,0 +1,178 @@
+# app/generators.py
+from concurrent.futures import ThreadPoolExecutor
+
+from pydantic import BaseModel, ValidationError
+
+from app.config import settings
+from app.services import render_template
+from app.models.nginx_model import NginxConfig
+from app.models.docker_models import DockerfileConfig, DockerComposeConfig
+from app.models.systemd_model import SystemdConfig
+from app.models.apache_model import ApacheConfig
+from app.models.postgresql_model import PostgreSQLConfig
+from app.models.sshd_model import SSHConfig
+from app.models.redis_model import RedisConfig
+
+
+class Generator:
+    """
+    Описание генератора: модель входных данных, шаблон, дополнительные проверки и то,
+    как его поля показываются в форме:
+    - form_dependencies — чекбокс (или вложенный блок) -> поля, которые он открывает;
+    - primary_fields — необязательные поля, которые всегда показываются в основной части формы
+      (по умолчанию основными считаются только флаги enable_*);
+    - required_fields — переопределяет список обязательных полей верхнего уровня из схемы;
+    - unwrap_optional — показывать для Optional[X] тип X (иначе такие поля считаются строками).
+    """
+
+    def __init__(self, model: type[BaseModel], template_name: str, validate=None, form_dependencies=None,
+                 primary_fields=None, required_fields=None, unwrap_optional=False):
+        self.model = model
+        self.template_name = template_name
+        self.validate = validate
+        self.form_dependencies = form_dependencies or {}
+        self.primary_fields = primary_fields
+        self.required_fields = required_fields
+        self.unwrap_optional = unwrap_optional
+
+    def parse(self, data: dict) -> BaseModel:
+        """ Валидирует входные данные; бросает ValidationError или ValueError """
+        config = self.model.parse_obj(data)
+        if self.validate:
+            self.validate(config)
+        return config
+
+    def render(self, config: BaseModel) -> str:
+        return render_template(self.template_name, config.dict())
+
+
+def _validate_docker_compose(config: DockerComposeConfig):
+    if not config.services:
+        raise ValueError("Services cannot be empty")
+
+def _validate_apache(config: ApacheConfig):
+    if not config.server_name or not config.document_root:
+        raise ValueError("ServerName и DocumentRoot обязательны")
+
+def _validate_redis(config: RedisConfig):
+    if not config.bind:
+        raise ValueError("bind is required")
+
+
+# Реестр всех генераторов: имя сервиса -> генератор
+GENERATORS = {
+    "nginx": Generator(
+        NginxConfig, "nginx.j2",
+        form_dependencies={
+            "enable_ssl": ["ssl_certificate", "ssl_certificate_key"],
+            "enable_logging": ["access_log", "error_log"],
+            "enable_proxy": ["proxy_pass"],
+            "enable_basic_auth": ["auth_user_file"],
+            "enable_cors": ["cors_allowed_origins"],
+        },
+    ),
+    "dockerfile": Generator(
+        DockerfileConfig, "dockerfile.j2",
+        form_dependencies={
+            "healthcheck": ["healthcheck.test", "healthcheck.interval", "healthcheck.timeout", "healthcheck.retries"],
+        },
+        primary_fields=["base_image", "entrypoint"],
+    ),
+    "docker-compose": Generator(
+        DockerComposeConfig, "docker-compose.j2", _validate_docker_compose,
+        form_dependencies={
+            "enable_networks": ["networks"],
+            "enable_volumes": ["volumes"],
+            "enable_build": ["build"],
+            "enable_ports": ["ports"],
+            "enable_depends_on": ["depends_on"],
+        },
+        primary_fields=["version", "services.image"],
+        required_fields={"version"},  # Основной параметр Docker Compose
+    ),
+    "systemd": Generator(
+        SystemdConfig, "systemd.j2",
+        form_dependencies={
+            "restart_policy": ["restart_sec"],
+        },
+        primary_fields=["description", "after", "exec_start"],
+    ),
+    "apache": Generator(
+        ApacheConfig, "apache.j2", _validate_apache,
+        form_dependencies={
+            "ssl_enabled": ["ssl_certificate_file", "ssl_certificate_key_file", "ssl_chain_file", "ssl_protocols",
+                            "ssl_ciphers", "ssl_session_cache"],
+            "proxy_pass": ["proxy_path"],
+        },
+        primary_fields=["port", "server_name", "document_root"],
+    ),
+    "postgresql": Generator(
+        PostgreSQLConfig, "postgresql.j2",
+        form_dependencies={
+            "enable_ssl": ["ssl_cert_file", "ssl_key_file"],
+            "enable_logging": ["log_directory", "log_filename", "log_statement"],
+            "enable_replication": ["wal_level", "max_wal_senders", "synchronous_commit"],
+            "enable_autovacuum": ["autovacuum_vacuum_threshold", "autovacuum_analyze_threshold"],
+        },
+    ),
+    "sshd": Generator(
+        SSHConfig, "sshd.j2",
+        form_dependencies={
+            "password_authentication": ["permit_empty_passwords"],
+            "pubkey_authentication": ["authorized_keys_file"],
+        },
+        primary_fields=["port", "protocol", "permit_root_login"],
+        unwrap_optional=True,
+    ),
+    "redis": Generator(
+        RedisConfig, "redis.j2", _validate_redis,
+        form_dependencies={
+            "enable_logging": ["loglevel"],
+            "enable_ssl": ["ssl_cert_file", "ssl_key_file"],
+            "enable_replication": ["slaveof"],
+        },
+    ),
+}
+
+# Ограниченный пул потоков для параллельного рендеринга пакетов
+_render_pool = ThreadPoolExecutor(max_workers=settings.BATCH_MAX_WORKERS, thread_name_prefix="render")
+
+
+def parse_generator_input(service: str, data: dict):
+    """ Возвращает (generator, config, None) или (None, None, error) для одного элемента пакета """
+    generator = GENERATORS.get(service)
+    if not generator:
+        return None, None, f"Unknown service: {service}"
+    try:
+        return generator, generator.parse(data), None
+    except ValidationError as e:
+        return None, None, e.errors(include_url=False, include_context=False)
+    except ValueError as e:
+        return None, None, str(e)
+
+
+def parse_saved_input(service: str, data: dict) -> BaseModel:
+    """ Параметры сохранённой конфигурации (config_input) -> модель генератора; ValueError при ошибке """
+    generator, config, error = parse_generator_input(service, data)
+    if error is not None:
+        if isinstance(error, list):
+            error = "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error)
+        raise ValueError(f"Invalid config_input for {service}: {error}")
+    return config
+
+
+def render_saved_input(service: str, data: dict) -> str:
+    """ Рендерит сохранённые параметры текущей версией шаблона (через кэш рендеринга) """
+    return GENERATORS[service].render(parse_saved_input(service, data))
+
+
+def render_many(jobs: list) -> list:
+    """ Рендерит список (generator, config) в пуле потоков; возвращает (content, error) в том же порядке """
+    def run(job):
+        generator, config = job
+        try:
+            return generator.render(config), None
+        except Exception as e:
+            return None, str(e)
+
+    return list(_render_pool.map(run, jobs))
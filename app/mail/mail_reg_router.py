@@ -7,6 +7,7 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field, EmailStr
 
 from app.auth.auth_service import get_db
+from app.auth.password_hasher import hash_password
 from app.database.crud import get_user_by_email, create_user, store_verification_code, get_verification_code, delete_verification_code
 from app.mail.mail_service import send_email
 
@@ -53,6 +54,6 @@ def verify_registration(data: VerifyCode, db: Session = Depends(get_db)):
     if stored_code_entry.code != data.code:
         raise HTTPException(status_code=400, detail="Invalid verification code")
 
-    create_user(db, data.email, stored_code_entry.password)
+    create_user(db, data.email, hash_password(stored_code_entry.password))
     delete_verification_code(db, data.email)
     return {"message": "User successfully registered"}
@@ -5,16 +5,24 @@ from sqlalchemy.orm import Session
 from starlette.middleware.cors import CORSMiddleware
 
 from app.database.database import init_db, get_db
+from app.services import warm_up_templates, templates_status, render_cache
+from app.form_metadata import warm_up_form_metadata
+from app.config import settings
+from app.auth.auth_service import usage_buffer
+from app.auth.auth_cache import auth_cache_stats
+from app.auth.password_hasher import start_password_pool, shutdown_password_pool
+from app.database.service_template_crud import service_catalogue
 from app.mail.mail_reg_router import mail_router
 from app.yookassa.payment_routers import router as payment_router
-from app.routers import nginx, systemd, apache, postgresql, sshd, redis, dockerfile, docker_compose
+from app.routers import nginx, systemd, apache, postgresql, sshd, redis, dockerfile, docker_compose, batch
 from app.auth.auth_routers import router as auth_router
 from app.auth.password_reset import password_reset_router
 from app.user.user_router import router as user_router
 from app.routers.configuration_router import router as configuration_router
 from app.routers.service_template_router import router as service_template_router
+from app.routers.form_metadata_router import router as form_metadata_router
 
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends, Request, Response
 
 app = FastAPI(
     docs_url="/api/docs",  # Настроим docs на /api/docs
@@ -33,8 +41,36 @@ app.add_middleware(
 @app.on_event("startup")
 async def startup_event():
     init_db()  # Запускаем создание таблиц
+    warm_up_templates()  # Компилируем все шаблоны генераторов до первого запроса
+    warm_up_form_metadata()  # Готовим JSON/gzip метаданных форм
+    start_password_pool()  # Процессы bcrypt — до первого логина
+    if settings.USAGE_BUFFER_ENABLED:
+        usage_buffer.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if settings.USAGE_BUFFER_ENABLED:
+        usage_buffer.stop()  # Дописываем в БД все накопленные списания
+    shutdown_password_pool()
+    if settings.DB_ASYNC_MODE:
+        from app.database.async_database import async_engine
+        await async_engine.dispose()
+
+# В асинхронном режиме async-роутеры подключаются первыми и перекрывают одноимённые
+# синхронные маршруты; всё, что ещё не переведено, обслуживается синхронными роутерами
+if settings.DB_ASYNC_MODE:
+    from app.routers import async_generators, async_configuration_router
+    from app.auth.async_auth_routers import router as async_auth_router
+    from app.user.async_user_router import router as async_user_router
+
+    app.include_router(async_generators.router, tags=["Config Generator"], prefix="/api")
+    app.include_router(async_auth_router, tags=["Auth"], prefix="/api")
+    app.include_router(async_user_router, tags=["User"], prefix="/api")
+    app.include_router(async_configuration_router.router, tags=["Save configurations"], prefix="/api")
 
 # Подключение маршрутов
+app.include_router(batch.router, tags=["Config Generator"], prefix="/api")
+app.include_router(form_metadata_router, tags=["Config Generator"], prefix="/api")
 app.include_router(nginx.router, tags=["Config Generator"], prefix="/api")
 app.include_router(dockerfile.router, tags=["Config Generator"], prefix="/api")
 app.include_router(docker_compose.router, tags=["Config Generator"], prefix="/api")
@@ -54,18 +90,33 @@ app.include_router(payment_router, tags=["Payment"], prefix="/api")
 SERVICES_DIR = "app/routers"
 
 @app.get("/services")
-def get_services(db: Session = Depends(get_db)):
-    from app.database.service_template_crud import get_all_service_templates
-    templates = get_all_service_templates(db)
-    return [
-        {
-            "id": tpl.service_id,
-            "name": tpl.name,
-            "description": tpl.description,
-            "file_extension": tpl.file_extension
-        }
-        for tpl in templates
-    ]
+def get_services(request: Request):
+    # Каталог отдаётся из памяти; БД читается только после изменения шаблонов
+    return service_catalogue.services_response(request)
+
+@app.get("/health/live")
+def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def readiness(response: Response):
+    # Проба проходит только после того, как все шаблоны скомпилированы
+    status = templates_status()
+    if status["status"] != "warm":
+        response.status_code = 503
+    return {"templates": status}
+
+@app.get("/health/render-cache")
+def render_cache_stats():
+    return render_cache.stats()
+
+@app.get("/health/auth-cache")
+def auth_cache_statistics():
+    return auth_cache_stats()
+
+@app.get("/health/catalogue-cache")
+def catalogue_cache_stats():
+    return service_catalogue.stats()
 
 if __name__ == '__main__':
     uvicorn.run(
@@ -0,0 +1,244 @@
+# app/routers/async_configuration_router.py
+# Асинхронная версия configuration_router (включается при DB_ASYNC_MODE=true).
+# Параметры пути объявлены как {config_id:int}, чтобы не перехватывать
+# остальные маршруты синхронного роутера вида /configurations/<слово>.
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.database.async_database import get_async_db
+from app.auth.async_auth_service import get_current_user, consume_user_requests, refund_on_error
+from app.database.models import User
+from app.schemas.configuration import (
+    Configuration, ConfigurationCreate, ConfigurationUpdate, ConfigurationListItem, ConfigurationRevision,
+    ConfigurationRevisionContent, ConfigurationDiffRequest, ConfigurationDiff, ConfigurationSearchHit
+)
+from app.utils.cached_response import etag_matches
+from app.utils.pagination import PAGE_MAX_LIMIT, set_next_cursor
+from app.database.async_crud import (
+    create_configuration,
+    get_configurations_by_user,
+    get_configuration,
+    get_configuration_etag,
+    get_configurations_etag,
+    update_configuration,
+    delete_configuration,
+    get_configuration_revisions,
+    get_configuration_revision,
+    restore_configuration_revision,
+    get_configuration_text,
+    patch_configuration_input,
+    search_configurations
+)
+from app.database.configuration_crud import (
+    ConfigurationConflict, PreconditionFailed, configuration_etag, configurations_etag
+)
+from app.configuration_diff import parse_right_config, build_diff
+
+router = APIRouter(
+    prefix="/configurations"
+)
+
+# Конфигурации личные и меняются в любой момент: кэшировать можно, но только с перепроверкой ETag
+CONFIGURATION_CACHE_CONTROL = "private, no-cache"
+
+@router.post("", response_model=Configuration)
+async def create_config(
+    config: ConfigurationCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        new_config = await create_configuration(db, config, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return new_config
+
+@router.get("", response_model=List[ConfigurationListItem], response_model_exclude_unset=True)
+async def read_configs(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Без limit отдаётся весь список, как раньше; следующая страница — по заголовку X-Next-Cursor
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Сверяем версии строк страницы, не читая содержимое; совпало — 304 без тела
+        etag = await get_configurations_etag(db, current_user.id, limit=limit, cursor=cursor, summary=summary)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONFIGURATION_CACHE_CONTROL})
+
+    configs, next_cursor = await get_configurations_by_user(
+        db, current_user.id, limit=limit, cursor=cursor, summary=summary
+    )
+    set_next_cursor(response, next_cursor)
+    response.headers["ETag"] = configurations_etag(configs, next_cursor, summary)
+    response.headers["Cache-Control"] = CONFIGURATION_CACHE_CONTROL
+    return configs
+
+@router.get("/search", response_model=List[ConfigurationSearchHit])
+async def search_configs(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Ранжированный поиск по названию, сервису и тексту; следующая страница — по X-Next-Cursor
+    found = await search_configurations(db, current_user.id, q, limit, cursor)
+    if found is None:
+        raise HTTPException(status_code=503, detail="Search is not available")
+    hits, next_cursor = found
+    set_next_cursor(response, next_cursor)
+    return hits
+
+@router.get("/{config_id:int}", response_model=Configuration)
+async def read_config(
+    config_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = await get_configuration_etag(db, config_id, current_user.id)
+        if etag is None:
+            raise HTTPException(status_code=404, detail="Configuration not found")
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONFIGURATION_CACHE_CONTROL})
+
+    config = await get_configuration(db, config_id, current_user.id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    response.headers["ETag"] = configuration_etag(config)
+    response.headers["Cache-Control"] = CONFIGURATION_CACHE_CONTROL
+    return config
+
+@router.put("/{config_id:int}", response_model=Configuration)
+async def update_config(
+    config_id: int,
+    config_update: ConfigurationUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    # If-Match: ETag, полученный клиентом при чтении, — защита от потери чужой правки
+    try:
+        config = await update_configuration(
+            db, config_id, current_user.id, config_update, if_match=request.headers.get("if-match")
+        )
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=412, detail=str(e), headers={"ETag": e.etag} if e.etag else None)
+    except ConfigurationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not config:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    response.headers["ETag"] = configuration_etag(config)
+    return config
+
+@router.patch("/{config_id:int}/input", response_model=Configuration)
+async def patch_config_input(
+    config_id: int,
+    patch: Dict[str, Any] = Body(..., description="JSON Merge Patch параметров генератора; null сбрасывает поле"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        config = await patch_configuration_input(db, config_id, current_user.id, patch)
+    except ConfigurationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not config:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    return config
+
+@router.delete("/{config_id:int}", response_model=Configuration)
+async def delete_config(
+    config_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    config = await delete_configuration(db, config_id, current_user.id)
+    if not config:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    return config
+
+@router.get("/{config_id:int}/revisions", response_model=List[ConfigurationRevision])
+async def read_config_revisions(
+    config_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    revisions = await get_configuration_revisions(db, config_id, current_user.id)
+    if revisions is None:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    return revisions
+
+@router.get("/{config_id:int}/revisions/{revision:int}", response_model=ConfigurationRevisionContent)
+async def read_config_revision(
+    config_id: int,
+    revision: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    content = await get_configuration_revision(db, config_id, current_user.id, revision)
+    if not content:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return content
+
+@router.post("/{config_id:int}/revisions/{revision:int}/restore", response_model=Configuration)
+async def restore_config_revision(
+    config_id: int,
+    revision: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Восстановление не переписывает историю, а добавляет новую версию с тем же содержимым
+    try:
+        config = await restore_configuration_revision(db, config_id, current_user.id, revision)
+    except ConfigurationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not config:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return config
+
+@router.post("/diff", response_model=ConfigurationDiff)
+async def diff_configs(
+    diff_request: ConfigurationDiffRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if (diff_request.right_id is None) == (diff_request.right_config is None):
+        raise HTTPException(status_code=400, detail="Specify either right_id or right_config")
+
+    left = await get_configuration_text(db, diff_request.left_id, current_user.id, diff_request.left_revision)
+    if not left:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+
+    if diff_request.right_id is not None:
+        right = await get_configuration_text(db, diff_request.right_id, current_user.id, diff_request.right_revision)
+        if not right:
+            raise HTTPException(status_code=404, detail="Configuration not found")
+    else:
+        # Новые параметры рендерятся как обычная генерация и списывают запрос из квоты
+        generator, config = parse_right_config(left["service"], diff_request.right_config)
+        if await consume_user_requests(db, current_user.id) is None:
+            raise HTTPException(status_code=403, detail="Request limit exceeded")
+        async with refund_on_error(db, current_user.id):
+            rendered = await run_in_threadpool(generator.render, config)
+        right = {"name": "new", "text": rendered, "data": config.dict()}
+
+    return build_diff(left, right, diff_request.context)
+
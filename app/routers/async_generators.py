@@ -0,0 +1,42 @@
+# app/routers/async_generators.py
+# Асинхронные версии эндпоинтов /generate/* (включаются при DB_ASYNC_MODE=true)
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.auth.async_auth_service import get_current_user, consume_user_requests, refund_on_error
+from app.database.async_database import get_async_db
+from app.generators import GENERATORS, Generator
+from app.services import render_template_response
+
+router = APIRouter()
+
+
+def _make_generate_endpoint(generator: Generator):
+    async def generate(config: generator.model, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user)):
+        if not user:
+            raise HTTPException(status_code=401, detail="Authentication required")
+
+        if generator.validate:
+            try:
+                generator.validate(config)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+        if await consume_user_requests(db, user.id) is None:
+            raise HTTPException(status_code=403, detail="Request limit exceeded")
+
+        # Рендеринг — работа для CPU, поэтому выносим его из цикла событий
+        async with refund_on_error(db, user.id):
+            return await run_in_threadpool(render_template_response, generator.template_name, config.dict())
+
+    return generate
+
+
+for service_name, service_generator in GENERATORS.items():
+    router.add_api_route(
+        f"/generate/{service_name}",
+        _make_generate_endpoint(service_generator),
+        methods=["POST"],
+        name=f"generate_{service_name.replace('-', '_')}_async",
+    )
@@ -0,0 +1,165 @@
+import posixpath
+from typing import List, Any, Dict, Optional, Literal
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.auth.auth_service import (
+    get_db, get_current_user, consume_user_requests, refund_on_error, refund_user_requests
+)
+from app.config import settings
+from app.database.database import SessionLocal
+from app.database.models import ServiceTemplate
+from app.generators import parse_generator_input, render_many
+from app.utils.archive_stream import ARCHIVE_FORMATS
+
+router = APIRouter()
+
+
+class BatchItem(BaseModel):
+    service: str = Field(..., example="nginx", description="Имя генератора, например nginx, systemd, docker-compose")
+    config: Dict[str, Any] = Field(..., description="Параметры конфигурации для выбранного генератора")
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem] = Field(..., min_length=1)
+
+
+class BundleItem(BatchItem):
+    path: Optional[str] = Field(
+        None,
+        example="nginx/site.conf",
+        description="Путь файла внутри архива. По умолчанию <service>/<service><file_extension>"
+    )
+
+
+class BundleRequest(BaseModel):
+    items: List[BundleItem] = Field(..., min_length=1)
+    format: Literal["zip", "tar.gz"] = "zip"
+    name: str = Field("configs", description="Имя архива без расширения")
+
+
+@router.post("/generate/batch")
+def generate_batch(batch: BatchRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    if len(batch.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {settings.BATCH_MAX_ITEMS} items")
+
+    # Сначала валидируем все элементы: невалидные не рендерим и не списываем за них квоту
+    results = []
+    jobs = []
+    for index, item in enumerate(batch.items):
+        generator, config, error = parse_generator_input(item.service, item.config)
+        if error is not None:
+            results.append({"index": index, "service": item.service, "status": "error", "error": error})
+        else:
+            results.append({"index": index, "service": item.service, "status": "ok"})
+            jobs.append((index, generator, config))
+
+    # Квота списывается одним атомарным обновлением за весь пакет
+    if jobs and consume_user_requests(db, user.id, len(jobs)) is None:
+        raise HTTPException(status_code=403, detail="Request limit exceeded")
+
+    with refund_on_error(db, user.id, len(jobs)):
+        rendered = render_many([(generator, config) for _, generator, config in jobs])
+    for (index, _, _), (content, error) in zip(jobs, rendered):
+        if error is not None:
+            results[index].update(status="error", error=error)
+        else:
+            results[index]["content"] = content
+
+    # Элементы, которые не отрендерились, квоту не тратят
+    failed = sum(error is not None for _, error in rendered)
+    if failed:
+        refund_user_requests(db, user.id, failed)
+
+    return {"results": results}
+
+
+def _normalize_archive_path(path: str) -> Optional[str]:
+    """ Убирает лишние сегменты пути; возвращает None для путей вне архива """
+    normalized = posixpath.normpath(path.replace("\\", "/")).lstrip("/")
+    if not normalized or normalized == "." or normalized.startswith(".."):
+        return None
+    return normalized
+
+
+def _bundle_files(jobs: list, user_id: int):
+    """
+    Рендерит шаблоны по одному, отдавая каждый файл в архив сразу после рендеринга. Квота за
+    файлы, которые не отрендерились, возвращается в конце; сессия запроса к этому моменту уже
+    закрыта, поэтому — в своей
+    """
+    errors = []
+    for path, generator, config in jobs:
+        try:
+            content = generator.render(config)
+        except Exception as e:
+            errors.append(f"{path}: {e}")
+            continue
+        yield path, content.encode("utf-8")
+
+    if errors:
+        with SessionLocal() as db:
+            refund_user_requests(db, user_id, len(errors))
+        yield "ERRORS.txt", "\n".join(errors).encode("utf-8")
+
+
+@router.post("/generate/bundle")
+def generate_bundle(bundle: BundleRequest, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    if len(bundle.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {settings.BATCH_MAX_ITEMS} items")
+
+    # Расширения файлов берем из каталога шаблонов
+    extensions = {
+        template_filename: file_extension
+        for template_filename, file_extension in db.query(
+            ServiceTemplate.template_filename, ServiceTemplate.file_extension
+        )
+    }
+
+    jobs, errors, used_paths = [], [], set()
+    for index, item in enumerate(bundle.items):
+        generator, config, error = parse_generator_input(item.service, item.config)
+        if error is not None:
+            errors.append({"index": index, "service": item.service, "error": error})
+            continue
+
+        if item.path:
+            path = _normalize_archive_path(item.path)
+            if path is None:
+                errors.append({"index": index, "service": item.service, "error": "Invalid path"})
+                continue
+        else:
+            extension = extensions.get(generator.template_name) or ""
+            if extension and not extension.startswith("."):
+                extension = "." + extension
+            path = f"{item.service}/{item.service}{extension}"
+
+        if path in used_paths:
+            stem, ext = posixpath.splitext(path)
+            path = f"{stem}-{index + 1}{ext}"
+        used_paths.add(path)
+        jobs.append((path, generator, config))
+
+    # Архив нельзя «исправить» после начала отдачи, поэтому ошибки валидации — до стриминга
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+
+    if consume_user_requests(db, user.id, len(jobs)) is None:
+        raise HTTPException(status_code=403, detail="Request limit exceeded")
+
+    writer, media_type, extension = ARCHIVE_FORMATS[bundle.format]
+    filename = _normalize_archive_path(bundle.name) or "configs"
+    return StreamingResponse(
+        writer(_bundle_files(jobs, user.id)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{posixpath.basename(filename)}.{extension}"'},
+    )
@@ -1,24 +1,50 @@
 # app/routers/configuration_router.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.database.database import get_db
-from app.auth.auth_service import get_current_user
+from app.config import settings
+from app.database.database import get_db, SessionLocal
+from app.auth.auth_service import get_current_user, consume_user_requests, refund_on_error
 from app.database.models import User
-from app.schemas.configuration import Configuration, ConfigurationCreate, ConfigurationUpdate
+from app.schemas.configuration import (
+    Configuration, ConfigurationCreate, ConfigurationUpdate, ConfigurationListItem, ConfigurationRevision,
+    ConfigurationRevisionContent, ConfigurationDiffRequest, ConfigurationDiff, ConfigurationSearchHit
+)
+from app.utils.cached_response import etag_matches
+from app.utils.pagination import PAGE_MAX_LIMIT, set_next_cursor
 from app.database.configuration_crud import (
     create_configuration,
     get_configurations_by_user,
     get_configuration,
+    get_configuration_etag,
+    get_configurations_etag,
     update_configuration,
-    delete_configuration
+    delete_configuration,
+    get_configuration_revisions,
+    get_configuration_revision,
+    restore_configuration_revision,
+    get_configuration_text,
+    patch_configuration_input,
+    configuration_etag,
+    configurations_etag,
+    ConfigurationConflict,
+    PreconditionFailed
 )
+from app.database.configuration_search import search_configurations
+from app.database.configuration_bulk_crud import export_configurations, import_configurations_batch
+from app.configuration_diff import parse_right_config, build_diff
+from app.utils.ndjson import NDJSON_MEDIA_TYPE, iter_ndjson
 
 router = APIRouter(
     prefix="/configurations"
 )
 
+# Конфигурации личные и меняются в любой момент: кэшировать можно, но только с перепроверкой ETag
+CONFIGURATION_CACHE_CONTROL = "private, no-cache"
+
 @router.post("", response_model=Configuration)
 def create_config(
     config: ConfigurationCreate,
@@ -32,33 +58,175 @@ def create_config(
 
     return new_config
 
-@router.get("", response_model=List[Configuration])
+@router.get("", response_model=List[ConfigurationListItem], response_model_exclude_unset=True)
 def read_configs(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    summary: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    configs = get_configurations_by_user(db, current_user.id)
+    # Без limit отдаётся весь список, как раньше; следующая страница — по заголовку X-Next-Cursor
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        # Сверяем версии строк страницы, не читая содержимое; совпало — 304 без тела
+        etag = get_configurations_etag(db, current_user.id, limit=limit, cursor=cursor, summary=summary)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONFIGURATION_CACHE_CONTROL})
+
+    configs, next_cursor = get_configurations_by_user(
+        db, current_user.id, limit=limit, cursor=cursor, summary=summary
+    )
+    set_next_cursor(response, next_cursor)
+    response.headers["ETag"] = configurations_etag(configs, next_cursor, summary)
+    response.headers["Cache-Control"] = CONFIGURATION_CACHE_CONTROL
     return configs
 
+@router.get("/search", response_model=List[ConfigurationSearchHit])
+def search_configs(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Ранжированный поиск по названию, сервису и тексту; следующая страница — по X-Next-Cursor
+    found = search_configurations(db, current_user.id, q, limit, cursor)
+    if found is None:
+        raise HTTPException(status_code=503, detail="Search is not available")
+    hits, next_cursor = found
+    set_next_cursor(response, next_cursor)
+    return hits
+
+@router.get("/export")
+def export_configs(current_user: User = Depends(get_current_user)):
+    """ Все конфигурации пользователя в NDJSON, по строке на конфигурацию """
+    user_id = current_user.id
+
+    def stream():
+        # Сессия запроса закрывается до начала отдачи, поэтому курсор живёт в своей сессии
+        db = SessionLocal()
+        try:
+            yield from export_configurations(db, user_id, settings.CONFIG_EXPORT_CHUNK_ROWS)
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type=NDJSON_MEDIA_TYPE,
+        headers={"Content-Disposition": 'attachment; filename="configurations.ndjson"'},
+    )
+
+@router.post("/import")
+async def import_configs(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Импорт NDJSON (формат выгрузки; id и даты игнорируются). Тело читается потоком,
+    строки сохраняются пачками по CONFIG_IMPORT_BATCH_SIZE; уже существующие конфигурации
+    пропускаются (skipped), ошибки возвращаются по номерам строк.
+    """
+    imported, skipped, failed, errors = 0, 0, 0, []
+
+    def add_errors(new_errors):
+        nonlocal failed
+        failed += len(new_errors)
+        errors.extend(new_errors[:max(settings.CONFIG_IMPORT_MAX_ERRORS - len(errors), 0)])
+
+    batch = []
+    async for line_no, record, error in iter_ndjson(request.stream(), settings.CONFIG_IMPORT_MAX_LINE_BYTES):
+        if error is not None:
+            add_errors([{"line": line_no, "error": error}])
+            continue
+        batch.append((line_no, record))
+        if len(batch) >= settings.CONFIG_IMPORT_BATCH_SIZE:
+            count, batch_skipped, batch_errors = await run_in_threadpool(
+                import_configurations_batch, db, current_user.id, batch
+            )
+            imported += count
+            skipped += batch_skipped
+            add_errors(batch_errors)
+            batch = []
+    if batch:
+        count, batch_skipped, batch_errors = await run_in_threadpool(
+            import_configurations_batch, db, current_user.id, batch
+        )
+        imported += count
+        skipped += batch_skipped
+        add_errors(batch_errors)
+
+    errors.sort(key=lambda item: item["line"])
+    return {
+        "imported": imported, "skipped": skipped, "failed": failed,
+        "errors": errors, "errors_truncated": failed > len(errors),
+    }
+
 @router.get("/{config_id}", response_model=Configuration)
 def read_config(
     config_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        etag = get_configuration_etag(db, config_id, current_user.id)
+        if etag is None:
+            raise HTTPException(status_code=404, detail="Configuration not found")
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONFIGURATION_CACHE_CONTROL})
+
     config = get_configuration(db, config_id, current_user.id)
     if not config:
         raise HTTPException(status_code=404, detail="Configuration not found")
+    response.headers["ETag"] = configuration_etag(config)
+    response.headers["Cache-Control"] = CONFIGURATION_CACHE_CONTROL
     return config
 
 @router.put("/{config_id}", response_model=Configuration)
 def update_config(
     config_id: int,
     config_update: ConfigurationUpdate,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    config = update_configuration(db, config_id, current_user.id, config_update)
+    # If-Match: ETag, полученный клиентом при чтении, — защита от потери чужой правки
+    try:
+        config = update_configuration(
+            db, config_id, current_user.id, config_update, if_match=request.headers.get("if-match")
+        )
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=412, detail=str(e), headers={"ETag": e.etag} if e.etag else None)
+    except ConfigurationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not config:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    response.headers["ETag"] = configuration_etag(config)
+    return config
+
+@router.patch("/{config_id}/input", response_model=Configuration)
+def patch_config_input(
+    config_id: int,
+    patch: Dict[str, Any] = Body(..., description="JSON Merge Patch параметров генератора; null сбрасывает поле"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        config = patch_configuration_input(db, config_id, current_user.id, patch)
+    except ConfigurationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not config:
         raise HTTPException(status_code=404, detail="Configuration not found")
     return config
@@ -72,4 +240,71 @@ def delete_config(
     config = delete_configuration(db, config_id, current_user.id)
     if not config:
         raise HTTPException(status_code=404, detail="Configuration not found")
-    return config
\ No newline at end of file
+    return config
+
+@router.get("/{config_id}/revisions", response_model=List[ConfigurationRevision])
+def read_config_revisions(
+    config_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    revisions = get_configuration_revisions(db, config_id, current_user.id)
+    if revisions is None:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+    return revisions
+
+@router.get("/{config_id}/revisions/{revision}", response_model=ConfigurationRevisionContent)
+def read_config_revision(
+    config_id: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    content = get_configuration_revision(db, config_id, current_user.id, revision)
+    if not content:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return content
+
+@router.post("/{config_id}/revisions/{revision}/restore", response_model=Configuration)
+def restore_config_revision(
+    config_id: int,
+    revision: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Восстановление не переписывает историю, а добавляет новую версию с тем же содержимым
+    try:
+        config = restore_configuration_revision(db, config_id, current_user.id, revision)
+    except ConfigurationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not config:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return config
+
+@router.post("/diff", response_model=ConfigurationDiff)
+def diff_configs(
+    diff_request: ConfigurationDiffRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    if (diff_request.right_id is None) == (diff_request.right_config is None):
+        raise HTTPException(status_code=400, detail="Specify either right_id or right_config")
+
+    left = get_configuration_text(db, diff_request.left_id, current_user.id, diff_request.left_revision)
+    if not left:
+        raise HTTPException(status_code=404, detail="Configuration not found")
+
+    if diff_request.right_id is not None:
+        right = get_configuration_text(db, diff_request.right_id, current_user.id, diff_request.right_revision)
+        if not right:
+            raise HTTPException(status_code=404, detail="Configuration not found")
+    else:
+        # Новые параметры рендерятся как обычная генерация и списывают запрос из квоты
+        generator, config = parse_right_config(left["service"], diff_request.right_config)
+        if consume_user_requests(db, current_user.id) is None:
+            raise HTTPException(status_code=403, detail="Request limit exceeded")
+        with refund_on_error(db, current_user.id):
+            right = {"name": "new", "text": generator.render(config), "data": config.dict()}
+
+    return build_diff(left, right, diff_request.context)
+
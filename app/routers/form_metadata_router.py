@@ -0,0 +1,16 @@
+from typing import Optional
+
+from fastapi import APIRouter, Request, Query
+
+from app.form_metadata import catalogue_metadata_response
+
+router = APIRouter()
+
+
+@router.get("/form-metadata")
+def get_all_form_metadata(
+    request: Request,
+    services: Optional[str] = Query(None, description="Список сервисов через запятую, например nginx,redis"),
+):
+    # Один запрос вместо отдельного /form-metadata/<service> на каждую карточку
+    return catalogue_metadata_response(request, services)
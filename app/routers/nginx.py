@@ -1,10 +1,9 @@
-from typing import get_args, Optional, get_type_hints
-
-from fastapi import APIRouter, Depends, Response, HTTPException
+from fastapi import APIRouter, Depends, Response, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from app.database.database import init_db
-from app.auth.auth_service import get_current_user, check_user_limit, increment_user_requests, get_db
+from app.auth.auth_service import get_current_user, consume_user_requests, refund_on_error, get_db
+from app.form_metadata import form_metadata_response
 from app.services import render_template
 from app.models.nginx_model import NginxConfig
 from app.database.models import User
@@ -13,79 +12,8 @@ router = APIRouter()
 
 
 @router.get("/form-metadata/nginx")
-def get_nginx_form_metadata():
-    schema = NginxConfig.schema()
-    fields = []
-    dependencies = {}
-
-    # Определение зависимостей
-    dependency_map = {
-        "enable_ssl": ["ssl_certificate", "ssl_certificate_key"],
-        "enable_logging": ["access_log", "error_log"],
-        "enable_proxy": ["proxy_pass"],
-        "enable_basic_auth": ["auth_user_file"],
-        "enable_cors": ["cors_allowed_origins"],
-    }
-
-    # Берем реальные типы данных из модели `NginxConfig`
-    type_hints = get_type_hints(NginxConfig)
-
-    # Кастомное отображение типов для фронтенда
-    type_mapping = {
-        bool: "bool",
-        int: "int",
-        str: "str",
-        list: "list",
-        dict: "dict",
-    }
-
-    def get_real_type(field_name):
-        """ Определяем точный тип данных, убирая `Optional[]` """
-        annotation = type_hints.get(field_name, str)  # По умолчанию считаем строкой
-        if hasattr(annotation, "__origin__") and annotation.__origin__ is Optional:
-            annotation = get_args(annotation)[0]  # Достаем реальный тип данных из Optional[]
-        return annotation
-
-    for field_name, field_info in schema["properties"].items():
-        # Получаем реальный тип данных без Optional[]
-        python_type = get_real_type(field_name)
-        mapped_type = type_mapping.get(python_type, "str")
-
-        field = {
-            "name": field_name,
-            "label": field_name.replace("_", " ").capitalize(),
-            "required": field_name in schema.get("required", []),
-            "defaultValue": field_info.get("default", None),
-            "description": field_info.get("description", ""),  # Добавляем описание
-            "variableType": mapped_type  # Теперь берем реальный тип переменной!
-        }
-
-        # Определяем тип поля для формы
-        if mapped_type == "bool":
-            field["type"] = "checkbox"
-        elif mapped_type == "int":
-            field["type"] = "number"
-        elif mapped_type == "list":
-            field["type"] = "array"
-        elif mapped_type == "dict":
-            field["type"] = "json"
-        else:
-            field["type"] = "text"
-
-        # Добавляем placeholder, если есть
-        if "example" in field_info:
-            field["placeholder"] = str(field_info["example"])
-
-        # Определяем, является ли поле дополнительным
-        field["isAdvanced"] = not field["required"] and not field_name.startswith("enable_")
-
-        # Если поле является чекбоксом, добавляем зависимости
-        if field_name in dependency_map:
-            dependencies[field_name] = dependency_map[field_name]
-
-        fields.append(field)
-
-    return {"fields": fields, "dependencies": dependencies}
+def get_nginx_form_metadata(request: Request):
+    return form_metadata_response(request, "nginx")
 
 
 @router.post("/generate/nginx")
@@ -93,10 +21,11 @@ def generate_nginx(config: NginxConfig, db: Session = Depends(get_db), user=Depe
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
 
-    if not check_user_limit(db, user.id):
+    # Сброс месячного счётчика, проверка лимита и учёт запроса — одним UPDATE
+    if consume_user_requests(db, user.id) is None:
         raise HTTPException(status_code=403, detail="Request limit exceeded")
+
     # Генерируем конфигурацию
-    nginx = render_template("nginx.j2", config.dict())
-    # Учитываем запрос в БД
-    increment_user_requests(db, user.id)
+    with refund_on_error(db, user.id):
+        nginx = render_template("nginx.j2", config.dict())
     return Response(content=nginx, media_type="text/plain")
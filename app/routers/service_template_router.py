@@ -1,29 +1,60 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from starlette.datastructures import UploadFile as StarletteUploadFile
+from starlette.formparsers import MultiPartParser, MultiPartException
+
+from app.config import settings
 from app.database.database import get_db
 from app.database.service_template_crud import (
-    create_service_template, get_all_service_templates,
-    get_service_template_by_id, update_service_template, delete_service_template
+    create_service_template, update_service_template, delete_service_template,
+    set_service_template_icon, get_service_template_icon, service_catalogue
 )
 from app.schemas.service_template import ServiceTemplateCreate, ServiceTemplateUpdate, ServiceTemplateResponse
-from app.utils.image_utils import convert_image_to_base64
+from app.utils.cached_response import etag_matches
+from app.utils.image_utils import detect_image_type, make_thumbnail
+from app.utils.pagination import PAGE_MAX_LIMIT, set_next_cursor
 
 router = APIRouter(prefix="/templates")
 
+ICON_IMMUTABLE = "public, max-age=31536000, immutable"
+# Иконка отдаётся с origin API: браузер не должен ни угадывать тип, ни исполнять что-либо из неё
+# (иконки, загруженные до проверки формата, могут оказаться SVG)
+ICON_SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; sandbox",
+}
+MULTIPART_OVERHEAD = 16 * 1024  # Заголовки частей multipart сверх самого файла
+
 @router.post("", response_model=ServiceTemplateResponse)
 def create_template(template: ServiceTemplateCreate, db: Session = Depends(get_db)):
     return create_service_template(db, template)
 
 @router.get("", response_model=list[ServiceTemplateResponse])
-def list_templates(db: Session = Depends(get_db)):
-    return get_all_service_templates(db)
+def list_templates(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    summary: bool = False,
+):
+    # Отдаётся из кэша каталога, без обращения к БД; полный список — готовыми байтами с ETag
+    if limit is None and cursor is None and not summary:
+        return service_catalogue.templates_response(request)
+
+    templates, next_cursor = service_catalogue.templates_page(limit, cursor, summary)
+    response = JSONResponse(templates)
+    set_next_cursor(response, next_cursor)
+    return response
 
 @router.get("/{template_id}", response_model=ServiceTemplateResponse)
-def get_template(template_id: int, db: Session = Depends(get_db)):
-    template = get_service_template_by_id(db, template_id)
-    if not template:
+def get_template(template_id: int, request: Request):
+    response = service_catalogue.template_response(request, template_id)
+    if response is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    return template
+    return response
 
 @router.put("/{template_id}", response_model=ServiceTemplateResponse)
 def update_template(template_id: int, template_update: ServiceTemplateUpdate, db: Session = Depends(get_db)):
@@ -40,30 +71,122 @@ def delete_template(template_id: int, db: Session = Depends(get_db)):
     return {"detail": "Template deleted"}
 
 
-@router.post("/{template_id}/icon", response_model=ServiceTemplateResponse)
-async def upload_template_icon(
-        template_id: int,
-        icon: UploadFile = File(...),
-        db: Session = Depends(get_db)
-):
+async def _limited_body(request: Request, limit: int):
+    """ Тело запроса по частям; как только прочитано больше limit байт — 413, остаток не читаем """
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > limit:
+            raise HTTPException(status_code=413, detail="Файл иконки слишком большой")
+        yield chunk
+
+
+async def _read_icon_upload(request: Request) -> tuple[bytes, str]:
+    """
+    Принимает иконку либо как multipart/form-data с полем icon (как раньше), либо сырым телом
+    с Content-Type image/*. Размер ограничивается по мере чтения потока, а не после.
+    Тип определяется по содержимому (только png, jpeg, gif, webp), заявленному клиентом не верим.
+    """
+    limit = settings.ICON_MAX_BYTES
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail="Файл иконки слишком большой")
+
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        parser = MultiPartParser(request.headers, _limited_body(request, limit + MULTIPART_OVERHEAD), max_files=1)
+        try:
+            form = await parser.parse()
+        except MultiPartException as exc:
+            raise HTTPException(status_code=400, detail=exc.message)
+        icon = form.get("icon")
+        if not isinstance(icon, StarletteUploadFile):
+            raise HTTPException(status_code=422, detail="Поле icon с файлом обязательно")
+        try:
+            data = await icon.read(limit + 1)
+        finally:
+            await form.close()
+        content_type = icon.content_type or ""
+    else:
+        data = bytearray()
+        async for chunk in _limited_body(request, limit):
+            data += chunk
+        data = bytes(data)
+
+    if len(data) > limit:
+        raise HTTPException(status_code=413, detail="Файл иконки слишком большой")
     # Проверяем MIME-тип файла
-    content_type = icon.content_type
     if not content_type.startswith("image/"):
         raise HTTPException(
             status_code=400,
             detail="Загруженный файл не является изображением"
         )
+    if not data:
+        raise HTTPException(status_code=400, detail="Пустой файл")
+    detected_type = detect_image_type(data)
+    if detected_type is None:
+        raise HTTPException(status_code=415, detail="Поддерживаются иконки PNG, JPEG, GIF и WebP")
+    return data, detected_type
+
 
-    # Получаем шаблон из БД
-    template = get_service_template_by_id(db, template_id)
-    if not template:
+@router.post(
+    "/{template_id}/icon",
+    response_model=ServiceTemplateResponse,
+    openapi_extra={"requestBody": {"content": {
+        "multipart/form-data": {"schema": {
+            "type": "object", "properties": {"icon": {"type": "string", "format": "binary"}}, "required": ["icon"],
+        }},
+        "image/*": {"schema": {"type": "string", "format": "binary"}},
+    }}},
+)
+async def upload_template_icon(template_id: int, request: Request, db: Session = Depends(get_db)):
+    data, content_type = await _read_icon_upload(request)
+
+    # Миниатюру считаем в пуле потоков: Pillow блокирует event loop
+    thumbnail = await run_in_threadpool(make_thumbnail, data, settings.ICON_THUMBNAIL_SIZE)
+    updated_template = await run_in_threadpool(
+        set_service_template_icon, db, template_id, data, content_type, thumbnail
+    )
+    if not updated_template:
         raise HTTPException(status_code=404, detail="Template not found")
+    return updated_template
 
-    # Конвертируем изображение в Base64
-    icon_base64 = convert_image_to_base64(icon)
 
-    # Обновляем шаблон
-    template_update = ServiceTemplateUpdate(icon=icon_base64)
-    updated_template = update_service_template(db, template_id, template_update)
+@router.get("/{template_id}/icon")
+def get_template_icon(template_id: int, request: Request, v: Optional[str] = None, thumbnail: bool = False,
+                      db: Session = Depends(get_db)):
+    """
+    Иконка шаблона. URL из icon_url содержит версию (?v=<хэш>), поэтому такой ответ кэшируется
+    навсегда; без версии или со старой версией клиент обязан перепроверять ETag.
+    """
+    snapshot = service_catalogue.get()
+    if template_id not in snapshot.icon_hashes:
+        raise HTTPException(status_code=404, detail="Template not found")
+    icon_hash = snapshot.icon_hashes[template_id]
+    if not icon_hash:
+        raise HTTPException(status_code=404, detail="Icon not found")
 
-    return updated_template
+    immutable = v is not None and len(v) >= 8 and icon_hash.startswith(v)
+    headers = {"Cache-Control": ICON_IMMUTABLE if immutable else "no-cache", **ICON_SECURITY_HEADERS}
+    # Для миниатюры подходит и ETag оригинала: его отдают, когда миниатюры нет
+    etags = (_icon_etag(icon_hash, True), _icon_etag(icon_hash, False)) if thumbnail else (_icon_etag(icon_hash, False),)
+    if etag_matches(request.headers.get("if-none-match"), *etags):
+        return Response(status_code=304, headers={**headers, "ETag": etags[0]})
+
+    icon = get_service_template_icon(db, template_id, thumbnail=thumbnail)
+    if thumbnail and icon is not None and icon.data is None:
+        # Миниатюры нет (маленькая иконка или не установлен Pillow) — отдаём оригинал
+        icon, thumbnail = get_service_template_icon(db, template_id), False
+    if icon is None or icon.data is None:
+        raise HTTPException(status_code=404, detail="Icon not found")
+    if icon.icon_hash != icon_hash:
+        # Иконку заменили после сборки снимка каталога: отдаём новую, но без вечного кэширования
+        headers["Cache-Control"] = "no-cache"
+
+    headers["ETag"] = _icon_etag(icon.icon_hash, thumbnail)
+    media_type = "image/png" if thumbnail else icon.icon_content_type
+    return Response(content=icon.data, media_type=media_type, headers=headers)
+
+
+def _icon_etag(icon_hash: str, thumbnail: bool) -> str:
+    return f'"{icon_hash}-thumb"' if thumbnail else f'"{icon_hash}"'
@@ -1,25 +1,81 @@
 # app/schemas/configuration.py
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
 
 class ConfigurationBase(BaseModel):
     service: str
     config_name: str
-    config_data: str
 
 class ConfigurationCreate(ConfigurationBase):
-    pass
+    # Сохраняется либо готовый текст, либо параметры генератора (текст тогда рендерится при чтении)
+    config_data: Optional[str] = None
+    config_input: Optional[Dict[str, Any]] = None
 
 class ConfigurationUpdate(BaseModel):
     config_name: Optional[str] = None
     config_data: Optional[str] = None
+    config_input: Optional[Dict[str, Any]] = None  # Полная замена параметров; частичная — PATCH .../input
 
 class Configuration(ConfigurationBase):
     id: int
     user_id: int
+    config_data: Optional[str] = None
+    config_input: Optional[Dict[str, Any]] = None
+    template_version: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ConfigurationListItem(Configuration):
+    """ Элемент списка: в режиме summary config_data не загружается и не отдаётся """
+    config_data: Optional[str] = None
+
+
+class ConfigurationRevision(BaseModel):
+    revision: int
+    size: int
+    created_at: datetime
+    is_snapshot: bool
+
+class ConfigurationRevisionContent(BaseModel):
+    revision: int
+    created_at: datetime
+    config_data: str
+
+
+class ConfigurationDiffRequest(BaseModel):
+    """ Сравнение сохранённой конфигурации (или её версии) с другой сохранённой или с новыми параметрами """
+    left_id: int
+    left_revision: Optional[int] = None
+    right_id: Optional[int] = None
+    right_revision: Optional[int] = None
+    right_config: Optional[Dict[str, Any]] = Field(
+        None, description="Параметры генератора того же сервиса, что и left_id (вместо right_id)"
+    )
+    context: int = Field(3, ge=0, le=50, description="Строк контекста вокруг изменений")
+
+class ConfigurationFieldChange(BaseModel):
+    field: str
+    change: str  # added / removed / changed
+    old: Any = None
+    new: Any = None
+
+class ConfigurationDiff(BaseModel):
+    diff: str
+    added: int
+    removed: int
+    approximate: bool  # Отличий слишком много для точного diff — он корректен, но не минимален
+    truncated: bool  # Вывод обрезан до DIFF_MAX_LINES строк
+    fields: Optional[List[ConfigurationFieldChange]] = None  # Только если у обеих сторон есть параметры
+
+
+class ConfigurationSearchHit(BaseModel):
+    id: int
+    service: str
+    config_name: str
+    updated_at: datetime
+    score: float  # Чем больше, тем лучше совпадение
+    snippet: str  # Фрагмент текста, HTML-экранирован, совпадения в <mark>
@@ -8,7 +8,6 @@ class ServiceTemplateBase(BaseModel):
     description: Optional[str] = None
     file_extension: Optional[str] = None
     template_filename: str
-    icon: Optional[str] = None  # Base64-строка
 
 class ServiceTemplateCreate(ServiceTemplateBase):
     pass
@@ -18,10 +17,10 @@ class ServiceTemplateUpdate(BaseModel):
     description: Optional[str] = None
     file_extension: Optional[str] = None
     template_filename: Optional[str] = None
-    icon: Optional[str] = None
 
 class ServiceTemplateResponse(ServiceTemplateBase):
     id: int
+    icon_url: Optional[str] = None  # Сама иконка — GET /api/templates/{id}/icon
 
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -1,10 +1,238 @@
-from jinja2 import Environment, FileSystemLoader
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
 
-env = Environment(loader=FileSystemLoader("app/templates"),
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+from app.config import settings
+
+
+def _create_bytecode_cache():
+    """ Персистентный кэш байткода шаблонов на диске (переживает рестарт воркеров) """
+    if not settings.TEMPLATES_BYTECODE_CACHE_DIR:
+        return None
+    os.makedirs(settings.TEMPLATES_BYTECODE_CACHE_DIR, exist_ok=True)
+    return FileSystemBytecodeCache(settings.TEMPLATES_BYTECODE_CACHE_DIR)
+
+
+env = Environment(loader=FileSystemLoader(settings.TEMPLATES_DIR),
                   trim_blocks=True,  # Убирает лишние пустые строки
-                  lstrip_blocks=True  # Убирает лишние пробелы перед блоками
+                  lstrip_blocks=True,  # Убирает лишние пробелы перед блоками
+                  # В production-режиме не проверяем mtime шаблона на каждом вызове
+                  # и никогда не вытесняем скомпилированные шаблоны из кэша
+                  auto_reload=not settings.TEMPLATES_PRODUCTION_MODE,
+                  cache_size=-1 if settings.TEMPLATES_PRODUCTION_MODE else 400,
+                  bytecode_cache=_create_bytecode_cache()
                    )
 
-def render_template(template_name: str, context: dict) -> str:
+# Состояние прогрева шаблонов (для readiness-пробы)
+_warmup_lock = threading.Lock()
+_warmup_state = {
+    "status": "cold",
+    "compiled": [],
+    "failed": {},
+    "duration_ms": None,
+}
+
+
+def warm_up_templates() -> dict:
+    """ Компилирует все .j2 шаблоны заранее, чтобы первый запрос не платил за парсинг """
+    with _warmup_lock:
+        started = time.perf_counter()
+        compiled, failed = [], {}
+        for template_name in env.list_templates(extensions=["j2"]):
+            try:
+                env.get_template(template_name)
+                compiled.append(template_name)
+            except Exception as e:
+                failed[template_name] = str(e)
+
+        _warmup_state.update(
+            status="warm" if not failed else "failed",
+            compiled=compiled,
+            failed=failed,
+            duration_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return templates_status()
+
+
+def templates_status() -> dict:
+    """ Текущее состояние прогрева: cold / warm / failed """
+    return {
+        **_warmup_state,
+        "compiled": list(_warmup_state["compiled"]),
+        "failed": dict(_warmup_state["failed"]),
+        "production_mode": settings.TEMPLATES_PRODUCTION_MODE,
+    }
+
+
+class RenderCache:
+    """ LRU-кэш результатов рендеринга с TTL и ограничением по размеру в байтах """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value: str):
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return  # Слишком большой результат не кэшируем вовсе
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl_seconds)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._drop(oldest_key)
+                self.evictions += 1
+
+    def invalidate_template(self, template_name: str):
+        """ Удаляет все результаты, отрендеренные из указанного шаблона """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == template_name]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": settings.RENDER_CACHE_ENABLED,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+
+render_cache = RenderCache(
+    max_entries=settings.RENDER_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RENDER_CACHE_MAX_BYTES,
+    ttl_seconds=settings.RENDER_CACHE_TTL_SECONDS,
+)
+
+# template_name -> (объект скомпилированного шаблона, версия исходника)
+_template_versions = {}
+
+
+def get_template_version(template_name: str) -> str:
+    """ Версия шаблона — хэш его исходника. Меняется, когда Jinja перезагружает файл """
     template = env.get_template(template_name)
-    return template.render(context)
+    cached = _template_versions.get(template_name)
+    if cached and cached[0] is template:
+        return cached[1]
+
+    source, _, _ = env.loader.get_source(env, template_name)
+    version = hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+    _template_versions[template_name] = (template, version)
+    if cached:
+        # Файл шаблона изменился — старые результаты больше не актуальны
+        render_cache.invalidate_template(template_name)
+    return version
+
+
+def context_fingerprint(context: dict) -> str:
+    """ Канонический хэш контекста: порядок ключей не влияет на результат """
+    canonical = json.dumps(context, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def render_template(template_name: str, context: dict) -> str:
+    if not settings.RENDER_CACHE_ENABLED:
+        return env.get_template(template_name).render(context)
+
+    key = (template_name, get_template_version(template_name), context_fingerprint(context))
+    rendered = render_cache.get(key)
+    if rendered is None:
+        rendered = env.get_template(template_name).render(context)
+        render_cache.set(key, rendered)
+    return rendered
+
+
+# Размер блока, которым отдаётся потоковый ответ (Jinja генерирует очень мелкие куски)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _coalesce(chunks, chunk_size: int = STREAM_CHUNK_SIZE):
+    """ Склеивает мелкие куски вывода Jinja в блоки примерно по chunk_size символов """
+    block, size = [], 0
+    for chunk in chunks:
+        block.append(chunk)
+        size += len(chunk)
+        if size >= chunk_size:
+            yield "".join(block)
+            block, size = [], 0
+    if block:
+        yield "".join(block)
+
+
+def render_template_response(template_name: str, context: dict, media_type: str = "text/plain") -> Response:
+    """
+    Рендерит шаблон в HTTP-ответ. В потоковом режиме небольшой вывод отдаётся обычным Response,
+    а как только он превышает RENDER_STREAM_THRESHOLD_BYTES — остаток досылается через StreamingResponse
+    """
+    if not settings.RENDER_STREAMING_ENABLED:
+        return Response(content=render_template(template_name, context), media_type=media_type)
+
+    key = None
+    if settings.RENDER_CACHE_ENABLED:
+        key = (template_name, get_template_version(template_name), context_fingerprint(context))
+        cached = render_cache.get(key)
+        if cached is not None:
+            return Response(content=cached, media_type=media_type)
+
+    chunks = env.get_template(template_name).generate(context)
+    buffered, size = [], 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        size += len(chunk)
+        if size >= settings.RENDER_STREAM_THRESHOLD_BYTES:
+            # Большой вывод: не собираем строку целиком, а досылаем генератор по частям
+            return StreamingResponse(_coalesce(chain(buffered, chunks)), media_type=media_type)
+
+    content = "".join(buffered)
+    if key is not None:
+        render_cache.set(key, content)
+    return Response(content=content, media_type=media_type)
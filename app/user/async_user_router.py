@@ -0,0 +1,16 @@
+# app/user/async_user_router.py
+# Асинхронная версия /account/info (включается при DB_ASYNC_MODE=true)
+from fastapi import APIRouter, HTTPException, Depends
+
+from app.auth.async_auth_service import get_current_user
+from app.database.models import User
+from app.user.user_router import account_info
+
+router = APIRouter()
+
+@router.get("/account/info")
+async def get_account_info(user: User = Depends(get_current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return account_info(user)
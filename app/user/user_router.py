@@ -13,6 +13,9 @@ def get_account_info(
     if not user:
         raise HTTPException(status_code=401, detail="Authentication required")
 
+    return account_info(user)
+
+def account_info(user: User) -> dict:
     return {
         "id": user.id,
         "email": user.email,
@@ -0,0 +1,63 @@
+# app/utils/archive_stream.py
+
+import io
+import tarfile
+import time
+import zipfile
+
+
+class _ChunkBuffer(io.RawIOBase):
+    """ Поток только на запись: копит байты, пока их не заберёт генератор ответа """
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(files):
+    """ Пишет ZIP по мере поступления файлов (name, bytes), не держа весь архив в памяти """
+    buffer = _ChunkBuffer()
+    # Поток без seek/tell: zipfile сам переключится на дескрипторы данных после каждого файла
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files:
+            info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            archive.writestr(info, data)
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    yield buffer.drain()
+
+
+def stream_tar_gz(files):
+    """ Пишет tar.gz в потоковом режиме ("w|gz") по мере поступления файлов """
+    buffer = _ChunkBuffer()
+    with tarfile.open(fileobj=buffer, mode="w|gz") as archive:
+        for name, data in files:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            archive.addfile(info, io.BytesIO(data))
+            chunk = buffer.drain()
+            if chunk:
+                yield chunk
+    yield buffer.drain()
+
+
+ARCHIVE_FORMATS = {
+    "zip": (stream_zip, "application/zip", "zip"),
+    "tar.gz": (stream_tar_gz, "application/gzip", "tar.gz"),
+}
@@ -0,0 +1,48 @@
+# app/utils/cached_response.py
+import gzip
+import hashlib
+import json
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+
+def serialize_json(payload) -> bytes:
+    """ Компактный JSON в UTF-8 — так же, как его отдал бы JSONResponse, только без пробелов """
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class CachedJSON:
+    """ Заранее сериализованный JSON-ответ: тело, его gzip-версия и сильные ETag для обеих """
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+def etag_matches(if_none_match: str | None, *etags: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return any(etag in candidates for etag in etags)
+
+
+def cached_json_response(request: Request, entry: CachedJSON, cache_control: str,
+                         headers: dict | None = None) -> Response:
+    """ Отдаёт готовые байты: 304 по If-None-Match, gzip — если клиент его принимает """
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = entry.gzip_etag if use_gzip else entry.etag
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match"), entry.etag, entry.gzip_etag):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
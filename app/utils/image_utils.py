@@ -1,6 +1,7 @@
 # В app/utils/image_utils.py
 
 import base64
+import io
 from pathlib import Path
 from fastapi import UploadFile
 
@@ -20,4 +21,48 @@ def convert_file_path_to_base64(file_path: str) -> str:
 
     with open(file_path, "rb") as image_file:
         encoded = base64.b64encode(image_file.read())
-        return encoded.decode('utf-8')
\ No newline at end of file
+        return encoded.decode('utf-8')
+
+# Сигнатуры растровых форматов, которые принимаем как иконки. SVG и прочее не принимаем:
+# SVG может содержать скрипт, а иконки отдаются с того же origin, что и API с куками авторизации
+_IMAGE_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def detect_image_type(image_bytes: bytes) -> str | None:
+    """ MIME-тип растрового изображения по содержимому (png, jpeg, gif, webp); None — если это не оно """
+    for signature, content_type in _IMAGE_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return content_type
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def make_thumbnail(image_bytes: bytes, size: int) -> bytes | None:
+    """
+    Уменьшенная копия изображения в PNG (не больше size x size, пропорции сохраняются).
+    Возвращает None, если Pillow не установлен, формат не поддерживается (например, SVG)
+    или изображение и так не больше миниатюры.
+    """
+    if size <= 0:
+        return None
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            if image.width <= size and image.height <= size:
+                return None
+            image.thumbnail((size, size))
+            output = io.BytesIO()
+            image.save(output, format="PNG", optimize=True)
+            return output.getvalue()
+    except Exception:
+        return None
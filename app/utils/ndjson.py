@@ -0,0 +1,64 @@
+# app/utils/ndjson.py
+"""
+NDJSON (JSON по строке на запись) для потоковых выгрузок и загрузок.
+
+Тело запроса читается по частям, в памяти держится только текущая строка; строка длиннее
+max_line_bytes не накапливается, а отдаётся как ошибка с остатком, пропущенным до перевода строки.
+"""
+import json
+from datetime import datetime
+from typing import AsyncIterator
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+
+def dumps_line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=_default) + "\n"
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_line_bytes: int):
+    """
+    Разбирает поток байтов на записи. Отдаёт (номер строки, dict, None) или
+    (номер строки, None, ошибка); пустые строки пропускаются, номера начинаются с 1.
+    """
+    buffer = bytearray()
+    line_no = 0
+    overflow = False
+
+    def parse(raw: bytes):
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            return line_no, None, f"Invalid JSON: {e}"
+        if not isinstance(record, dict):
+            return line_no, None, "Each line must be a JSON object"
+        return line_no, record, None
+
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            end = buffer.find(b"\n")
+            if end < 0:
+                if len(buffer) > max_line_bytes:
+                    overflow = True  # Строку целиком не храним, ждём её конца
+                    buffer.clear()
+                break
+            raw, buffer = bytes(buffer[:end]), buffer[end + 1:]
+            line_no += 1
+            if overflow or len(raw) > max_line_bytes:
+                overflow = False
+                yield line_no, None, f"Line is longer than {max_line_bytes} bytes"
+            elif raw.strip():
+                yield parse(raw)
+
+    line_no += 1
+    if overflow:
+        yield line_no, None, f"Line is longer than {max_line_bytes} bytes"
+    elif buffer.strip():
+        yield parse(bytes(buffer))
@@ -0,0 +1,76 @@
+# app/utils/pagination.py
+"""
+Keyset-пагинация (по курсору) для списков.
+
+Страница выбирается условием «ключ сортировки строго после последнего ключа предыдущей
+страницы», а не OFFSET, поэтому стоимость запроса не растёт с номером страницы, а вставки
+и удаления между запросами не дают пропусков и дублей. Курсор — непрозрачная строка
+(base64 от JSON со значениями ключа последней строки); клиент получает его в заголовке
+X-Next-Cursor и передаёт обратно в ?cursor=.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+PAGE_MAX_LIMIT = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns) -> list:
+    """ Разбирает курсор и приводит значения к типам колонок ключа; мусор — 400 """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if column.type.python_type is datetime else column.type.python_type(value)
+            for value, column in zip(values, columns)
+        ]
+    except (binascii.Error, ValueError, TypeError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query, columns, cursor: str | None = None, limit: int | None = None, descending: bool = False,
+                row_key=None):
+    """
+    Применяет к query сортировку по columns (ключ должен быть уникальным — последним в нём
+    идёт первичный ключ) и условие курсора. Возвращает (строки, курсор следующей страницы);
+    без limit отдаёт все строки, как раньше, и курсор None.
+    """
+    order = [column.desc() if descending else column.asc() for column in columns]
+    query = query.order_by(*order)
+
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            condition = columns[0] < values[0] if descending else columns[0] > values[0]
+        else:
+            key = tuple_(*columns)
+            condition = key < tuple_(*values) if descending else key > tuple_(*values)
+        query = query.filter(condition)
+
+    if limit is None:
+        return query.all(), None
+
+    # Берём на одну строку больше, чтобы без COUNT понять, есть ли следующая страница
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    row_key = row_key or (lambda row: [getattr(row, column.key) for column in columns])
+    return rows, encode_cursor(row_key(rows[-1]))
+
+
+def set_next_cursor(response: Response, next_cursor: str | None):
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
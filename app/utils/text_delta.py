@@ -0,0 +1,59 @@
+# app/utils/text_delta.py
+"""
+Компактные построчные дельты между версиями текста.
+
+Дельта — JSON-список операций над строками предыдущей версии:
+    n          — скопировать n строк как есть,
+    -n         — пропустить n строк,
+    ["a", "b"] — вставить строки (с сохранёнными переводами строк).
+Для типичной правки конфига (несколько строк из сотен) дельта в десятки раз меньше текста.
+Совпадения строк ищутся ограниченным diff из text_diff (не квадратичным SequenceMatcher).
+"""
+import json
+
+from app.utils.text_diff import get_opcodes, intern_lines, match_lines
+
+# Дельта имеет смысл, только если она заметно меньше самого текста
+MAX_DELTA_RATIO = 0.5
+
+
+def make_delta(old: str, new: str, max_edits: int = 200) -> str | None:
+    """
+    Дельта от old к new или None, если выгоднее хранить new целиком: отличий больше, чем
+    укладывается в max_edits (diff приблизительный), или дельта не меньше половины текста.
+    """
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    a, b = intern_lines(old_lines, new_lines)
+    matches, approximate = match_lines(a, b, max_edits)
+    if approximate:
+        return None
+    ops = []
+    for tag, i1, i2, j1, j2 in get_opcodes(matches, len(a), len(b)):
+        if tag == "equal":
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(-(i2 - i1))
+        if j2 > j1:
+            ops.append(new_lines[j1:j2])
+    delta = json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+    if len(delta.encode("utf-8")) > len(new.encode("utf-8")) * MAX_DELTA_RATIO:
+        return None
+    return delta
+
+
+def apply_delta(old: str, delta: str) -> str:
+    old_lines = old.splitlines(keepends=True)
+    result, position = [], 0
+    for op in json.loads(delta):
+        if isinstance(op, list):
+            result.extend(op)
+        elif op >= 0:
+            result.extend(old_lines[position:position + op])
+            position += op
+        else:
+            position -= op
+    if position != len(old_lines):
+        raise ValueError("Дельта не соответствует исходному тексту")
+    return "".join(result)
@@ -0,0 +1,250 @@
+# app/utils/text_diff.py
+"""
+Построчный diff с ограниченной стоимостью.
+
+difflib.SequenceMatcher в худшем случае квадратичен, поэтому здесь используется алгоритм
+Майерса O((N+M)·D) с потолком на число правок D. Общие начало и конец отрезаются заранее,
+строки сравниваются как целые числа. Если отличий больше потолка, участок режется по
+строкам, уникальным в обеих версиях (patience diff), и Майерс запускается уже на кусках
+между ними; когда общий бюджет исчерпан, оставшийся кусок считается заменённым целиком.
+Такой diff корректен, но может быть не минимальным — об этом сообщает флаг approximate.
+Вывод обрезается по числу строк (truncated), статистика при этом считается по всему diff.
+"""
+from bisect import bisect_left
+
+
+def intern_lines(left: list[str], right: list[str]) -> tuple[list[int], list[int]]:
+    ids = {}
+    return [ids.setdefault(line, len(ids)) for line in left], [ids.setdefault(line, len(ids)) for line in right]
+
+
+def _myers(a: list[int], alo: int, ahi: int, b: list[int], blo: int, bhi: int, max_edits: int):
+    """
+    Совпадающие пары (i, j) кратчайшего скрипта правок для a[alo:ahi] и b[blo:bhi]
+    или None, если правок больше max_edits. Вторым значением возвращает проделанную работу.
+    """
+    n, m = ahi - alo, bhi - blo
+    v = {1: 0}
+    trace = []
+    work = 0
+    for d in range(min(max_edits, n + m) + 1):
+        trace.append(v.copy())
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[k] = x
+            work += 1
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m, alo, blo), work
+    return None, work
+
+
+def _backtrack(trace: list[dict], x: int, y: int, alo: int, blo: int) -> list[tuple[int, int]]:
+    matches = []
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            matches.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+    return matches
+
+
+def _unique_anchors(a: list[int], alo: int, ahi: int, b: list[int], blo: int, bhi: int) -> list[tuple[int, int]]:
+    """ Строки, встречающиеся ровно один раз в каждой версии, в общем порядке (LIS по j) """
+    seen_a, seen_b = {}, {}
+    for i in range(alo, ahi):
+        seen_a[a[i]] = -1 if a[i] in seen_a else i
+    for j in range(blo, bhi):
+        seen_b[b[j]] = -1 if b[j] in seen_b else j
+    pairs = [(i, seen_b[line]) for line, i in seen_a.items() if i >= 0 and seen_b.get(line, -1) >= 0]
+    pairs.sort()
+
+    # Наибольшая возрастающая подпоследовательность по j — O(k log k)
+    tails, tail_index, previous = [], [], [None] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[position] = j
+            tail_index[position] = index
+        previous[index] = tail_index[position - 1] if position else None
+
+    anchors = []
+    index = tail_index[-1] if tail_index else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def match_lines(a: list[int], b: list[int], max_edits: int) -> tuple[list[tuple[int, int]], bool]:
+    """ Возвращает отсортированные совпадающие пары (i, j) и флаг approximate """
+    matches = []
+    approximate = False
+    budget = max_edits * max_edits  # Суммарная работа Майерса на все куски
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        if budget > 0:
+            found, work = _myers(a, alo, ahi, b, blo, bhi, max_edits)
+            budget -= work
+            if found is not None:
+                matches.extend(found)
+                continue
+
+        anchors = _unique_anchors(a, alo, ahi, b, blo, bhi)
+        if not anchors:
+            approximate = True  # Кусок без общих уникальных строк считаем заменённым
+            continue
+        for i, j in anchors:
+            stack.append((alo, i, blo, j))
+            matches.append((i, j))
+            alo, blo = i + 1, j + 1
+        stack.append((alo, ahi, blo, bhi))
+
+    matches.sort()
+    return matches, approximate
+
+
+def get_opcodes(matches: list[tuple[int, int]], n: int, m: int) -> list[tuple[str, int, int, int, int]]:
+    """ Опкоды в формате difflib (equal/replace/delete/insert) по совпадающим парам """
+    opcodes = []
+    i = j = 0
+    for mi, mj in matches + [(n, m)]:
+        if i < mi or j < mj:
+            tag = "replace" if i < mi and j < mj else "delete" if i < mi else "insert"
+            opcodes.append((tag, i, mi, j, mj))
+        if mi < n:
+            if opcodes and opcodes[-1][0] == "equal":
+                opcodes[-1] = ("equal", opcodes[-1][1], mi + 1, opcodes[-1][3], mj + 1)
+            else:
+                opcodes.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+def _group_opcodes(opcodes: list, context: int):
+    """ Порт SequenceMatcher.get_grouped_opcodes: изменения с context строками вокруг """
+    codes = list(opcodes) or [("equal", 0, 1, 0, 1)]
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        if tag == "equal" and i2 - i1 > 2 * context:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _hunk_range(start: int, stop: int) -> str:
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def unified_diff(left: str, right: str, left_name: str = "left", right_name: str = "right",
+                 context: int = 3, max_edits: int = 200, max_lines: int = 5000) -> dict:
+    """
+    Unified diff двух текстов. Возвращает {"diff", "added", "removed", "approximate", "truncated"};
+    added/removed считаются по всему diff, даже если текст обрезан на max_lines строк.
+    """
+    left_lines, right_lines = left.splitlines(), right.splitlines()
+    a, b = intern_lines(left_lines, right_lines)
+    matches, approximate = match_lines(a, b, max_edits)
+    opcodes = get_opcodes(matches, len(a), len(b))
+
+    added = sum(j2 - j1 for tag, _, _, j1, j2 in opcodes if tag in ("replace", "insert"))
+    removed = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag in ("replace", "delete"))
+
+    output = []
+    truncated = False
+    if added or removed:
+        output += [f"--- {left_name}", f"+++ {right_name}"]
+    for group in _group_opcodes(opcodes, context):
+        if len(output) >= max_lines:
+            truncated = True
+            break
+        first, last = group[0], group[-1]
+        output.append(f"@@ -{_hunk_range(first[1], last[2])} +{_hunk_range(first[3], last[4])} @@")
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                output.extend(" " + line for line in left_lines[i1:i2])
+                continue
+            output.extend("-" + line for line in left_lines[i1:i2])
+            output.extend("+" + line for line in right_lines[j1:j2])
+    if len(output) > max_lines:
+        output = output[:max_lines]
+        truncated = True
+
+    return {
+        "diff": "\n".join(output) + ("\n" if output else ""),
+        "added": added,
+        "removed": removed,
+        "approximate": approximate,
+        "truncated": truncated,
+    }
+
+
+def _flatten(data, prefix: str = "") -> dict:
+    if isinstance(data, dict) and data:
+        flat = {}
+        for key, value in data.items():
+            flat.update(_flatten(value, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    return {prefix: data}
+
+
+def diff_fields(old: dict, new: dict) -> list[dict]:
+    """
+    Полевой diff двух наборов параметров генератора. Вложенные модели раскрываются в имена
+    вида `parent.child` (как в метаданных форм), списки сравниваются целиком.
+    """
+    old_flat, new_flat = _flatten(old), _flatten(new)
+    changes = []
+    for name in list(old_flat) + [name for name in new_flat if name not in old_flat]:
+        if name not in new_flat:
+            changes.append({"field": name, "change": "removed", "old": old_flat[name], "new": None})
+        elif name not in old_flat:
+            changes.append({"field": name, "change": "added", "old": None, "new": new_flat[name]})
+        elif old_flat[name] != new_flat[name]:
+            changes.append({"field": name, "change": "changed", "old": old_flat[name], "new": new_flat[name]})
+    return changes
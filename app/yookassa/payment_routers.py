@@ -1,13 +1,15 @@
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from app.auth.auth_service import get_db, get_current_user
+from app.auth.auth_service import get_db, get_current_user, usage_buffer
+from app.auth.auth_cache import invalidate_user_cache
 from app.auth.password_reset import password_reset_router
 from app.yookassa.payment_service import PaymentProcessor
 from app.database.models import PaymentOrder, User  # твои ORM-модели
 from datetime import datetime, timedelta
+from app.utils.pagination import PAGE_MAX_LIMIT, keyset_page, set_next_cursor
 
 router = APIRouter(prefix="/payments")
 processor = PaymentProcessor()
@@ -85,13 +87,25 @@ async def yookassa_webhook(request: Request, db: Session = Depends(get_db)):
         user.subscription_expiry = datetime.utcnow() + timedelta(days=30)
         order.status = "succeeded"
         db.commit()
+        # Новый лимит и уровень подписки должны подхватиться сразу
+        usage_buffer.forget(user.id)
+        invalidate_user_cache(user_id=user.id, email=user.email)
     return {"ok": True}
 
 @router.get("", response_model=List[PaymentOrderResponse])
 def list_user_payments(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Возвращаем все заказы текущего пользователя
-    orders = db.query(PaymentOrder).filter_by(user_id=current_user.id).all()
-    return orders
\ No newline at end of file
+    # Заказы текущего пользователя, новые первыми; выбираем только отдаваемые колонки
+    query = db.query(
+        PaymentOrder.order_id, PaymentOrder.plan, PaymentOrder.amount, PaymentOrder.status, PaymentOrder.created_at
+    ).filter(PaymentOrder.user_id == current_user.id)
+    orders, next_cursor = keyset_page(
+        query, (PaymentOrder.created_at, PaymentOrder.order_id), cursor, limit, descending=True
+    )
+    set_next_cursor(response, next_cursor)
+    return [order._asdict() for order in orders]
@@ -0,0 +1,153 @@
+# benchmarks/load_test.py
+"""
+Нагрузочный тест синхронного и асинхронного режимов (DB_ASYNC_MODE).
+
+Для каждого режима поднимается отдельный uvicorn на одной и той же БД, под тестовым пользователем
+заводится несколько сохранённых конфигураций, после чего с растущей конкурентностью
+гоняются чтения, которые ходят в БД: GET /api/configurations?limit=20 и GET /api/account/info.
+На каждой ступени печатаются RPS, p50 и p99; максимальный устойчивый RPS — наибольший RPS
+на ступени без ошибок.
+
+    python benchmarks/load_test.py [--duration 10] [--concurrency 8 32 64 128] [--modes sync async]
+
+Нужны те же переменные окружения, что и приложению (см. env.example). БД берётся из
+SQLALCHEMY_DATABASE_URL — для сравнения с PostgreSQL достаточно указать её URL. Генератор нагрузки
+работает на той же машине, поэтому на малом числе ядер он конкурирует с сервером за CPU.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EMAIL, PASSWORD = "loadtest@example.com", "loadtest-password"
+PATHS = ("/api/configurations?limit=20", "/api/account/info")
+
+SETUP = """
+from app.auth.password_hasher import hash_password
+from app.database.database import SessionLocal, init_db
+from app.database import crud
+from app.database.configuration_crud import create_configuration
+from app.schemas.configuration import ConfigurationCreate
+
+init_db()
+db = SessionLocal()
+user = crud.get_user_by_email(db, "{email}") or crud.create_user(db, "{email}", hash_password("{password}"))
+for i in range(user.configurations_count, 5):
+    create_configuration(db, ConfigurationCreate(
+        service="nginx", config_name=f"load-{{i}}", config_data=f"server {{{{ listen {{8000 + i}}; }}}}\\n"
+    ), user.id)
+"""
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _child_env(async_mode: bool) -> dict:
+    return {
+        **os.environ, "DB_ASYNC_MODE": "true" if async_mode else "false", "PYTHONPATH": ROOT, "PYTHONWARNINGS": "ignore",
+    }
+
+
+def _wait_ready(base_url: str, process: subprocess.Popen):
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(base_url + "/health/ready").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("uvicorn did not become ready")
+
+
+async def _run_step(base_url: str, cookie: str, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers={"Cookie": cookie}, limits=limits, timeout=30) as client:
+        async def worker(index: int):
+            nonlocal errors
+            request_no = index
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(PATHS[request_no % len(PATHS)])
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+                request_no += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(index) for index in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def run_mode(async_mode: bool, steps: list[int], duration: float, workers: int) -> list[tuple[int, dict]]:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=_child_env(async_mode),
+    )
+    try:
+        _wait_ready(base_url, server)
+        login = httpx.post(base_url + "/api/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        login.raise_for_status()
+        # Кука выставляется с флагом Secure, поэтому по http её приходится передавать вручную
+        cookie = f"access_token={login.cookies['access_token']}"
+        asyncio.run(_run_step(base_url, cookie, steps[0], min(duration, 2)))  # Прогрев
+        return [(concurrency, asyncio.run(_run_step(base_url, cookie, concurrency, duration))) for concurrency in steps]
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=10, help="секунд на ступень")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 64, 128])
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    parser.add_argument("--workers", type=int, default=1, help="процессов uvicorn")
+    args = parser.parse_args()
+
+    subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", SETUP.format(email=EMAIL, password=PASSWORD)],
+        cwd=ROOT, env={**_child_env(False), "PASSWORD_HASH_WORKERS": "0"}, check=True,
+    )
+    for mode in args.modes:
+        results = run_mode(mode == "async", args.concurrency, args.duration, args.workers)
+        for concurrency, result in results:
+            print(
+                f"{mode:>5} c={concurrency:<4} {result['rps']:8.1f} rps  p50 {result['p50_ms']:7.1f} ms  "
+                f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}"
+            )
+        sustained = [result["rps"] for _, result in results if not result["errors"]]
+        print(f"{mode:>5} max sustained: {max(sustained):.1f} rps" if sustained else f"{mode:>5} no error-free step")
+
+
+if __name__ == "__main__":
+    main()
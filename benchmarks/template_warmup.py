@@ -0,0 +1,88 @@
+# benchmarks/template_warmup.py
+"""
+Задержка рендеринга шаблонов генераторов с TEMPLATES_PRODUCTION_MODE и без него.
+
+Каждый замер — отдельный свежий процесс: запускается как воркер (в production-режиме с прогревом
+warm_up_templates), затем меряется первый рендер и установившаяся задержка. Кэш результатов
+рендеринга выключен, чтобы мерить сам шаблон. Печатаются медианы по всем запускам.
+
+    python benchmarks/template_warmup.py [--runs 5] [--renders 2000] [--template nginx.j2]
+
+Нужны те же переменные окружения, что и приложению (см. env.example).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONTEXTS = {
+    "nginx.j2": ("nginx", {"server_name": "example.com", "listen": 80, "root": "/var/www/html", "index": "index.html"}),
+    "redis.j2": ("redis", {"bind": "127.0.0.1", "port": 6379}),
+}
+
+CHILD = """
+import json, sys, time
+from app.services import env, warm_up_templates
+from app.config import settings
+from app.generators import GENERATORS
+
+service, data, renders = json.loads(sys.argv[1])
+context = GENERATORS[service].parse(data).dict()
+template_name = GENERATORS[service].template_name
+
+started = time.perf_counter()
+if settings.TEMPLATES_PRODUCTION_MODE:
+    warm_up_templates()
+warmup = time.perf_counter() - started
+
+started = time.perf_counter()
+env.get_template(template_name).render(context)
+first = time.perf_counter() - started
+
+started = time.perf_counter()
+for _ in range(renders):
+    env.get_template(template_name).render(context)
+steady = (time.perf_counter() - started) / renders
+
+print(json.dumps({"warmup_ms": warmup * 1000, "first_ms": first * 1000, "steady_us": steady * 1e6}))
+"""
+
+
+def run_once(production: bool, template: str, renders: int) -> dict:
+    service, data = CONTEXTS[template]
+    child_env = {
+        **os.environ,
+        "TEMPLATES_PRODUCTION_MODE": "true" if production else "false",
+        "RENDER_CACHE_ENABLED": "false",
+        "PYTHONPATH": ROOT,
+    }
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD, json.dumps([service, data, renders])],
+        cwd=ROOT, env=child_env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--renders", type=int, default=2000)
+    parser.add_argument("--template", choices=sorted(CONTEXTS), default="nginx.j2")
+    args = parser.parse_args()
+
+    print(f"{args.template}, медиана по {args.runs} свежим процессам")
+    for production in (False, True):
+        results = [run_once(production, args.template, args.renders) for _ in range(args.runs)]
+        median = {key: statistics.median(result[key] for result in results) for key in results[0]}
+        print(
+            f"{'production' if production else 'default':>10}: прогрев {median['warmup_ms']:.2f} ms, "
+            f"первый рендер {median['first_ms']:.3f} ms, установившийся {median['steady_us']:.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
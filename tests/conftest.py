@@ -0,0 +1,61 @@
+# tests/conftest.py
+import os
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+# Настройки читаются при импорте app.config, поэтому обязательные переменные задаются до импорта app.
+# БД приложения всегда временная: тесты не должны попасть в настоящую, даже если её URL есть в окружении
+_TMP_DIR = tempfile.mkdtemp(prefix="configen-tests-")
+os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{_TMP_DIR}/app.sqlite"
+for name, value in {
+    "SECRET_KEY": "test-secret",
+    "SMTP_SERVER": "localhost",
+    "SMTP_PORT": "25",
+    "SMTP_USER": "tests@example.com",
+    "SMTP_PASSWORD": "test",
+    "CONFIGURATION_ACCOUNT_ID": "1",
+    "CONFIGURATION_SECRET_KEY": "test",
+    "BASE_URL": "http://testserver/",
+    "BCRYPT_ROUNDS": "4",
+}.items():
+    os.environ.setdefault(name, value)
+
+from app.database.configuration_search import create_search_index  # noqa: E402
+from app.database.database import Base  # noqa: E402
+import app.database.models  # noqa: E402,F401  (регистрирует модели в Base.metadata)
+
+
+def create_test_engine(path, foreign_keys: bool = False):
+    """ SQLite в файле (а не :memory:), чтобы к одной БД могли ходить несколько соединений и потоков """
+    engine = create_engine(f"sqlite:///{path}")
+    if foreign_keys:
+        @event.listens_for(engine, "connect")
+        def _enable_foreign_keys(connection, _):
+            connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        create_search_index(connection)
+    return engine
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_test_engine(tmp_path / "test.sqlite")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def fk_engine(tmp_path):
+    engine = create_test_engine(tmp_path / "test_fk.sqlite", foreign_keys=True)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,48 @@
+# tests/test_auth_cache.py
+import time
+
+from app.auth import auth_cache
+from app.auth.auth_cache import TTLCache, UserSnapshot
+
+
+def _user(user_id: int, **fields) -> UserSnapshot:
+    values = {field: None for field in auth_cache.USER_SNAPSHOT_FIELDS}
+    values.update(id=user_id, email=f"user{user_id}@example.com", requests_this_month=0, **fields)
+    return UserSnapshot(**values)
+
+
+def test_quota_updates_do_not_extend_snapshot_lifetime(monkeypatch):
+    monkeypatch.setattr(auth_cache.settings, "AUTH_CACHE_ENABLED", True)
+    monkeypatch.setattr(auth_cache.settings, "AUTH_CACHE_TTL_SECONDS", 0.2)
+    snapshot = auth_cache.cache_user(_user(1))
+
+    deadline = time.monotonic() + 0.35
+    while time.monotonic() < deadline:
+        auth_cache.update_cached_user(1, requests_this_month=5)
+        time.sleep(0.01)
+
+    # Активный пользователь всё равно перечитывается из БД после TTL
+    assert auth_cache.get_cached_user(snapshot.email) is None
+
+
+def test_update_keeps_changes_until_expiry(monkeypatch):
+    monkeypatch.setattr(auth_cache.settings, "AUTH_CACHE_ENABLED", True)
+    snapshot = auth_cache.cache_user(_user(2))
+
+    auth_cache.update_cached_user(2, requests_this_month=7)
+
+    assert auth_cache.get_cached_user(snapshot.email).requests_this_month == 7
+    auth_cache.invalidate_user_cache(user_id=2)
+    assert auth_cache.get_cached_user(snapshot.email) is None
+
+
+def test_id_index_is_bounded_like_the_snapshots(monkeypatch):
+    monkeypatch.setattr(auth_cache, "user_cache", TTLCache(max_entries=10))
+    monkeypatch.setattr(auth_cache, "_emails_by_id", TTLCache(max_entries=10))
+    monkeypatch.setattr(auth_cache.settings, "AUTH_CACHE_ENABLED", True)
+
+    for user_id in range(100, 200):
+        auth_cache.cache_user(_user(user_id))
+
+    assert auth_cache._emails_by_id.stats()["entries"] == 10
+    assert auth_cache.user_cache.stats()["entries"] == 10
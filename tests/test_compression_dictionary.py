@@ -0,0 +1,26 @@
+# tests/test_compression_dictionary.py
+import os
+
+from app.database.compression import DICTIONARY_PATHS, MARKER
+from app.database.maintenance import main
+
+
+def test_command_requires_output_path():
+    assert main(["build-compression-dictionary"]) == 2
+
+
+def test_command_refuses_to_overwrite_active_dictionary():
+    active = DICTIONARY_PATHS[MARKER]
+    before = active.read_bytes()
+    # Тот же файл другим путём тоже не проходит
+    aliased = os.path.join(os.path.relpath(active.parent), "..", active.parent.name, active.name)
+    for path in (str(active), aliased):
+        assert main(["build-compression-dictionary", path]) == 1
+    assert active.read_bytes() == before
+
+
+def test_command_writes_new_dictionary(tmp_path):
+    target = tmp_path / "compression_dict_v2.txt"
+    assert main(["build-compression-dictionary", str(target)]) == 0
+    assert 0 < len(target.read_bytes()) <= 32 * 1024
+    assert main(["build-compression-dictionary", str(target)]) == 1  # Уже существует
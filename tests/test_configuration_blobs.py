@@ -0,0 +1,80 @@
+# tests/test_configuration_blobs.py
+"""
+Удаление и правка конфигураций при включённых внешних ключах (как в PostgreSQL): строка
+config_blobs удаляется только после того, как на неё перестала ссылаться конфигурация.
+"""
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.database.configuration_crud import create_configuration, delete_configuration, update_configuration
+from app.database.models import ConfigBlob, Configuration, ConfigurationRevision, User
+from app.schemas.configuration import ConfigurationCreate, ConfigurationUpdate
+
+NGINX = "server {{ listen {port}; }}\n"
+NGINX_INPUT = {"server_name": "example.com", "listen": 82, "root": "/var/www/html", "index": "index.html"}
+
+
+@pytest.fixture
+def db(fk_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=fk_engine)()
+    user = User(email="blobs@example.com", hashed_password="x", subscription_level="enterprise")
+    session.add(user)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _assert_ref_counts(db):
+    """ ref_count каждого содержимого равен числу ссылок на него, осиротевших строк нет """
+    db.expire_all()
+    for blob in db.query(ConfigBlob):
+        references = (
+            db.query(Configuration).filter(Configuration.blob_hash == blob.hash).count()
+            + db.query(ConfigurationRevision).filter(ConfigurationRevision.blob_hash == blob.hash).count()
+        )
+        assert blob.ref_count == references > 0
+
+
+def _create(db, name: str, port: int) -> Configuration:
+    user_id = db.query(User.id).scalar()
+    return create_configuration(
+        db, ConfigurationCreate(service="nginx", config_name=name, config_data=NGINX.format(port=port)), user_id
+    )
+
+
+def test_delete_releases_shared_and_last_blob_reference(db):
+    first, second = _create(db, "first", 80), _create(db, "second", 80)
+    assert first.blob_hash == second.blob_hash
+
+    deleted = delete_configuration(db, first.id, first.user_id)
+    assert deleted.config_data == NGINX.format(port=80)
+    _assert_ref_counts(db)
+    assert db.query(ConfigBlob).count() == 1
+
+    delete_configuration(db, second.id, second.user_id)
+    assert db.query(ConfigBlob).count() == 0
+    assert db.query(User.configurations_count).scalar() == 0
+
+
+def test_delete_configuration_with_history(db):
+    config = _create(db, "edited", 80)
+    for port in (81, 82, 83):
+        update_configuration(db, config.id, config.user_id, ConfigurationUpdate(config_data=NGINX.format(port=port)))
+    assert db.query(ConfigurationRevision).count() == 4
+
+    delete_configuration(db, config.id, config.user_id)
+    assert db.query(ConfigurationRevision).count() == 0
+    assert db.query(ConfigBlob).count() == 0
+
+
+def test_update_releases_previous_blob(db):
+    config = _create(db, "replaced", 80)
+
+    update_configuration(db, config.id, config.user_id, ConfigurationUpdate(config_data=NGINX.format(port=81)))
+    _assert_ref_counts(db)
+    update_configuration(db, config.id, config.user_id, ConfigurationUpdate(config_input=NGINX_INPUT))
+    _assert_ref_counts(db)
+    assert db.get(Configuration, config.id).blob_hash is None
+
+    delete_configuration(db, config.id, config.user_id)
+    assert db.query(ConfigBlob).count() == 0
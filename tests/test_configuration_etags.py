@@ -0,0 +1,64 @@
+# tests/test_configuration_etags.py
+"""
+Условные запросы к сохранённым конфигурациям: If-None-Match с актуальным ETag даёт 304 без тела,
+PUT с устаревшим If-Match — 412 с актуальным ETag, и правка не записывается.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.security import create_access_token
+from app.database.database import SessionLocal
+from app.database.models import User
+from app.main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app, base_url="https://testserver") as client:
+        # Пользователь заводится внутри контекста: таблицы создаются при старте приложения
+        with SessionLocal() as db:
+            db.add(User(email="etags@example.com", hashed_password="x", subscription_level="enterprise"))
+            db.commit()
+        client.cookies.set("access_token", create_access_token({"sub": "etags@example.com"}))
+        yield client
+
+
+@pytest.fixture
+def config(client):
+    response = client.post("/api/configurations", json={
+        "service": "nginx", "config_name": "etags", "config_data": "server { listen 80; }\n",
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_unchanged_configuration_is_revalidated_with_304(client, config):
+    url = f"/api/configurations/{config['id']}"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    revalidated = client.get(url, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    listing = client.get("/api/configurations")
+    assert client.get("/api/configurations", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+
+    # После правки старый ETag больше не подходит
+    client.put(url, json={"config_data": "server { listen 81; }\n"})
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/api/configurations", headers={"If-None-Match": listing.headers["etag"]}).status_code == 200
+
+
+def test_stale_if_match_is_rejected_with_412(client, config):
+    url = f"/api/configurations/{config['id']}"
+    stale = client.get(url).headers["etag"]
+    saved = client.put(url, json={"config_data": "server { listen 82; }\n"}, headers={"If-Match": stale})
+    assert saved.status_code == 200
+
+    lost = client.put(url, json={"config_data": "server { listen 83; }\n"}, headers={"If-Match": stale})
+    assert lost.status_code == 412
+    assert lost.headers["etag"] == saved.headers["etag"]
+    assert client.get(url).json()["config_data"] == "server { listen 82; }\n"
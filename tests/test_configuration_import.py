@@ -0,0 +1,73 @@
+# tests/test_configuration_import.py
+"""
+Импорт NDJSON: повторный импорт собственной выгрузки ничего не дублирует и не тратит лимит,
+а слишком длинные строки отдаются ошибкой, не сбивая разбор следующих.
+"""
+import asyncio
+import json
+
+import pytest
+
+from app.database.configuration_bulk_crud import export_configurations, import_configurations_batch
+from app.database.configuration_crud import create_configuration
+from app.database.models import Configuration, User
+from app.schemas.configuration import ConfigurationCreate
+from app.utils.ndjson import iter_ndjson
+
+NGINX_INPUT = {"server_name": "import.example.com", "listen": 80, "root": "/var/www/html", "index": "index.html"}
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    user = User(email="import@example.com", hashed_password="x", subscription_level="enterprise")
+    session.add(user)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _exported(db, user_id: int) -> list[tuple[int, dict]]:
+    lines = "".join(export_configurations(db, user_id, chunk_rows=2)).splitlines()
+    return [(line_no, json.loads(line)) for line_no, line in enumerate(lines, start=1)]
+
+
+def test_reimporting_export_creates_nothing(db):
+    user_id = db.query(User.id).scalar()
+    create_configuration(db, ConfigurationCreate(service="nginx", config_name="text", config_data="listen 80;\n"), user_id)
+    create_configuration(db, ConfigurationCreate(service="nginx", config_name="input", config_input=NGINX_INPUT), user_id)
+    items = _exported(db, user_id)
+
+    assert import_configurations_batch(db, user_id, items) == (0, 2, [])
+    assert db.query(Configuration).count() == 2
+    assert db.query(User.configurations_count).scalar() == 2
+
+    # Изменённый текст под тем же именем — это уже другая конфигурация
+    items[0][1]["config_data"] = "listen 81;\n"
+    assert import_configurations_batch(db, user_id, items) == (1, 1, [])
+    assert db.query(User.configurations_count).scalar() == 3
+
+
+def test_duplicates_within_batch_are_imported_once(db):
+    user_id = db.query(User.id).scalar()
+    record = {"service": "nginx", "config_name": "twice", "config_data": "listen 80;\n"}
+    assert import_configurations_batch(db, user_id, [(1, record), (2, dict(record))]) == (1, 1, [])
+    assert db.query(User.configurations_count).scalar() == 1
+
+
+async def _parse(chunks: list[bytes], max_line_bytes: int) -> list[tuple]:
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+    return [item async for item in iter_ndjson(stream(), max_line_bytes)]
+
+
+def test_overlong_line_is_reported_and_skipped():
+    long_value = "x" * 40
+    body = f'{{"a":1}}\n{{"b":"{long_value}"}}\n{{"c":3}}\n{{"d":"{long_value}"}}'.encode()
+    # Мелкие куски: длинная строка переполняет буфер раньше, чем встретится её перевод строки
+    chunks = [body[i:i + 7] for i in range(0, len(body), 7)]
+    error = "Line is longer than 20 bytes"
+    assert asyncio.run(_parse(chunks, max_line_bytes=20)) == [
+        (1, {"a": 1}, None), (2, None, error), (3, {"c": 3}, None), (4, None, error),
+    ]
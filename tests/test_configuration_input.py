@@ -0,0 +1,76 @@
+# tests/test_configuration_input.py
+"""
+Конфигурации, сохранённые параметрами генератора, после того как генератор перестал принимать
+эти параметры: чтение не падает, а отдаёт текст последней версии из истории.
+"""
+import pytest
+from sqlalchemy import update
+
+import app.generators
+from app.database.configuration_crud import create_configuration, get_configuration, get_configurations_by_user
+from app.database.configuration_revision_crud import delete_revisions
+from app.database.configuration_search import search_configurations
+from app.database.maintenance import materialize_configurations
+from app.database.models import Configuration, User
+from app.schemas.configuration import ConfigurationCreate
+
+NGINX_INPUT = {"server_name": "saved.example.com", "listen": 80, "root": "/var/www/html", "index": "index.html"}
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    user = User(email="input@example.com", hashed_password="x", subscription_level="enterprise")
+    session.add(user)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _create(db) -> Configuration:
+    user_id = db.query(User.id).scalar()
+    return create_configuration(
+        db, ConfigurationCreate(service="nginx", config_name="saved", config_input=NGINX_INPUT), user_id
+    )
+
+
+def _break_input(db, config_id: int):
+    """ Как если бы новая версия генератора сделала обязательным поле, которого в параметрах нет """
+    db.execute(update(Configuration).where(Configuration.id == config_id).values(config_input={"listen": 80}))
+    db.commit()
+    db.expunge_all()
+
+
+def test_invalid_input_falls_back_to_last_revision(db):
+    config = _create(db)
+    config_id, user_id, saved_text = config.id, config.user_id, config.config_data
+    assert "saved.example.com" in saved_text
+    _break_input(db, config_id)
+
+    single = get_configuration(db, config_id, user_id)
+    assert single.config_data == saved_text
+    configs, _ = get_configurations_by_user(db, user_id)
+    assert [item.config_data for item in configs] == [saved_text]
+
+
+def test_invalid_input_without_history_is_unrenderable(db):
+    config = _create(db)
+    config_id, user_id = config.id, config.user_id
+    delete_revisions(db, config_id)
+    _break_input(db, config_id)
+
+    single = get_configuration(db, config_id, user_id)
+    assert single.config_data is None
+    assert materialize_configurations(db, pause_seconds=0) == {"materialized_rows": 0, "failed_rows": 1}
+
+
+def test_materialize_reindexes_rerendered_text(db, monkeypatch):
+    config = _create(db)
+    assert search_configurations(db, config.user_id, "upgraded", limit=10)[0] == []
+
+    # Новая версия шаблона рендерит те же параметры иначе — индекс должен увидеть новый текст
+    monkeypatch.setattr(app.generators, "render_saved_input", lambda service, data: "server_name upgraded.example.com;\n")
+    assert materialize_configurations(db, pause_seconds=0) == {"materialized_rows": 1, "failed_rows": 0}
+
+    hits, _ = search_configurations(db, config.user_id, "upgraded", limit=10)
+    assert [hit["id"] for hit in hits] == [config.id]
@@ -0,0 +1,122 @@
+# tests/test_configuration_revisions.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.database.configuration_crud import (
+    ConfigurationConflict, create_configuration, get_configuration, get_configuration_revision,
+    get_configuration_revisions, update_configuration,
+)
+from app.database.models import User
+from app.schemas.configuration import ConfigurationCreate, ConfigurationUpdate
+from app.utils.text_delta import apply_delta, make_delta
+
+CONCURRENT_EDITS = 8
+BASE = "".join(f"    option_{i} {i};\n" for i in range(40))  # Достаточно длинный, чтобы правки хранились дельтами
+
+
+def _config_text(rng: random.Random, lines: int) -> str:
+    return "".join(f"    option_{rng.randrange(40)} {rng.randrange(1000)};\n" for _ in range(lines))
+
+
+def _edit(rng: random.Random, text: str) -> str:
+    lines = text.splitlines(keepends=True)
+    for _ in range(rng.randrange(1, 6)):
+        position = rng.randrange(len(lines) + 1)
+        action = rng.choice(("insert", "delete", "replace"))
+        if action == "insert" or not lines:
+            lines.insert(position, f"    added_{rng.randrange(1000)};\n")
+        elif action == "delete":
+            del lines[min(position, len(lines) - 1)]
+        else:
+            lines[min(position, len(lines) - 1)] = f"    changed_{rng.randrange(1000)};\n"
+    return "".join(lines)
+
+
+def test_delta_round_trip_on_random_edits():
+    rng = random.Random(20)
+    for _ in range(300):
+        old = _config_text(rng, rng.randrange(0, 80))
+        new = _edit(rng, old)
+        delta = make_delta(old, new)
+        if delta is not None:
+            assert apply_delta(old, delta) == new
+
+
+def test_delta_is_refused_when_it_does_not_pay_off():
+    rng = random.Random(21)
+    old = _config_text(rng, 200)
+    assert make_delta(old, _config_text(rng, 200)) is None  # Переписан целиком
+    assert make_delta("a\n", "b\n") is None  # Дельта не меньше самого текста
+
+
+def test_delta_cost_is_bounded_on_repetitive_text():
+    # Повторяющиеся строки (как в compose/YAML) — худший случай для SequenceMatcher
+    old = "".join(f"  service{i % 50}:\n    image: nginx\n    restart: always\n" for i in range(3400))
+    rng = random.Random(22)
+    new = "".join(line if rng.random() > 0.05 else "    image: redis\n" for line in old.splitlines(keepends=True))
+    started = time.perf_counter()
+    assert make_delta(old, new) is None
+    assert time.perf_counter() - started < 2
+
+
+@pytest.fixture
+def user_id(session_factory):
+    with session_factory() as db:
+        user = User(email="revisions@example.com", hashed_password="x", subscription_level="enterprise")
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def test_every_revision_is_reconstructed(session_factory, user_id):
+    rng = random.Random(23)
+    texts = [_config_text(rng, 60)]
+    with session_factory() as db:
+        config_id = create_configuration(
+            db, ConfigurationCreate(service="nginx", config_name="history", config_data=texts[0]), user_id
+        ).id
+        for step in range(1, 25):
+            # Каждая седьмая правка переписывает всё — такая версия сохраняется снимком вне расписания
+            texts.append(_config_text(rng, 60) if step % 7 == 0 else _edit(rng, texts[-1]))
+            update_configuration(db, config_id, user_id, ConfigurationUpdate(config_data=texts[-1]))
+
+        revisions = {entry["revision"]: entry for entry in get_configuration_revisions(db, config_id, user_id)}
+        assert sorted(revisions) == list(range(1, len(texts) + 1))
+        assert revisions[8]["is_snapshot"] and revisions[15]["is_snapshot"]
+        for revision, text in enumerate(texts, start=1):
+            assert get_configuration_revision(db, config_id, user_id, revision)["config_data"] == text
+
+
+def test_concurrent_edits_do_not_collide_on_revision_numbers(session_factory, user_id):
+    with session_factory() as db:
+        config_id = create_configuration(
+            db, ConfigurationCreate(service="nginx", config_name="raced", config_data=BASE), user_id
+        ).id
+    barrier = threading.Barrier(CONCURRENT_EDITS)
+
+    def edit(index: int) -> str | None:
+        text = BASE + f"    worker {index};\n"
+        with session_factory() as db:
+            barrier.wait()
+            try:
+                update_configuration(db, config_id, user_id, ConfigurationUpdate(config_data=text))
+            except ConfigurationConflict:
+                return None
+        return text
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_EDITS) as pool:
+        saved = [text for text in pool.map(edit, range(CONCURRENT_EDITS)) if text is not None]
+
+    with session_factory() as db:
+        revisions = sorted(entry["revision"] for entry in get_configuration_revisions(db, config_id, user_id))
+        assert revisions == list(range(1, len(saved) + 2))
+        # Каждая записанная правка — ровно одна версия, последняя версия совпадает с текущим текстом
+        texts = [get_configuration_revision(db, config_id, user_id, revision)["config_data"]
+                 for revision in revisions[1:]]
+        assert sorted(texts) == sorted(saved)
+        current = get_configuration_revision(db, config_id, user_id, revisions[-1])["config_data"]
+        assert get_configuration(db, config_id, user_id).config_data == current
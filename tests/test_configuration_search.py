@@ -0,0 +1,57 @@
+# tests/test_configuration_search.py
+"""
+Поиск по конфигурациям: индекс, оставшийся пустым после миграции, заполняется при первом поиске,
+а ранжируются только CONFIG_SEARCH_MAX_CANDIDATES самых новых совпадений.
+"""
+import pytest
+from sqlalchemy import text
+
+from app.config import settings
+from app.database.configuration_crud import create_configuration
+from app.database.configuration_search import search_configurations
+from app.database.models import User
+from app.schemas.configuration import ConfigurationCreate
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    user = User(email="search@example.com", hashed_password="x", subscription_level="enterprise")
+    session.add(user)
+    session.commit()
+    yield session
+    session.close()
+
+
+def _create_configs(db, count: int) -> tuple[int, list[int]]:
+    user_id = db.query(User.id).scalar()
+    ids = [
+        create_configuration(db, ConfigurationCreate(
+            service="nginx", config_name=f"site-{i}", config_data=f"server {{ listen {8000 + i}; gzip on; }}\n"
+        ), user_id).id
+        for i in range(count)
+    ]
+    return user_id, ids
+
+
+def test_empty_index_is_filled_on_first_search(db):
+    user_id, ids = _create_configs(db, 3)
+    # Так выглядит база сразу после миграции: конфигурации есть, индекс пуст
+    db.execute(text("DELETE FROM configuration_search"))
+    db.commit()
+
+    hits, _ = search_configurations(db, user_id, "gzip", limit=10)
+    assert sorted(hit["id"] for hit in hits) == ids
+    hits, _ = search_configurations(db, user_id, "8001", limit=10)
+    assert [hit["id"] for hit in hits] == [ids[1]]
+
+
+def test_only_newest_matches_are_ranked(db, monkeypatch):
+    user_id, ids = _create_configs(db, 5)
+    monkeypatch.setattr(settings, "CONFIG_SEARCH_MAX_CANDIDATES", 3)
+
+    first, cursor = search_configurations(db, user_id, "gzip", limit=2)
+    assert cursor is not None
+    second, cursor = search_configurations(db, user_id, "gzip", limit=2, cursor=cursor)
+    assert cursor is None
+    assert sorted(hit["id"] for hit in first + second) == ids[-3:]
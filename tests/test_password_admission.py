@@ -0,0 +1,50 @@
+# tests/test_password_admission.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.testclient import TestClient
+from passlib.hash import bcrypt
+
+from app.auth import password_hasher
+from app.database.database import SessionLocal
+from app.database.models import User
+from app.main import app
+
+STORM = 24
+MAX_PENDING = 3
+PASSWORD = "storm-password"
+
+
+def _login(client: TestClient, email: str):
+    return client.post("/api/auth/login", json={"email": email, "password": PASSWORD})
+
+
+def test_login_storm_is_shed_with_503(monkeypatch):
+    monkeypatch.setattr(password_hasher, "_admission", threading.BoundedSemaphore(MAX_PENDING))
+    with TestClient(app, base_url="https://testserver") as client:
+        # Хэши с 12 раундами: проверка идёт сотни миллисекунд, и очередь пула успевает заполниться
+        slow_hash = bcrypt.using(rounds=12).hash(PASSWORD)
+        with SessionLocal() as db:
+            users = [User(email=f"storm{i}@example.com", hashed_password=slow_hash) for i in range(STORM)]
+            db.add_all(users)
+            db.commit()
+            emails = [user.email for user in users]
+
+        barrier = threading.Barrier(STORM)
+
+        def storm(email):
+            barrier.wait()
+            return _login(client, email)
+
+        with ThreadPoolExecutor(max_workers=STORM) as pool:
+            responses = list(pool.map(storm, emails))
+
+        statuses = [response.status_code for response in responses]
+        assert set(statuses) <= {200, 503}
+        assert statuses.count(503) > 0
+        assert statuses.count(200) >= MAX_PENDING
+        assert all(response.headers["Retry-After"] for response in responses if response.status_code == 503)
+
+        # После всплеска места в очереди освобождаются, отвергнутые входят повторной попыткой
+        rejected = [email for email, status in zip(emails, statuses) if status == 503]
+        assert all(_login(client, email).status_code == 200 for email in rejected)
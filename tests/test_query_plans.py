@@ -0,0 +1,102 @@
+# tests/test_query_plans.py
+"""
+Горячие запросы к конфигурациям должны идти по индексам из миграции a3d9e6b25f41: план берётся
+у тех SQL, что реально выполняют функции configuration_crud и maintenance, а не у их копий.
+"""
+from contextlib import contextmanager
+
+import pytest
+from fastapi import Response
+from sqlalchemy import event
+
+from app.database.configuration_crud import (
+    create_configuration, get_configurations_by_user, get_configurations_etag,
+)
+from app.database.maintenance import recount_configurations
+from app.database.models import PaymentOrder, User
+from app.schemas.configuration import ConfigurationCreate
+from app.yookassa.payment_routers import list_user_payments
+
+
+@contextmanager
+def captured_sql(engine, table: str):
+    """ Собирает (SQL, параметры) выполненных запросов, которые читают таблицу table """
+    statements = []
+
+    def collect(connection, cursor, statement, parameters, context, executemany):
+        if f"FROM {table}" in statement and not statement.lstrip().startswith("INSERT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+
+def query_plan(engine, statement: str, parameters) -> str:
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def assert_uses_index(engine, statements, index: str):
+    assert statements
+    for statement, parameters in statements:
+        plan = query_plan(engine, statement, parameters)
+        assert f"INDEX {index}" in plan, plan
+        assert "SCAN configurations" not in plan and "SCAN payment_orders" not in plan, plan
+        # Порядок отдаёт сам индекс: отдельной сортировки быть не должно
+        assert "TEMP B-TREE" not in plan, plan
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    user = User(email="plans@example.com", hashed_password="x", subscription_level="enterprise")
+    session.add(user)
+    session.commit()
+    for i in range(5):
+        create_configuration(session, ConfigurationCreate(
+            service="nginx", config_name=f"plan-{i}", config_data=f"server {{ listen {8000 + i}; }}\n"
+        ), user.id)
+    yield session
+    session.close()
+
+
+@pytest.mark.parametrize("summary", [False, True])
+def test_configuration_list_and_pages_use_user_id_index(db, engine, summary):
+    user_id = db.query(User.id).scalar()
+    with captured_sql(engine, "configurations") as statements:
+        get_configurations_by_user(db, user_id, summary=summary)
+        _, cursor = get_configurations_by_user(db, user_id, limit=2, summary=summary)
+        get_configurations_by_user(db, user_id, limit=2, cursor=cursor, summary=summary)
+        get_configurations_etag(db, user_id, limit=2, cursor=cursor, summary=summary)
+    assert_uses_index(engine, statements, "ix_configurations_user_id_id")
+
+
+def test_configuration_count_uses_user_id_index(db, engine):
+    with captured_sql(engine, "configurations") as statements:
+        recount_configurations(db)
+    # Для count(id) по user_id покрывающим подходит любой из двух индексов (user_id, ...)
+    assert_uses_index(engine, statements, "ix_configurations_user_id_")
+
+
+def test_duplicate_lookup_uses_user_id_service_index(db, engine):
+    user_id = db.query(User.id).scalar()
+    with captured_sql(engine, "configurations") as statements:
+        create_configuration(db, ConfigurationCreate(
+            service="nginx", config_name="plan-0", config_data="server { listen 8000; }\n"
+        ), user_id)
+    assert_uses_index(engine, statements[:1], "ix_configurations_user_id_service")
+
+
+def test_payment_history_uses_user_id_created_at_index(db, engine):
+    user = db.query(User).one()
+    db.add_all(PaymentOrder(order_id=f"order-{i}", user_id=user.id, plan="pro", amount="100.00") for i in range(3))
+    db.commit()
+    response = Response()
+    with captured_sql(engine, "payment_orders") as statements:
+        list_user_payments(response, limit=2, cursor=None, db=db, current_user=user)
+        list_user_payments(Response(), limit=2, cursor=response.headers["X-Next-Cursor"], db=db, current_user=user)
+    assert_uses_index(engine, statements, "ix_payment_orders_user_id_created_at")
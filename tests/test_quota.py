@@ -0,0 +1,80 @@
+# tests/test_quota.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.auth.auth_service import consume_user_requests_in_db, refund_on_error
+from app.config import settings
+from app.database.models import User
+
+CONCURRENT_CHARGES = 24
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "rowcount-fallback"])
+def quota_session_factory(request, engine, session_factory):
+    # Второй вариант — путь для SQLite без UPDATE ... RETURNING
+    engine.dialect.update_returning = request.param
+    return session_factory
+
+
+def _create_user(session_factory, request_limit: int, requests_this_month: int) -> int:
+    with session_factory() as db:
+        user = User(email="quota@example.com", hashed_password="x",
+                    request_limit=request_limit, requests_this_month=requests_this_month)
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def _charge_concurrently(session_factory, user_id: int, amount: int) -> list[int | None]:
+    barrier = threading.Barrier(CONCURRENT_CHARGES)
+
+    def charge(_):
+        with session_factory() as db:
+            barrier.wait()  # Все списания стартуют одновременно
+            return consume_user_requests_in_db(db, user_id, amount)
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_CHARGES) as pool:
+        return list(pool.map(charge, range(CONCURRENT_CHARGES)))
+
+
+@pytest.mark.parametrize("amount", [1, 2])
+def test_concurrent_charges_grant_exactly_remaining_quota(quota_session_factory, amount):
+    request_limit, used = 15, 5
+    user_id = _create_user(quota_session_factory, request_limit, used)
+
+    results = _charge_concurrently(quota_session_factory, user_id, amount)
+
+    granted = sorted(value for value in results if value is not None)
+    expected_grants = (request_limit - used) // amount
+    assert len(granted) == expected_grants
+    # Каждое успешное списание видит своё значение счётчика, и ни одно не выходит за лимит
+    assert granted == [used + amount * (index + 1) for index in range(expected_grants)]
+    with quota_session_factory() as db:
+        final = db.get(User, user_id).requests_this_month
+    assert final == used + amount * expected_grants
+    assert request_limit - final >= 0
+
+
+def test_exhausted_quota_grants_nothing(quota_session_factory):
+    user_id = _create_user(quota_session_factory, request_limit=10, requests_this_month=10)
+
+    assert _charge_concurrently(quota_session_factory, user_id, 1) == [None] * CONCURRENT_CHARGES
+    with quota_session_factory() as db:
+        assert db.get(User, user_id).requests_this_month == 10
+
+
+def test_failed_render_refunds_the_charge(quota_session_factory, monkeypatch):
+    monkeypatch.setattr(settings, "USAGE_BUFFER_ENABLED", False)
+    user_id = _create_user(quota_session_factory, request_limit=10, requests_this_month=3)
+
+    with quota_session_factory() as db:
+        assert consume_user_requests_in_db(db, user_id, 2) == 5
+        with pytest.raises(RuntimeError), refund_on_error(db, user_id, 2):
+            raise RuntimeError("template error")
+        with refund_on_error(db, user_id):
+            assert consume_user_requests_in_db(db, user_id) == 4  # Успешный рендеринг не возвращает
+
+    with quota_session_factory() as db:
+        assert db.get(User, user_id).requests_this_month == 4
@@ -0,0 +1,44 @@
+# tests/test_template_icons.py
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(document.cookie)</script></svg>'
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app, base_url="https://testserver") as client:
+        yield client
+
+
+@pytest.fixture
+def template_id(client):
+    response = client.post("/api/templates", json={"name": "icons", "template_filename": "nginx.j2"})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+@pytest.mark.parametrize("content_type", ["image/svg+xml", "image/png"])
+def test_svg_and_other_non_raster_uploads_are_rejected(client, template_id, content_type):
+    response = client.post(f"/api/templates/{template_id}/icon", content=SVG, headers={"Content-Type": content_type})
+    assert response.status_code == 415
+
+
+def test_icon_type_comes_from_content_and_is_served_with_nosniff(client, template_id):
+    # Заявленный тип клиента игнорируется: сохраняется тип, определённый по байтам
+    response = client.post(f"/api/templates/{template_id}/icon", content=PNG, headers={"Content-Type": "image/svg+xml"})
+    assert response.status_code == 200
+
+    icon = client.get(response.json()["icon_url"])
+    assert icon.status_code == 200
+    assert icon.content == PNG
+    assert icon.headers["content-type"] == "image/png"
+    assert icon.headers["x-content-type-options"] == "nosniff"
+    assert "sandbox" in icon.headers["content-security-policy"]
+
+    revalidated = client.get(response.json()["icon_url"], headers={"If-None-Match": icon.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["x-content-type-options"] == "nosniff"
@@ -0,0 +1,86 @@
+# tests/test_text_diff.py
+"""
+Unified diff из app/utils/text_diff.py: наложенный на левый текст, он даёт правый — и когда
+diff точный, и когда бюджет правок исчерпан (approximate); обрезка вывода не меняет статистику.
+"""
+import random
+import re
+
+from app.utils.text_diff import unified_diff
+
+HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@$")
+
+
+def apply_unified_diff(left: str, diff: str) -> str:
+    """ Накладывает unified diff на левый текст (строки без перевода строки в конце) """
+    source = left.splitlines()
+    result, position = [], 0
+    for line in diff.splitlines()[2:]:
+        hunk = HUNK.match(line)
+        if hunk:
+            start, length = int(hunk.group(1)), int(hunk.group(2) or 1)
+            start = start if length == 0 else start - 1
+            result.extend(source[position:start])
+            position = start
+        elif line[0] == "+":
+            result.append(line[1:])
+        else:
+            assert source[position] == line[1:]
+            if line[0] == " ":
+                result.append(line[1:])
+            position += 1
+    result.extend(source[position:])
+    return "\n".join(result)
+
+
+def _text(rng: random.Random, lines: int, vocabulary: int) -> str:
+    return "\n".join(f"line {rng.randrange(vocabulary)}" for _ in range(lines))
+
+
+def _edit(rng: random.Random, text: str, edits: int) -> str:
+    lines = text.splitlines()
+    for _ in range(edits):
+        position = rng.randrange(len(lines) + 1)
+        action = rng.choice(("insert", "delete", "replace"))
+        if action == "insert" or not lines:
+            lines.insert(position, f"new {rng.randrange(1000)}")
+        elif action == "delete":
+            del lines[min(position, len(lines) - 1)]
+        else:
+            lines[min(position, len(lines) - 1)] = f"changed {rng.randrange(1000)}"
+    return "\n".join(lines)
+
+
+def test_diff_applies_back_to_right_text():
+    rng = random.Random(21)
+    for _ in range(200):
+        # Малый словарь — много повторяющихся строк, как в конфигах
+        left = _text(rng, rng.randrange(0, 60), vocabulary=8)
+        right = _edit(rng, left, rng.randrange(0, 8))
+        result = unified_diff(left, right, context=rng.randrange(0, 4))
+        assert not result["approximate"] and not result["truncated"]
+        assert apply_unified_diff(left, result["diff"]) == right
+        assert (result["diff"] == "") == (left.splitlines() == right.splitlines())
+
+
+def test_large_rewrite_is_approximate_but_correct():
+    rng = random.Random(22)
+    left = _text(rng, 300, vocabulary=40)
+    right = _edit(rng, _text(rng, 300, vocabulary=40), 20)
+    result = unified_diff(left, right, max_edits=10)
+    assert result["approximate"]
+    assert apply_unified_diff(left, result["diff"]) == right
+    # Заменённым целиком можно считать не больше, чем есть строк
+    assert result["removed"] <= 300 and result["added"] <= len(right.splitlines())
+
+
+def test_truncated_output_keeps_full_statistics():
+    left = "\n".join(f"option_{i} on;" for i in range(200))
+    right = "\n".join(f"option_{i} off;" if i % 20 == 0 else f"option_{i} on;" for i in range(200))
+    full = unified_diff(left, right)
+    assert (full["added"], full["removed"], full["truncated"]) == (10, 10, False)
+
+    short = unified_diff(left, right, max_lines=12)
+    assert short["truncated"]
+    assert len(short["diff"].splitlines()) <= 12
+    assert (short["added"], short["removed"]) == (10, 10)
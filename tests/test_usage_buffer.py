@@ -0,0 +1,80 @@
+# tests/test_usage_buffer.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.auth.auth_service import consume_user_requests_in_db
+from app.auth.usage_buffer import UsageBuffer
+from app.database.models import User
+
+
+def _create_user(session_factory, request_limit: int) -> int:
+    with session_factory() as db:
+        user = User(email="buffer@example.com", hashed_password="x", request_limit=request_limit)
+        db.add(user)
+        db.commit()
+        return user.id
+
+
+def _buffer(session_factory, reseed_seconds: float = 60) -> UsageBuffer:
+    return UsageBuffer(session_factory, consume_user_requests_in_db, flush_interval_ms=5, flush_events=3,
+                       reseed_seconds=reseed_seconds)
+
+
+def test_seed_does_not_wait_for_flush(session_factory):
+    user_id = _create_user(session_factory, request_limit=10)
+    buffer = _buffer(session_factory)
+
+    # Засев идёт через сессию запроса и не должен ждать идущий сброс (в async-режиме это блокировало бы цикл)
+    with buffer._flush_lock, session_factory() as db, ThreadPoolExecutor(max_workers=1) as pool:
+        assert pool.submit(buffer.consume, db, user_id).result(timeout=5) == 1
+    with session_factory() as db:
+        assert buffer.consume(db, user_id) == 2  # Уже из памяти
+
+    buffer.stop()
+    with session_factory() as db:
+        assert db.get(User, user_id).requests_this_month == 2
+
+
+def test_refund_returns_quota_in_memory_and_in_db(session_factory):
+    user_id = _create_user(session_factory, request_limit=2)
+    buffer = _buffer(session_factory)
+    with session_factory() as db:
+        assert buffer.consume(db, user_id, 2) == 2
+        assert buffer.consume(db, user_id) is None
+        assert buffer.refund(user_id) == 1
+        assert buffer.consume(db, user_id) == 2
+        assert buffer.refund(user_id) == 1
+    # Без состояния в памяти возврат всё равно копится приращением и уходит в БД со сбросом
+    buffer.forget(user_id)
+    assert buffer.refund(user_id) is None
+
+    buffer.stop()
+    with session_factory() as db:
+        assert db.get(User, user_id).requests_this_month == 0
+
+
+def test_reseeds_during_flushes_keep_the_count_exact(session_factory):
+    request_limit, attempts = 60, 200
+    user_id = _create_user(session_factory, request_limit)
+    # Пересев почти на каждом запросе, сброс каждые 5 мс: засевы и сбросы постоянно пересекаются
+    buffer = _buffer(session_factory, reseed_seconds=0.002)
+    buffer.start()
+    barrier = threading.Barrier(8)
+
+    def worker(_):
+        granted = 0
+        with session_factory() as db:
+            barrier.wait()
+            for _ in range(attempts // 8):
+                if buffer.consume(db, user_id) is not None:
+                    granted += 1
+        return granted
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        granted = sum(pool.map(worker, range(8)))
+    buffer.stop()
+
+    with session_factory() as db:
+        stored = db.get(User, user_id).requests_this_month
+    assert granted == request_limit
+    assert stored == granted